@@ -0,0 +1 @@
+"""Offline analytics over the markdown vault (not imported by the bot runtime)."""
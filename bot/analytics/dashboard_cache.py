@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from ..services.symptom_stats import IngredientStat, score_ingredient
+from .vault import ConditionObservation, MealRecord, read_condition, read_meal
+
+RECENT_MEALS = 30
+TOP_SUSPECTS = 10
+MIN_EXPOSURES = 3
+MTIME_SETTLE_NS = 2_000_000_000
+
+
+@dataclass(slots=True)
+class DashboardSnapshot:
+    version: int
+    updated_at: datetime
+    meals_per_day: List[Tuple[date, int]]
+    recent_meals: List[MealRecord]
+    well_being: List[Tuple[date, float]]
+    breath: List[Tuple[datetime, str]]
+    suspects: List[IngredientStat]
+
+
+@dataclass(slots=True)
+class _DirectoryState:
+    mtime_ns: int | None = None
+    names: Set[str] = field(default_factory=set)
+
+
+class DashboardCache:
+    """Агрегаты для дашборда, которые обновляются только по новым файлам.
+
+    refresh() сравнивает mtime каталогов и листинг имён; читаются лишь
+    появившиеся заметки. Страница берёт готовый snapshot() без обхода хранилища."""
+
+    def __init__(
+        self,
+        data_dir: Path,
+        *,
+        food_log_dir: str = "FoodLog",
+        condition_log_dir: str = "ConditionLog",
+        min_exposures: int = MIN_EXPOSURES,
+    ):
+        self.food_log_dir = data_dir / food_log_dir
+        self.condition_log_dir = data_dir / condition_log_dir
+        self.min_exposures = min_exposures
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._food_state = _DirectoryState()
+        self._condition_state = _DirectoryState()
+        self._meals: Dict[str, MealRecord] = {}
+        self._conditions: Dict[str, ConditionObservation] = {}
+        self._meals_per_day: Counter = Counter()
+        self._well_being: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+        self._breath: Dict[str, Tuple[datetime, str]] = {}
+        # Те же достаточные статистики, что и у /stats (events, bloating, diarrhea, Σ, Σ²).
+        self._ingredients: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+        self._totals = [0, 0, 0, 0, 0]
+        self._version = 0
+        self._snapshot: DashboardSnapshot | None = None
+
+    def refresh(self) -> bool:
+        """Подтягивает новые файлы; True, если агрегаты изменились."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        new_meals, meals_removed = self._scan(self.food_log_dir, self._food_state)
+        new_conditions, conditions_removed = self._scan(
+            self.condition_log_dir, self._condition_state
+        )
+        if meals_removed or conditions_removed:
+            # Логи только дописываются; удаление — редкий ручной случай, пересчитываем всё.
+            self._reset()
+            return self._refresh()
+        for name in new_meals:
+            self._add_meal(name)
+        for name in new_conditions:
+            self._add_condition(name)
+        if not new_meals and not new_conditions and self._snapshot is not None:
+            return False
+        self._version += 1
+        self._snapshot = self._build_snapshot()
+        return True
+
+    def snapshot(self) -> DashboardSnapshot:
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            return self._snapshot
+
+    @staticmethod
+    def _scan(directory: Path, state: _DirectoryState) -> Tuple[List[str], bool]:
+        if not directory.exists():
+            return [], bool(state.names)
+        mtime_ns = directory.stat().st_mtime_ns
+        if mtime_ns == state.mtime_ns:
+            return [], False
+        # У mtime грубое разрешение: файл, созданный в тот же тик, что и прошлый
+        # листинг, не сдвинет его. Свежему mtime не доверяем и листаем ещё раз.
+        state.mtime_ns = mtime_ns if time.time_ns() - mtime_ns > MTIME_SETTLE_NS else None
+        with os.scandir(directory) as scan:
+            names = {item.name for item in scan if item.name.endswith(".md") and item.is_file()}
+        removed = bool(state.names - names)
+        added = sorted(names - state.names)
+        state.names = names
+        return added, removed
+
+    def _add_meal(self, name: str) -> None:
+        record = read_meal(self.food_log_dir / name)
+        if record is None:
+            return
+        self._meals[record.key] = record
+        self._meals_per_day[record.timestamp.date()] += 1
+        condition = self._conditions.get(record.key)
+        if condition is not None:
+            self._pair(record, condition)
+
+    def _add_condition(self, name: str) -> None:
+        observation = read_condition(self.condition_log_dir / name)
+        if observation is None:
+            return
+        self._conditions[observation.key] = observation
+        if observation.well_being is not None:
+            bucket = self._well_being[observation.timestamp.date()]
+            bucket[0] += observation.well_being
+            bucket[1] += 1
+        if observation.breath_smell is not None:
+            self._breath[observation.key] = (observation.timestamp, observation.breath_smell)
+        meal = self._meals.get(observation.key)
+        if meal is not None:
+            self._pair(meal, observation)
+
+    def _pair(self, meal: MealRecord, condition: ConditionObservation) -> None:
+        # Приём пищи и его оценка пишутся под одним именем файла, но могут появиться
+        # в разных проходах refresh() — учитываем пару тогда, когда пришла вторая половина.
+        if None in (condition.bloating, condition.diarrhea, condition.well_being):
+            return
+        well_being = condition.well_being
+        counts = [1, int(condition.bloating), int(condition.diarrhea), well_being, well_being**2]
+        for position, value in enumerate(counts):
+            self._totals[position] += value
+        for ingredient in dict.fromkeys(meal.foods):
+            stored = self._ingredients[ingredient]
+            for position, value in enumerate(counts):
+                stored[position] += value
+
+    def _build_snapshot(self) -> DashboardSnapshot:
+        recent = heapq.nlargest(
+            RECENT_MEALS, self._meals.values(), key=lambda record: record.timestamp
+        )
+        suspects: List[IngredientStat] = []
+        if self._totals[0]:
+            suspects = [
+                score_ingredient(name, counts, self._totals, "bloating")
+                for name, counts in self._ingredients.items()
+                if counts[0] >= self.min_exposures
+            ]
+            suspects.sort(key=lambda stat: (-stat.ci_low, -stat.exposures, stat.ingredient))
+        return DashboardSnapshot(
+            version=self._version,
+            updated_at=datetime.now(),
+            meals_per_day=sorted(self._meals_per_day.items()),
+            recent_meals=recent,
+            well_being=[
+                (day, total / count) for day, (total, count) in sorted(self._well_being.items())
+            ],
+            breath=sorted(self._breath.values()),
+            suspects=suspects[:TOP_SUSPECTS],
+        )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+Window = Tuple[float, float]
+
+DEFAULT_WINDOWS: Tuple[Window, ...] = ((0.0, 3.0), (3.0, 12.0), (12.0, 48.0))
+
+
+@dataclass(slots=True)
+class LaggedExposures:
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+    shape: Tuple[int, int]
+    vocabulary: List[str]
+    windows: Tuple[Window, ...]
+
+    def feature_names(self) -> List[str]:
+        return [
+            f"{ingredient}@{low:g}-{high:g}h"
+            for low, high in self.windows
+            for ingredient in self.vocabulary
+        ]
+
+    def to_dense(self) -> np.ndarray:
+        matrix = np.zeros(self.shape, dtype=np.int32)
+        matrix[self.rows, self.cols] = self.values
+        return matrix
+
+    def to_sparse(self):
+        from scipy.sparse import csr_matrix
+
+        return csr_matrix((self.values, (self.rows, self.cols)), shape=self.shape)
+
+
+def parse_windows(spec: str) -> Tuple[Window, ...]:
+    windows: List[Window] = []
+    for chunk in spec.split(","):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        low, sep, high = chunk.partition("-")
+        if not sep:
+            raise ValueError(f"Invalid window '{chunk}', expected 'LOW-HIGH' in hours")
+        windows.append((float(low), float(high)))
+    return validate_windows(windows)
+
+
+def validate_windows(windows: Sequence[Window]) -> Tuple[Window, ...]:
+    if not windows:
+        raise ValueError("At least one look-back window is required")
+    for low, high in windows:
+        if low < 0 or high <= low:
+            raise ValueError(f"Invalid window {low:g}-{high:g}h")
+    return tuple((float(low), float(high)) for low, high in windows)
+
+
+def to_epoch_seconds(times: Sequence[datetime] | np.ndarray) -> np.ndarray:
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[s]").astype(np.int64)
+    if isinstance(times, np.ndarray):
+        return times.astype(np.int64)
+    # Осознанно игнорируем tzinfo: все записи хранилища в одном часовом поясе.
+    naive = [value.replace(tzinfo=None) for value in times]
+    return np.array(naive, dtype="datetime64[s]").astype(np.int64)
+
+
+def build_lagged_exposures(
+    meal_times: Sequence[datetime] | np.ndarray,
+    meal_foods: Sequence[Sequence[str]],
+    condition_times: Sequence[datetime] | np.ndarray,
+    windows: Sequence[Window] = DEFAULT_WINDOWS,
+    vocabulary: Sequence[str] | None = None,
+) -> LaggedExposures:
+    """Count ingredient exposures in look-back windows before each condition.
+
+    Row ``i`` corresponds to ``condition_times[i]``; column
+    ``w * len(vocabulary) + j`` counts how many meals containing ingredient
+    ``j`` happened ``[low, high)`` hours before it for window ``w``.
+    """
+    windows = validate_windows(windows)
+    if len(meal_times) != len(meal_foods):
+        raise ValueError("meal_times and meal_foods must have the same length")
+
+    if vocabulary is None:
+        vocabulary = sorted({food for foods in meal_foods for food in foods})
+    vocab = list(vocabulary)
+    index: Dict[str, int] = {food: position for position, food in enumerate(vocab)}
+
+    meal_seconds = to_epoch_seconds(meal_times) if len(meal_times) else np.empty(0, np.int64)
+    condition_seconds = (
+        to_epoch_seconds(condition_times) if len(condition_times) else np.empty(0, np.int64)
+    )
+
+    # Плоский список (приём пищи, ингредиент), отсортированный по времени приёма.
+    codes_per_meal = [[index[food] for food in foods if food in index] for foods in meal_foods]
+    lengths = np.fromiter((len(codes) for codes in codes_per_meal), dtype=np.int64)
+    entry_codes = np.fromiter(
+        (code for codes in codes_per_meal for code in codes),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    entry_times = np.repeat(meal_seconds, lengths)
+    order = np.argsort(entry_times, kind="stable")
+    entry_times = entry_times[order]
+    entry_codes = entry_codes[order]
+
+    n_rows = len(condition_seconds)
+    n_cols = len(vocab) * len(windows)
+    keys: List[np.ndarray] = []
+    for window_index, (low, high) in enumerate(windows):
+        start = np.searchsorted(entry_times, condition_seconds - int(high * 3600), side="right")
+        stop = np.searchsorted(entry_times, condition_seconds - int(low * 3600), side="right")
+        counts = stop - start
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        row_ids = np.repeat(np.arange(n_rows, dtype=np.int64), counts)
+        offsets = np.cumsum(counts) - counts
+        entry_index = np.arange(total, dtype=np.int64) - np.repeat(offsets - start, counts)
+        columns = entry_codes[entry_index] + window_index * len(vocab)
+        keys.append(row_ids * n_cols + columns)
+
+    if keys:
+        unique_keys, values = np.unique(np.concatenate(keys), return_counts=True)
+    else:
+        unique_keys = np.empty(0, dtype=np.int64)
+        values = np.empty(0, dtype=np.int64)
+    return LaggedExposures(
+        rows=unique_keys // max(n_cols, 1),
+        cols=unique_keys % max(n_cols, 1),
+        values=values.astype(np.int32),
+        shape=(n_rows, n_cols),
+        vocabulary=vocab,
+        windows=windows,
+    )
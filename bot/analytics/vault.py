@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Sequence
+
+from ..services.markdown_helpers import parse_frontmatter, unwrap_wiki_link
+
+LOG_STEM_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+@dataclass(slots=True)
+class MealRecord:
+    key: str
+    timestamp: datetime
+    foods: List[str]
+
+
+@dataclass(slots=True)
+class ConditionObservation:
+    key: str
+    timestamp: datetime
+    bloating: bool | None = None
+    diarrhea: bool | None = None
+    well_being: int | None = None
+    breath_smell: str | None = None
+
+
+def load_frontmatter(path: Path) -> dict:
+    return parse_frontmatter(path.read_text(encoding="utf-8"))
+
+
+def clean_food_entry(value: str) -> str:
+    return unwrap_wiki_link(value).lower()
+
+
+def parse_record_timestamp(stem: str, payload: dict) -> datetime | None:
+    # Имя файла хранит секунды, frontmatter — только минуты.
+    try:
+        return datetime.strptime(stem[:19], LOG_STEM_FORMAT)
+    except ValueError:
+        pass
+    raw_date = payload.get("date")
+    raw_time = payload.get("time")
+    if raw_date is None:
+        return None
+    if isinstance(raw_date, datetime):
+        return raw_date.replace(tzinfo=None)
+    if isinstance(raw_date, date):
+        raw_date = raw_date.isoformat()
+    if isinstance(raw_time, int):
+        # YAML 1.1 читает HH:MM без кавычек как шестидесятеричное число.
+        raw_time = f"{raw_time // 60:02d}:{raw_time % 60:02d}"
+    try:
+        return datetime.strptime(f"{raw_date} {raw_time or '00:00'}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+
+
+def read_meal(file: Path) -> MealRecord | None:
+    payload = load_frontmatter(file)
+    foods: Sequence[str] = payload.get("foods") or []
+    cleaned = [clean_food_entry(str(item)) for item in foods if item]
+    timestamp = parse_record_timestamp(file.stem, payload)
+    if not cleaned or timestamp is None:
+        return None
+    return MealRecord(key=file.stem, timestamp=timestamp, foods=cleaned)
+
+
+def read_condition(file: Path) -> ConditionObservation | None:
+    payload = load_frontmatter(file)
+    timestamp = parse_record_timestamp(file.stem, payload)
+    if timestamp is None:
+        return None
+    symptoms = payload.get("symptoms") or {}
+    observation = ConditionObservation(key=file.stem, timestamp=timestamp)
+    for field in ("bloating", "diarrhea", "well_being"):
+        value = payload.get(field, symptoms.get(field))
+        if value is not None:
+            setattr(observation, field, int(value) if field == "well_being" else bool(value))
+    if payload.get("breath_smell") is not None:
+        observation.breath_smell = str(payload["breath_smell"])
+    return observation
+
+
+def load_meals(directory: Path) -> List[MealRecord]:
+    result: List[MealRecord] = []
+    if not directory.exists():
+        return result
+    for file in directory.glob("*.md"):
+        record = read_meal(file)
+        if record is not None:
+            result.append(record)
+    result.sort(key=lambda record: record.timestamp)
+    return result
+
+
+def load_condition_observations(directory: Path) -> List[ConditionObservation]:
+    result: List[ConditionObservation] = []
+    if not directory.exists():
+        return result
+    for file in directory.glob("*.md"):
+        observation = read_condition(file)
+        if observation is not None:
+            result.append(observation)
+    result.sort(key=lambda record: record.timestamp)
+    return result
@@ -2,42 +2,128 @@ from __future__ import annotations
 
 import socket
 import asyncio
-from typing import Sequence, Tuple
+import logging
+import signal
+from typing import TYPE_CHECKING, Sequence, Tuple
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.bot import DefaultBotProperties
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiohttp import ClientTimeout, TCPConnector
 
 from .config import Settings, load_settings
-from .handlers import add_food, breath, common, condition, photo, start
+from .fsm.storage import SQLiteStorage
+from .handlers import (
+    admin,
+    add_food,
+    breath,
+    common,
+    condition,
+    history,
+    photo,
+    start,
+    stats,
+    suggest,
+)
 from .logging_setup import setup_logging
+from .metrics import FSM_STORAGE_KEYS, start_metrics_server
+from .middlewares.admission import AdmissionControlMiddleware
+from .middlewares.metrics import MetricsMiddleware
+from .middlewares.tracing import TracingMiddleware
+from .profiler import LoopBlockWatchdog, ProfilerController
 from .services.composition_extractor import CompositionExtractor
 from .services.breath_reminder_service import BreathReminderService
 from .services.breath_scheduler import BreathReminderScheduler
 from .services.condition_service import ConditionService
 from .services.file_store import FileStore
 from .services.food_event_service import FoodEventService
+from .services.food_log_index import FoodLogIndex
 from .services.foods_service import FoodsService
+from .services.ingredient_canonicalizer import IngredientCanonicalizer
+from .services.ingredient_index import IngredientPrefixIndex
+from .services.lease import SQLiteLease
+from .services.model_router import ModelProfile, ModelRouter
+from .services.photo_fetcher import PhotoFetcher
+from .services.persist_queue import PersistQueue
 from .services.photo_intake import (
     PhotoIntakeConfig,
     PhotoIntakeService,
     PhotoIntakeStubService,
 )
+from .services.recent_meals import RecentMealsCache
+from .services.recipe_store import RecipeStore
+from .services.recognition_cache import RecognitionCache
+from .services.symptom_stats import SymptomStatsService
 from .services.time_service import TimeService
+from .ui.session_card import SessionCardEditor
+from .tracing import TraceSink
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+SHARED_STATE_PATH = ".bot/state.sqlite3"
+RECOGNITION_CACHE_PATH = ".cache/recognition"
+TRACES_PATH = ".bot/traces.jsonl"
+PROFILES_PATH = ".bot/profiles"
+SIGNAL_PROFILE_SECONDS = 30
+
+logger = logging.getLogger(__name__)
 
 
 def build_dispatcher(settings: Settings) -> Tuple[Dispatcher, BreathReminderScheduler]:
-    storage = MemoryStorage()
+    if settings.fsm_storage == "sqlite":
+        storage = SQLiteStorage(settings.data_dir / SHARED_STATE_PATH)
+    else:
+        storage = MemoryStorage()
     dispatcher = Dispatcher(storage=storage)
+    if isinstance(storage, SQLiteStorage):
+        FSM_STORAGE_KEYS.set_function(storage.size)
+    else:
+        FSM_STORAGE_KEYS.set_function(lambda: len(storage.storage))
+    trace_sink = TraceSink(
+        settings.data_dir / TRACES_PATH,
+        sample_rate=settings.trace_sample_rate,
+        slow_threshold=settings.trace_slow_ms / 1000,
+    )
+    dispatcher.update.outer_middleware(TracingMiddleware(trace_sink))
+    # Синхронные обработчики aiogram вызывает в потоке: ожидание записи не держит цикл.
+    dispatcher.shutdown.register(trace_sink.close)
+    # Метрики регистрируются первыми, чтобы в латентность попадало и ожидание в очереди.
+    dispatcher.message.middleware(MetricsMiddleware("message"))
+    dispatcher.callback_query.middleware(MetricsMiddleware("callback_query"))
+    dispatcher.inline_query.middleware(MetricsMiddleware("inline_query"))
+    dispatcher.message.middleware(
+        AdmissionControlMiddleware(
+            global_limit=settings.expensive_concurrency,
+            per_user_limit=settings.expensive_per_user,
+            max_queue=settings.expensive_queue_limit,
+        )
+    )
 
     file_store = FileStore(settings.data_dir)
     time_service = TimeService(settings.timezone)
-    foods_service = FoodsService(file_store)
+    # Поиск по префиксу идёт в памяти воркера, а счётчики использования для ранжирования
+    # лежат в общей базе: переживают перезапуск и одинаковы у всех воркеров.
+    ingredient_index = IngredientPrefixIndex(path=settings.data_dir / SHARED_STATE_PATH)
+    # Последние приёмы пищи хранятся по пользователям в общей базе: их видят все воркеры,
+    # и после перезапуска список не пуст. В FoodLog нет user_id, прогревать из него нечем.
+    recent_meals = RecentMealsCache(path=settings.data_dir / SHARED_STATE_PATH)
+    foods_service = FoodsService(file_store, prefix_index=ingredient_index)
+    ingredient_index.add_many(foods_service.list_names())
     condition_service = ConditionService(file_store)
-    composition_extractor = CompositionExtractor()
+    model_router = (
+        ModelRouter(
+            [ModelProfile(name, price) for name, price in settings.llm_models],
+            slos=settings.llm_slos,
+        )
+        if settings.llm_models
+        else None
+    )
+    composition_extractor = CompositionExtractor(
+        model=settings.llm_model, backup_model=settings.llm_backup_model, router=model_router
+    )
+    dispatcher.shutdown.register(composition_extractor.close)
     breath_reminder_service = BreathReminderService(file_store)
     if settings.photo_intake_url:
         photo_config = PhotoIntakeConfig(
@@ -47,25 +133,95 @@ def build_dispatcher(settings: Settings) -> Tuple[Dispatcher, BreathReminderSche
         photo_intake_service = PhotoIntakeService(photo_config)
     else:
         photo_intake_service = PhotoIntakeStubService()
+    # Таблицу синонимов пополняет администратор командой /alias.
+    canonicalizer = IngredientCanonicalizer(file_store)
+    symptom_stats = SymptomStatsService(settings.data_dir / SHARED_STATE_PATH)
+    food_log_index = FoodLogIndex(
+        file_store, condition_log_dir=condition_service.log_dir, shared=settings.workers > 1
+    )
+    food_log_index.build()
     food_event_service = FoodEventService(
         file_store=file_store,
         foods_service=foods_service,
         condition_service=condition_service,
         time_service=time_service,
+        canonicalizer=canonicalizer,
+        prefix_index=ingredient_index,
+        recent_meals=recent_meals,
+        symptom_stats=symptom_stats,
+        food_log_index=food_log_index,
+    )
+    if symptom_stats.is_empty():
+        # Первый запуск или удалённая база: достаточные статистики собираются из хранилища.
+        # Воркеры могут пересчитывать одновременно: rebuild учитывает каждый приём один раз.
+        events = symptom_stats.rebuild(
+            file_store.resolve(food_event_service.food_log_dir),
+            file_store.resolve(condition_service.log_dir),
+        )
+        logger.info("Symptom statistics rebuilt from %d logged meals", events)
+    # Одновременно фото обрабатывают не больше expensive_concurrency хэндлеров.
+    photo_fetcher = PhotoFetcher(pool_size=settings.expensive_concurrency)
+    recognition_cache = RecognitionCache(settings.data_dir / RECOGNITION_CACHE_PATH)
+    persist_queue = PersistQueue(
+        settings.data_dir / SHARED_STATE_PATH, food_event_service, trace_sink=trace_sink
+    )
+
+    @dispatcher.startup.register
+    async def _start_persist_queue(bot: Bot) -> None:
+        await persist_queue.start(bot)
+
+    @dispatcher.shutdown.register
+    async def _stop_persist_queue() -> None:
+        await persist_queue.stop()
+
+    @dispatcher.shutdown.register
+    async def _close_file_store() -> None:
+        # После остановки очереди записи: пул ввода-вывода и соединения с общей базой
+        # больше никому не нужны.
+        await asyncio.to_thread(file_store.close)
+        recent_meals.close()
+        ingredient_index.close()
+
+    add_food.setup_dependencies(
+        food_event_service,
+        time_service,
+        composition_extractor,
+        photo_fetcher,
+        recognition_cache,
+        persist_queue,
+        # Режим «карточки»: один черновик — одно сообщение, которое правится по шагам.
+        SessionCardEditor() if settings.flow_mode == "card" else None,
+        RecipeStore(settings.data_dir / SHARED_STATE_PATH),
     )
-    add_food.setup_dependencies(food_event_service, time_service, composition_extractor)
     condition.setup_dependencies(condition_service, time_service)
     breath.setup_dependencies(condition_service, time_service, breath_reminder_service)
-    photo.setup_dependencies(photo_intake_service, time_service)
+    photo.setup_dependencies(
+        photo_intake_service, time_service, photo_fetcher, recognition_cache
+    )
+    suggest.setup_dependencies(ingredient_index)
+    stats.setup_dependencies(symptom_stats)
+    history.setup_dependencies(food_log_index)
+    _setup_diagnostics(dispatcher, settings, canonicalizer)
 
-    breath_scheduler = BreathReminderScheduler(breath_reminder_service, time_service)
+    scheduler_lease = (
+        SQLiteLease(settings.data_dir / SHARED_STATE_PATH, "breath_scheduler")
+        if settings.workers > 1
+        else None
+    )
+    breath_scheduler = BreathReminderScheduler(
+        breath_reminder_service, time_service, lease=scheduler_lease
+    )
 
     routers: Sequence = (
         start.router,
+        admin.router,
+        stats.router,
+        history.router,
         add_food.router,
         breath.router,
         condition.router,
         photo.router,
+        suggest.router,
         common.router,
     )
     for router in routers:
@@ -74,6 +230,42 @@ def build_dispatcher(settings: Settings) -> Tuple[Dispatcher, BreathReminderSche
     return dispatcher, breath_scheduler
 
 
+def _setup_diagnostics(
+    dispatcher: Dispatcher, settings: Settings, canonicalizer: IngredientCanonicalizer
+) -> None:
+    watchdog = (
+        LoopBlockWatchdog(settings.loop_block_threshold_ms / 1000)
+        if settings.loop_block_threshold_ms
+        else None
+    )
+    profiler = ProfilerController(settings.data_dir / PROFILES_PATH, watchdog=watchdog)
+    admin.setup_dependencies(profiler, settings.admin_user_ids, canonicalizer)
+    signal_tasks: set[asyncio.Task] = set()
+
+    def _profile_on_signal() -> None:
+        if profiler.running:
+            logger.info("Profiler is already running, SIGUSR1 ignored")
+            return
+        task = asyncio.create_task(profiler.profile(SIGNAL_PROFILE_SECONDS))
+        signal_tasks.add(task)
+        task.add_done_callback(signal_tasks.discard)
+
+    @dispatcher.startup.register
+    async def _start_diagnostics() -> None:
+        if watchdog is not None:
+            await watchdog.start()
+        if hasattr(signal, "SIGUSR1"):
+            # kill -USR1 <pid> снимает профиль без команды в чате.
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, _profile_on_signal)
+
+    @dispatcher.shutdown.register
+    async def _stop_diagnostics() -> None:
+        if hasattr(signal, "SIGUSR1"):
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+        if watchdog is not None:
+            await watchdog.stop()
+
+
 class IPv4AiohttpSession(AiohttpSession):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -81,7 +273,7 @@ class IPv4AiohttpSession(AiohttpSession):
         self._connector_init["family"] = socket.AF_INET
         self._should_reset_connector = True
 
-async def run() -> None:
+async def run(worker_index: int = 0) -> None:
     setup_logging()
     settings = load_settings()
     dispatcher, breath_scheduler = build_dispatcher(settings)
@@ -94,16 +286,37 @@ async def run() -> None:
         session=session,
     )
 
+    metrics_runner: web.AppRunner | None = None
+
     @dispatcher.startup.register
     async def _on_startup() -> None:
+        nonlocal metrics_runner
+        if settings.metrics_port:
+            # У каждого воркера свой реестр, поэтому и свой порт.
+            metrics_runner = await start_metrics_server(
+                settings.metrics_host, settings.metrics_port + worker_index
+            )
         await breath_scheduler.start(bot)
 
     @dispatcher.shutdown.register
     async def _on_shutdown() -> None:
         await breath_scheduler.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
 
-    await dispatcher.start_polling(bot)
+    if settings.webhook_url:
+        from .webhook import run_webhook
+
+        await run_webhook(dispatcher, bot, settings, register_webhook=worker_index == 0)
+    else:
+        await dispatcher.start_polling(bot)
 
 
 def main() -> None:
+    settings = load_settings()
+    if settings.workers > 1:
+        from .workers import run_workers
+
+        run_workers(settings.workers)
+        return
     asyncio.run(run())
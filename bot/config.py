@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
@@ -15,6 +15,28 @@ class Settings:
     timezone: ZoneInfo
     photo_intake_url: str | None
     photo_intake_token: str | None
+    expensive_concurrency: int = 4
+    expensive_per_user: int = 1
+    expensive_queue_limit: int = 16
+    webhook_url: str | None = None
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str | None = None
+    webhook_concurrency: int = 32
+    workers: int = 1
+    fsm_storage: str = "memory"
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int | None = None
+    trace_sample_rate: float = 0.01
+    trace_slow_ms: int = 1000
+    admin_user_ids: frozenset[int] = field(default_factory=frozenset)
+    loop_block_threshold_ms: int = 250
+    flow_mode: str = "messages"
+    llm_model: str | None = None
+    llm_backup_model: str | None = None
+    llm_models: tuple[tuple[str, float], ...] = ()
+    llm_slos: dict[str, float] = field(default_factory=dict)
 
 
 def load_settings(*, use_dotenv: bool = True) -> Settings:
@@ -36,6 +58,26 @@ def load_settings(*, use_dotenv: bool = True) -> Settings:
 
     photo_intake_url = os.environ.get("PHOTO_INTAKE_URL")
     photo_intake_token = os.environ.get("PHOTO_INTAKE_TOKEN")
+    expensive_concurrency = _int_env("EXPENSIVE_CONCURRENCY", 4)
+    expensive_per_user = _int_env("EXPENSIVE_PER_USER", 1)
+    expensive_queue_limit = _int_env("EXPENSIVE_QUEUE_LIMIT", 16)
+
+    webhook_url = os.environ.get("WEBHOOK_URL") or None
+    webhook_path = os.environ.get("WEBHOOK_PATH", "/webhook")
+    if not webhook_path.startswith("/"):
+        webhook_path = f"/{webhook_path}"
+
+    workers = _int_env("WORKERS", 1)
+    fsm_storage = os.environ.get("FSM_STORAGE", "memory").strip().lower()
+    if fsm_storage not in {"memory", "sqlite"}:
+        raise RuntimeError(f"FSM_STORAGE must be 'memory' or 'sqlite', got '{fsm_storage}'")
+    flow_mode = os.environ.get("FLOW_MODE", "messages").strip().lower()
+    if flow_mode not in {"messages", "card"}:
+        raise RuntimeError(f"FLOW_MODE must be 'messages' or 'card', got '{flow_mode}'")
+    if workers > 1:
+        if not webhook_url:
+            raise RuntimeError("WORKERS > 1 requires WEBHOOK_URL: polling allows one consumer")
+        fsm_storage = "sqlite"
 
     return Settings(
         bot_token=token,
@@ -43,4 +85,77 @@ def load_settings(*, use_dotenv: bool = True) -> Settings:
         timezone=timezone,
         photo_intake_url=photo_intake_url,
         photo_intake_token=photo_intake_token,
+        expensive_concurrency=expensive_concurrency,
+        expensive_per_user=expensive_per_user,
+        expensive_queue_limit=expensive_queue_limit,
+        webhook_url=webhook_url,
+        webhook_path=webhook_path,
+        webhook_host=os.environ.get("WEBHOOK_HOST", "0.0.0.0"),
+        webhook_port=_int_env("WEBHOOK_PORT", 8080),
+        webhook_secret=os.environ.get("WEBHOOK_SECRET") or None,
+        webhook_concurrency=_int_env("WEBHOOK_CONCURRENCY", 32),
+        workers=workers,
+        fsm_storage=fsm_storage,
+        metrics_host=os.environ.get("METRICS_HOST", "127.0.0.1"),
+        metrics_port=_int_env("METRICS_PORT", 0) or None,
+        trace_sample_rate=_float_env("TRACE_SAMPLE_RATE", 0.01, maximum=1.0),
+        trace_slow_ms=_int_env("TRACE_SLOW_MS", 1000, minimum=0),
+        admin_user_ids=_parse_user_ids(os.environ.get("ADMIN_USER_IDS", "")),
+        loop_block_threshold_ms=_int_env("LOOP_BLOCK_THRESHOLD_MS", 250, minimum=0),
+        flow_mode=flow_mode,
+        llm_model=os.environ.get("OPENROUTER_MODEL") or None,
+        llm_backup_model=os.environ.get("OPENROUTER_BACKUP_MODEL") or None,
+        llm_models=tuple(_parse_pairs("OPENROUTER_MODELS")),
+        llm_slos=dict(_parse_pairs("LLM_SLO")),
     )
+
+
+def _int_env(name: str, default: int, *, minimum: int = 1) -> int:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be an integer, got '{raw}'") from exc
+    if value < minimum:
+        raise RuntimeError(f"{name} must be >= {minimum}, got {value}")
+    return value
+
+
+def _parse_user_ids(raw: str) -> frozenset[int]:
+    try:
+        return frozenset(int(item) for item in raw.replace(";", ",").split(",") if item.strip())
+    except ValueError as exc:
+        raise RuntimeError(f"ADMIN_USER_IDS must be comma-separated integers, got '{raw}'") from exc
+
+
+def _parse_pairs(name: str) -> list[tuple[str, float]]:
+    # «ключ=число» через запятую; ключ может содержать «:» и «/», как имена моделей.
+    raw = os.environ.get(name, "")
+    pairs = []
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        key, _, value = item.rpartition("=")
+        try:
+            number = float(value)
+        except ValueError:
+            number = -1.0
+        if not key.strip() or number < 0:
+            raise RuntimeError(f"{name} must look like 'name=number,...', got '{raw}'")
+        pairs.append((key.strip(), number))
+    return pairs
+
+
+def _float_env(
+    name: str, default: float, *, minimum: float = 0.0, maximum: float | None = None
+) -> float:
+    raw = os.environ.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be a number, got '{raw}'") from exc
+    if value < minimum or (maximum is not None and value > maximum):
+        raise RuntimeError(f"{name} must be within [{minimum}, {maximum}], got {value}")
+    return value
@@ -0,0 +1,169 @@
+"""Локальный дашборд по хранилищу (NiceGUI). Бот его не импортирует."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from nicegui import app, background_tasks, run, ui
+
+from .analytics.dashboard_cache import DashboardCache, DashboardSnapshot
+from .logging_setup import setup_logging
+
+BREATH_LEVELS = {"none": 0, "weak": 1, "medium": 2, "strong": 3}
+BREATH_TITLES = ["нет", "слабый", "средний", "сильный"]
+
+logger = logging.getLogger(__name__)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Дашборд: приёмы пищи, самочувствие, запах изо рта и подозрительные продукты."
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(os.environ.get("DATA_DIR", "./data")),
+        help="Путь к хранилищу. По умолчанию DATA_DIR или ./data.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--interval", type=float, default=5.0, help="Как часто проверять новые файлы, секунды."
+    )
+    return parser
+
+
+def _bar_chart(snapshot: DashboardSnapshot) -> Dict[str, Any]:
+    return {
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {
+            "type": "category",
+            "data": [day.isoformat() for day, _ in snapshot.meals_per_day],
+        },
+        "yAxis": {"type": "value", "minInterval": 1},
+        "series": [{"type": "bar", "data": [count for _, count in snapshot.meals_per_day]}],
+    }
+
+
+def _well_being_chart(snapshot: DashboardSnapshot) -> Dict[str, Any]:
+    return {
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {
+            "type": "category",
+            "data": [day.isoformat() for day, _ in snapshot.well_being],
+        },
+        "yAxis": {"type": "value", "min": 1, "max": 10},
+        "series": [
+            {
+                "type": "line",
+                "smooth": True,
+                "data": [round(value, 2) for _, value in snapshot.well_being],
+            }
+        ],
+    }
+
+
+def _breath_chart(snapshot: DashboardSnapshot) -> Dict[str, Any]:
+    return {
+        "tooltip": {"trigger": "axis"},
+        "xAxis": {"type": "time"},
+        "yAxis": {"type": "category", "data": BREATH_TITLES},
+        "series": [
+            {
+                "type": "line",
+                "step": "middle",
+                "data": [
+                    [timestamp.isoformat(), BREATH_LEVELS[level]]
+                    for timestamp, level in snapshot.breath
+                    if level in BREATH_LEVELS
+                ],
+            }
+        ],
+    }
+
+
+def _suspect_rows(snapshot: DashboardSnapshot) -> list[Dict[str, Any]]:
+    return [
+        {
+            "ingredient": stat.ingredient,
+            "cases": f"{stat.with_symptom}/{stat.exposures}",
+            "lift": "—" if math.isnan(stat.lift) else f"{stat.lift:.2f}",
+            "odds": f"{math.exp(stat.log_odds):.2f}",
+            "interval": f"{math.exp(stat.ci_low):.2f}–{math.exp(stat.ci_high):.2f}",
+        }
+        for stat in snapshot.suspects
+    ]
+
+
+def _render(snapshot: DashboardSnapshot) -> None:
+    updated = f"Обновлено: {snapshot.updated_at:%d.%m %H:%M:%S}"
+    ui.label(updated).classes("text-sm text-gray-500")
+    with ui.row().classes("w-full"):
+        with ui.card().classes("flex-1"):
+            ui.label("Приёмы пищи по дням").classes("text-lg")
+            ui.echart(_bar_chart(snapshot)).classes("h-64")
+        with ui.card().classes("flex-1"):
+            ui.label("Самочувствие (среднее за день)").classes("text-lg")
+            ui.echart(_well_being_chart(snapshot)).classes("h-64")
+    with ui.row().classes("w-full"):
+        with ui.card().classes("flex-1"):
+            ui.label("Запах изо рта").classes("text-lg")
+            ui.echart(_breath_chart(snapshot)).classes("h-64")
+        with ui.card().classes("flex-1"):
+            ui.label("Подозрительные продукты (вздутие)").classes("text-lg")
+            ui.table(
+                columns=[
+                    {"name": "ingredient", "label": "Продукт", "field": "ingredient"},
+                    {"name": "cases", "label": "Случаи", "field": "cases"},
+                    {"name": "lift", "label": "Lift", "field": "lift"},
+                    {"name": "odds", "label": "OR", "field": "odds"},
+                    {"name": "interval", "label": "95% ДИ", "field": "interval"},
+                ],
+                rows=_suspect_rows(snapshot),
+                row_key="ingredient",
+            ).classes("w-full")
+    with ui.card().classes("w-full"):
+        ui.label("Последние приёмы пищи").classes("text-lg")
+        for meal in snapshot.recent_meals:
+            ui.label(f"{meal.timestamp:%d.%m %H:%M} — {', '.join(meal.foods)}")
+
+
+def create_dashboard(cache: DashboardCache, interval: float) -> None:
+    # Один refreshable на все вкладки: refresh() перерисовывает каждую открытую
+    # страницу, и NiceGUI отправляет изменения браузерам по websocket.
+    @ui.refreshable
+    def dashboard_body() -> None:
+        _render(cache.snapshot())
+
+    @ui.page("/")
+    def index() -> None:
+        ui.page_title("Food tracker")
+        dashboard_body()
+
+    async def watch_vault() -> None:
+        while True:
+            try:
+                changed = await run.io_bound(cache.refresh)
+            except Exception:
+                logger.exception("Dashboard refresh failed")
+            else:
+                if changed:
+                    dashboard_body.refresh()
+            await asyncio.sleep(interval)
+
+    app.on_startup(lambda: background_tasks.create(watch_vault(), name="dashboard-refresh"))
+
+
+def main() -> None:
+    setup_logging()
+    args = build_parser().parse_args()
+    cache = DashboardCache(args.data_dir.expanduser().resolve())
+    # Полный проход один раз до старта сервера; дальше читаются только новые файлы.
+    cache.refresh()
+    create_dashboard(cache, args.interval)
+    ui.run(host=args.host, port=args.port, title="Food tracker", reload=False, show=False)
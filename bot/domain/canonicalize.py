@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import List
+
+from .normalize import MULTISPACE, normalize_food_name
+
+PERCENT_PATTERN = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+EDGE_PUNCTUATION = " \t.,;:!?-–—\"'«»"
+
+
+def canonical_name(value: str) -> str:
+    # Имя продукта для заметок: без процентов и мусора по краям, но с «ё» как у пользователя.
+    cleaned = PERCENT_PATTERN.sub(" ", normalize_food_name(value))
+    cleaned = MULTISPACE.sub(" ", cleaned)
+    return cleaned.strip(EDGE_PUNCTUATION)
+
+
+def canonical_key(value: str) -> str:
+    # Ключ сравнения: «мёд» и «мед» совпадают, хотя имя заметки остаётся как есть.
+    return canonical_name(value).replace("ё", "е")
+
+
+def trigrams(value: str) -> List[str]:
+    padded = f"  {value} "
+    return [padded[index : index + 3] for index in range(len(padded) - 2)]
+
+
+def max_edit_distance(value: str) -> int:
+    # Короткие названия («банан»/«баран») слишком легко спутать — их не склеиваем.
+    if len(value) < 6 or any(char.isdigit() for char in value):
+        return 0
+    if len(value) < 12:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(left: str, right: str, limit: int) -> int | None:
+    if abs(len(left) - len(right)) > limit:
+        return None
+    if len(left) > len(right):
+        left, right = right, left
+    # Считаем только диагональную полосу ширины 2 * limit + 1.
+    outside = limit + 1
+    previous = [column if column <= limit else outside for column in range(len(right) + 1)]
+    for row in range(1, len(left) + 1):
+        left_char = left[row - 1]
+        low = max(1, row - limit)
+        high = min(len(right), row + limit)
+        current = [outside] * (len(right) + 1)
+        if row <= limit:
+            current[0] = row
+        best = current[low - 1]
+        for column in range(low, high + 1):
+            value = previous[column - 1] + (left_char != right[column - 1])
+            if previous[column] + 1 < value:
+                value = previous[column] + 1
+            if current[column - 1] + 1 < value:
+                value = current[column - 1] + 1
+            current[column] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return None
+        previous = current
+    distance = previous[-1]
+    return distance if distance <= limit else None
+
+
+def typo_distance(word: str, known: str) -> int | None:
+    # Опечатка не трогает первую букву: «вареная»/«жареная» — разные способы
+    # приготовления, а не описка, хотя между ними одна правка.
+    if not word or word[:1] != known[:1]:
+        return None
+    limit = min(max_edit_distance(word), max_edit_distance(known))
+    if limit == 0:
+        return None
+    return bounded_levenshtein(word, known, limit)
+
+
+def word_typo_distance(left: str, right: str) -> int | None:
+    """Расстояние между названиями, отличающимися опечаткой ровно в одном слове, иначе None."""
+    left_words = Counter(left.split())
+    right_words = Counter(right.split())
+    only_left = list((left_words - right_words).elements())
+    only_right = list((right_words - left_words).elements())
+    if len(only_left) != 1 or len(only_right) != 1:
+        return None
+    return typo_distance(only_left[0], only_right[0])
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import re
+from typing import List
+
+# «Состав:», «Состав продукта:», «Ингредиенты:» — дальше идёт сам список.
+LABEL_PREFIX = re.compile(
+    r"(?:^|(?<=[\s.,;:!]))(?:состав(?:\s+продукта)?|ингредиенты)\s*[:—–-]\s*", re.IGNORECASE
+)
+# Разделы, которые на этикетке идут после состава. Ищем по lower() без IGNORECASE:
+# с ним юникодная альтернатива медленнее в разы.
+LABEL_END = re.compile(
+    r"(?:пищевая|энергетическая)\s+ценность|может\s+содержать|содержит\s+следы"
+    r"|срок\s+годности|условия\s+хранения|хранить\s+при|изготовитель"
+)
+# «Е 330», «Е-330» (часто с кириллической «Е») → «E330».
+E_NUMBER = re.compile(r"(?<!\w)[EЕ][\s-]?(\d{3,4}[a-dа-г]?)(?!\d)")
+STRUCTURE = re.compile(r"[()\[\]{},;]")
+OPENING = "([{"
+CLOSING = ")]}"
+EDGE = " \t.,;:*•-–—"
+MIN_BARE_ITEMS = 3
+
+
+def split_label(text: str) -> List[str]:
+    """Делит список состава по «,» и «;» верхнего уровня.
+
+    Скобки не разрываются («эмульгатор (E471, лецитин)» — одна позиция), как и
+    десятичная запятая («соль 0,5%»)."""
+    items: List[str] = []
+    depth = 0
+    start = 0
+    last = len(text) - 1
+    # Обходим только скобки и разделители, а не каждый символ строки.
+    for match in STRUCTURE.finditer(text):
+        char = match.group()
+        index = match.start()
+        if char in OPENING:
+            depth += 1
+        elif char in CLOSING:
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            if (
+                char == ","
+                and 0 < index < last
+                and text[index - 1].isdigit()
+                and text[index + 1].isdigit()
+            ):
+                continue
+            items.append(text[start:index])
+            start = index + 1
+    items.append(text[start:])
+    return [item for item in map(_clean_item, items) if item]
+
+
+def _clean_item(item: str) -> str:
+    item = " ".join(item.split()).strip(EDGE)
+    return E_NUMBER.sub(r"E\1", item) if "Е" in item or "E" in item else item
+
+
+def parse_label(text: str, *, require_prefix: bool = False) -> List[str] | None:
+    """Ингредиенты из вставленного текста этикетки или None, если это не этикетка.
+
+    Этикеткой считается текст с префиксом «Состав:» или одна строка, в которой
+    хотя бы три позиции через запятую. Обычный список «по строке на продукт»
+    возвращает None и разбирается как раньше. С require_prefix годится только
+    текст с префиксом: «борщ, котлета, пюре» там, где ждут блюда, — не этикетка."""
+    match = LABEL_PREFIX.search(text)
+    if match is not None:
+        body = text[match.end() :]
+    elif require_prefix or "\n" in text.strip():
+        return None
+    elif text.count(",") + text.count(";") < MIN_BARE_ITEMS - 1:
+        return None
+    else:
+        body = text
+    # Переносы строк на этикетке — вёрстка, а не границы позиций.
+    body = body.replace("-\n", "").replace("\n", " ")
+    lowered = body.lower()
+    end = LABEL_END.search(lowered)
+    if end is not None and len(lowered) == len(body):
+        body = body[: end.start()]
+    items = split_label(body)
+    if match is None and len(items) < MIN_BARE_ITEMS:
+        return None
+    return items or None
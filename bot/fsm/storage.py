@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def open_shared_database(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(
+        path, timeout=30, isolation_level=None, check_same_thread=False
+    )
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage shared by several bot processes through one SQLite file (WAL)."""
+
+    def __init__(self, path: Path):
+        self._connection = open_shared_database(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            "key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._lock = threading.Lock()
+        self._key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+    def _key(self, key: StorageKey) -> str:
+        return self._key_builder.build(key)
+
+    async def _call(self, func, *args):
+        return await asyncio.to_thread(self._locked, func, *args)
+
+    def _locked(self, func, *args):
+        with self._lock:
+            return func(*args)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._call(self._set_state, self._key(key), value)
+
+    def _set_state(self, key: str, state: str | None) -> None:
+        self._connection.execute(
+            "INSERT INTO fsm (key, state) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+            (key, state),
+        )
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        row = await self._call(self._fetch, self._key(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        payload = json.dumps(dict(data), ensure_ascii=False, default=_json_default)
+        await self._call(self._set_data, self._key(key), payload)
+
+    def _set_data(self, key: str, payload: str) -> None:
+        self._connection.execute(
+            "INSERT INTO fsm (key, data) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+            (key, payload),
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._call(self._fetch, self._key(key))
+        return json.loads(row[1]) if row else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        payload = json.loads(json.dumps(dict(data), ensure_ascii=False, default=_json_default))
+        return await self._call(self._update_data, self._key(key), payload)
+
+    def _update_data(self, key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # BEGIN IMMEDIATE сериализует read-modify-write между процессами.
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._fetch(key)
+            current = json.loads(row[1]) if row else {}
+            current.update(payload)
+            self._set_data(key, json.dumps(current, ensure_ascii=False))
+            self._connection.execute("COMMIT")
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        return current
+
+    def _fetch(self, key: str):
+        return self._connection.execute(
+            "SELECT state, data FROM fsm WHERE key = ?", (key,)
+        ).fetchone()
+
+    def size(self) -> int:
+        return self._locked(
+            lambda: self._connection.execute("SELECT COUNT(*) FROM fsm").fetchone()[0]
+        )
+
+    async def close(self) -> None:
+        await self._call(self._connection.close)
@@ -1,45 +1,89 @@
 from __future__ import annotations
 
+import asyncio
 import html
-from typing import List
+from typing import Dict, List
 
 from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.filters.state import StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
+from ..domain.canonicalize import canonical_key
+from ..domain.label_parser import parse_label, split_label
 from ..domain.models import Condition, ConditionDraft, FoodEventDraft
+from ..domain.normalize import deduplicate_preserve_order
 from ..fsm.states import FoodLogStates
+from ..middlewares.admission import EXPENSIVE_FLAG
 from ..services.composition_extractor import CompositionExtractor
 from ..services.food_event_service import FoodEventService
+from ..services.persist_queue import PENDING_TEXT, PersistQueue, persisted_text
+from ..services.photo_fetcher import PhotoFetcher, PhotoTooLargeError
+from ..services.recipe_store import RecipeStore
+from ..services.recognition_cache import RecognitionCache
 from ..services.time_service import TimeService
-from ..ui.callbacks import AddFlowAction, ConditionBoolAction, ConditionWellBeingAction
+from ..ui.session_card import SessionCardEditor
+from ..ui.callbacks import (
+    AddFlowAction,
+    ConditionBoolAction,
+    ConditionWellBeingAction,
+    RepeatMealAction,
+)
 from ..ui.keyboards import (
     adding_foods_keyboard,
     condition_bool_keyboard,
     condition_well_being_keyboard,
     confirm_finish_keyboard,
     composition_result_keyboard,
+    recent_meals_keyboard,
     start_keyboard,
 )
 
 router = Router()
 
+SOURCE_TITLES = {
+    "photo": "Распознанный состав",
+    "guess": "Предположенный состав",
+    "label": "Состав с этикетки",
+}
+SOURCE_LABELS = {
+    "photo": "распознавания состава по фото",
+    "guess": "предположения состава",
+    "label": "этикетки",
+}
+
 _food_event_service_instance: FoodEventService | None = None
 _time_service_instance: TimeService | None = None
 _composition_extractor: CompositionExtractor | None = None
+_photo_fetcher_instance: PhotoFetcher | None = None
+_recognition_cache: RecognitionCache | None = None
+_persist_queue: PersistQueue | None = None
+_card_editor: SessionCardEditor | None = None
+_recipe_store: RecipeStore | None = None
 
 
 def setup_dependencies(
     food_event_service: FoodEventService,
     time_service: TimeService,
     composition_extractor: CompositionExtractor | None = None,
+    photo_fetcher: PhotoFetcher | None = None,
+    recognition_cache: RecognitionCache | None = None,
+    persist_queue: PersistQueue | None = None,
+    card_editor: SessionCardEditor | None = None,
+    recipe_store: RecipeStore | None = None,
 ) -> None:
     global _food_event_service_instance, _time_service_instance, _composition_extractor
+    global _photo_fetcher_instance, _recognition_cache, _persist_queue, _card_editor
+    global _recipe_store
     _food_event_service_instance = food_event_service
     _time_service_instance = time_service
     _composition_extractor = composition_extractor
+    _photo_fetcher_instance = photo_fetcher or PhotoFetcher()
+    _recognition_cache = recognition_cache
+    _persist_queue = persist_queue
+    _card_editor = card_editor
+    _recipe_store = recipe_store
 
 
 def _food_event_service() -> FoodEventService:
@@ -57,6 +101,42 @@ def _time_service() -> TimeService:
 def _composition_service() -> CompositionExtractor | None:
     return _composition_extractor
 
+
+def _photo_fetcher() -> PhotoFetcher:
+    if _photo_fetcher_instance is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("PhotoFetcher is not configured")
+    return _photo_fetcher_instance
+
+
+async def _cached_recognition(kind: str, message: Message) -> str | None:
+    if _recognition_cache is None:
+        return None
+    return await _recognition_cache.get(kind, getattr(message.photo[-1], "file_unique_id", None))
+
+
+async def _remember_recognition(kind: str, message: Message, text: str) -> None:
+    if _recognition_cache is not None and text.strip():
+        file_unique_id = getattr(message.photo[-1], "file_unique_id", None)
+        await _recognition_cache.put(kind, file_unique_id, text)
+
+
+async def _reply(
+    message: Message,
+    state: FSMContext,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    *,
+    immediate: bool = False,
+) -> int | None:
+    # В режиме карточки шаг правит одно сообщение черновика, иначе шлёт новое.
+    if _card_editor is not None:
+        return await _card_editor.show(
+            message, state, text, reply_markup, immediate=immediate
+        )
+    sent = await message.answer(text, reply_markup=reply_markup)
+    return getattr(sent, "message_id", None)
+
+
 @router.message(Command("add"))
 async def cmd_add(message: Message, state: FSMContext) -> None:
     await _start_flow(message, state)
@@ -73,7 +153,9 @@ async def _start_flow(message: Message, state: FSMContext) -> None:
     draft = FoodEventDraft(started_at=_time_service().now())
     await state.update_data(draft=draft.model_dump())
     await state.set_state(FoodLogStates.adding_foods)
-    await message.answer(
+    await _reply(
+        message,
+        state,
         "Введите ингредиенты, каждый с новой строки. "
         "После этого используйте кнопки ниже, чтобы завершить или продолжить.",
         reply_markup=adding_foods_keyboard(),
@@ -82,9 +164,13 @@ async def _start_flow(message: Message, state: FSMContext) -> None:
 
 @router.message(FoodLogStates.adding_foods)
 async def handle_foods_input(message: Message, state: FSMContext) -> None:
-    foods = _extract_lines(message.text or "")
+    # Вставленный текст этикетки делим на позиции, а не сохраняем одной строкой.
+    text = message.text or ""
+    foods = parse_label(text) or _extract_lines(text)
     if not foods:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Не нашёл текста с ингредиентами. Напишите список строками.",
             reply_markup=adding_foods_keyboard(),
         )
@@ -93,9 +179,18 @@ async def handle_foods_input(message: Message, state: FSMContext) -> None:
     draft = await _get_draft(state)
     draft.append_foods(foods)
     await state.update_data(draft=draft.model_dump())
+    data = await state.get_data()
+    dishes = data.get("pending_dishes")
+    if dishes and len(dishes) == 1 and _is_edit_of(foods, data.get("pending_lines") or []):
+        # Пользователь прислал исправленный вариант предложенного состава одного блюда:
+        # он заменяет предложение и запоминается как рецепт.
+        await state.update_data(pending_lines=None, pending_source=None, pending_dishes=None)
+        await _learn_recipes(state, {next(iter(dishes)): foods})
 
     preview = "\n".join(f"• {item}" for item in draft.foods_raw[-5:])
-    await message.answer(
+    await _reply(
+        message,
+        state,
         f"Добавил {len(foods)} позиций. Всего: {len(draft.foods_raw)}.\n{preview}",
         reply_markup=adding_foods_keyboard(),
     )
@@ -116,7 +211,9 @@ async def cb_finish(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     await state.set_state(FoodLogStates.confirm_finish)
     preview = "\n".join(f"• {item}" for item in draft.foods_raw)
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Проверьте список ингредиентов. Готовы перейти к оценке состояния?\n"
         f"{preview}",
         reply_markup=confirm_finish_keyboard(),
@@ -127,7 +224,9 @@ async def cb_finish(callback: CallbackQuery, state: FSMContext) -> None:
 async def cb_back_to_adding(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     await state.set_state(FoodLogStates.adding_foods)
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Введите дополнительные ингредиенты или завершите ввод.",
         reply_markup=adding_foods_keyboard(),
     )
@@ -144,11 +243,14 @@ async def cb_back_to_adding(callback: CallbackQuery, state: FSMContext) -> None:
 )
 async def cb_cancel(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
-    await state.clear()
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Запись отменена. Нажмите «Добавить еду», чтобы начать заново.",
         reply_markup=start_keyboard(),
+        immediate=True,
     )
+    await state.clear()
 
 
 @router.callback_query(FoodLogStates.confirm_finish, AddFlowAction.filter(F.action == "confirm"))
@@ -161,11 +263,59 @@ async def cb_confirm_finish(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
     await state.set_state(FoodLogStates.ask_condition_bloating)
     await state.update_data(condition=ConditionDraft().model_dump())
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Есть ли вздутие?", reply_markup=condition_bool_keyboard("bloating")
     )
 
 
+@router.callback_query(AddFlowAction.filter(F.action == "repeat"))
+async def cb_repeat_menu(callback: CallbackQuery) -> None:
+    cache = _food_event_service().recent_meals
+    user_id = callback.from_user.id if callback.from_user else None
+    if cache is not None:
+        await cache.load(user_id)
+    meals = cache.recent(user_id) if cache is not None else []
+    if not meals:
+        await callback.answer("Пока нет сохранённых приёмов пищи.", show_alert=True)
+        return
+    await callback.answer()
+    await callback.message.answer(
+        "Выберите приём пищи, который нужно повторить:",
+        reply_markup=recent_meals_keyboard(meals),
+    )
+
+
+@router.callback_query(RepeatMealAction.filter())
+async def cb_repeat_meal(
+    callback: CallbackQuery, callback_data: RepeatMealAction, state: FSMContext
+) -> None:
+    cache = _food_event_service().recent_meals
+    user_id = callback.from_user.id if callback.from_user else None
+    if cache is not None:
+        await cache.load(user_id)
+    foods = cache.get(user_id, callback_data.key) if cache is not None else None
+    if not foods:
+        await callback.answer("Этот приём пищи больше недоступен.", show_alert=True)
+        return
+
+    await callback.answer()
+    await state.clear()
+    draft = FoodEventDraft(started_at=_time_service().now(), foods_raw=foods)
+    await state.update_data(
+        draft=draft.model_dump(), condition=ConditionDraft().model_dump()
+    )
+    await state.set_state(FoodLogStates.ask_condition_bloating)
+    preview = "\n".join(f"• {item}" for item in foods)
+    await _reply(
+        callback.message,
+        state,
+        f"Повторяю приём пищи:\n{preview}\n\nЕсть ли вздутие?",
+        reply_markup=condition_bool_keyboard("bloating"),
+    )
+
+
 @router.callback_query(FoodLogStates.adding_foods, AddFlowAction.filter(F.action == "photo_start"))
 async def cb_photo_start(callback: CallbackQuery, state: FSMContext) -> None:
     if _composition_service() is None:
@@ -173,63 +323,86 @@ async def cb_photo_start(callback: CallbackQuery, state: FSMContext) -> None:
         return
     await callback.answer()
     await state.set_state(FoodLogStates.waiting_photo)
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Отправьте фото состава продукта. После распознавания вы сможете отредактировать текст.",
         reply_markup=adding_foods_keyboard(),
     )
 
 
-@router.message(FoodLogStates.waiting_photo)
+@router.message(FoodLogStates.waiting_photo, flags={EXPENSIVE_FLAG: True})
 async def handle_photo_for_composition(message: Message, state: FSMContext) -> None:
     if not message.photo:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Пришлите изображение состава. Если передумали, нажмите кнопку «Отменить».",
             reply_markup=adding_foods_keyboard(),
         )
         return
     if message.bot is None:
-        await message.answer("Бот недоступен для загрузки фото. Попробуйте позже.")
+        await _reply(message, state, "Бот недоступен для загрузки фото. Попробуйте позже.")
+        return
+
+    extractor = _composition_service()
+    if extractor is None:
+        await _reply(
+            message,
+            state,
+            "Не получилось распознать состав. Попробуйте снова или введите ингредиенты вручную.",
+            reply_markup=adding_foods_keyboard(),
+        )
         return
 
+    # Повторная отправка того же фото (например, после «Попробовать снова») не качает его заново.
+    recognized = await _cached_recognition("composition", message)
     try:
-        file = await message.bot.get_file(message.photo[-1].file_id)
-        download = await message.bot.download_file(file.file_path)
-        image_bytes = download.read()
+        if recognized is None:
+            async with _photo_fetcher().fetch(message.bot, message.photo[-1]) as image:
+                try:
+                    recognized = await extractor.recognize_from_image(image)
+                except Exception:
+                    recognized = None
+            if recognized is not None:
+                await _remember_recognition("composition", message, recognized)
+    except PhotoTooLargeError:
+        await _reply(
+            message,
+            state,
+            "Фото слишком большое. Отправьте его сжатым, без опции «как файл».",
+            reply_markup=adding_foods_keyboard(),
+        )
+        return
     except Exception:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Не удалось загрузить фото. Попробуйте отправить его ещё раз.",
             reply_markup=adding_foods_keyboard(),
         )
         return
 
-    try:
-        extractor = _composition_service()
-        if extractor is None:
-            raise RuntimeError("service unavailable")
-        recognized = await extractor.recognize_from_image(image_bytes)
-    except Exception:
-        await message.answer(
+    if recognized is None:
+        await _reply(
+            message,
+            state,
             "Не получилось распознать состав. Попробуйте снова или введите ингредиенты вручную.",
             reply_markup=adding_foods_keyboard(),
         )
         return
 
-    lines = _extract_lines(recognized)
+    lines = parse_label(recognized) or _extract_lines(recognized)
     if not lines:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Не удалось извлечь текст из изображения. Попробуйте ещё раз.",
             reply_markup=adding_foods_keyboard(),
         )
         return
 
-    await state.update_data(pending_lines=lines, pending_source="photo")
-    await state.set_state(FoodLogStates.adding_foods)
-    preview = "\n".join(lines)
-    await message.answer(
-        "Распознанный состав (проверьте и при необходимости исправьте):\n"
-        f"<pre>{html.escape(preview)}</pre>",
-        reply_markup=composition_result_keyboard(),
-    )
+    await _offer_lines(message, state, lines, "photo")
 
 
 @router.callback_query(
@@ -244,16 +417,14 @@ async def cb_composition_accept(callback: CallbackQuery, state: FSMContext) -> N
     draft = await _get_draft(state)
     draft.append_foods(lines)
     await state.update_data(
-        draft=draft.model_dump(), pending_lines=None, pending_source=None
+        draft=draft.model_dump(), pending_lines=None, pending_source=None, pending_dishes=None
     )
     await callback.answer()
-    source = data.get("pending_source")
-    source_label = (
-        "распознавания состава по фото"
-        if source == "photo"
-        else "предположения состава"
-    )
-    await callback.message.answer(
+    await _learn_recipes(state, data.get("pending_dishes"))
+    source_label = SOURCE_LABELS.get(data.get("pending_source"), "предположения состава")
+    await _reply(
+        callback.message,
+        state,
         f"Добавил {len(lines)} строк из {source_label}. Продолжайте ввод.",
         reply_markup=adding_foods_keyboard(),
     )
@@ -266,7 +437,7 @@ async def cb_composition_retry(callback: CallbackQuery, state: FSMContext) -> No
     await callback.answer()
     data = await state.get_data()
     source = data.get("pending_source")
-    await state.update_data(pending_lines=None, pending_source=None)
+    await state.update_data(pending_lines=None, pending_source=None, pending_dishes=None)
     if source == "photo":
         await state.set_state(FoodLogStates.waiting_photo)
         text = "Отправьте другое фото состава. Текущее распознавание будет перезаписано."
@@ -275,7 +446,7 @@ async def cb_composition_retry(callback: CallbackQuery, state: FSMContext) -> No
         text = (
             "Введите другое название блюда или отправьте фото блюда для предположения состава."
         )
-    await callback.message.answer(text, reply_markup=adding_foods_keyboard())
+    await _reply(callback.message, state, text, reply_markup=adding_foods_keyboard())
 
 
 @router.callback_query(
@@ -287,80 +458,187 @@ async def cb_guess_start(callback: CallbackQuery, state: FSMContext) -> None:
         return
     await callback.answer()
     await state.set_state(FoodLogStates.guess_input)
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Введите название блюда или отправьте фото блюда, чтобы я предположил состав.",
         reply_markup=adding_foods_keyboard(),
     )
 
 
-@router.message(FoodLogStates.guess_input)
+@router.message(FoodLogStates.guess_input, flags={EXPENSIVE_FLAG: True})
 async def handle_guess_input(message: Message, state: FSMContext) -> None:
+    # Этикетку вместо названия блюда разбираем локально, без запроса к модели. Без
+    # префикса «Состав:» строка через запятую — это несколько блюд, а не этикетка.
+    label = (
+        parse_label(message.text, require_prefix=True)
+        if message.text and not message.photo
+        else None
+    )
+    if label:
+        await _offer_lines(message, state, label, "label")
+        return
+
     extractor = _composition_service()
     if extractor is None:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Предположение состава недоступно. Попробуйте позже.",
             reply_markup=adding_foods_keyboard(),
         )
         return
 
     predicted = ""
+    guesses: Dict[str, List[str]] | None = None
     if message.photo:
         if message.bot is None:
-            await message.answer("Бот недоступен для загрузки фото. Попробуйте позже.")
+            await _reply(message, state, "Бот недоступен для загрузки фото. Попробуйте позже.")
             return
+        guessed = await _cached_recognition("guess", message)
         try:
-            file = await message.bot.get_file(message.photo[-1].file_id)
-            download = await message.bot.download_file(file.file_path)
-            image_bytes = download.read()
+            if guessed is None:
+                async with _photo_fetcher().fetch(message.bot, message.photo[-1]) as image:
+                    try:
+                        guessed = await extractor.guess_from_image(image)
+                    except Exception:
+                        guessed = None
+                if guessed is not None:
+                    await _remember_recognition("guess", message, guessed)
+        except PhotoTooLargeError:
+            await _reply(
+                message,
+                state,
+                "Фото слишком большое. Отправьте его сжатым, без опции «как файл».",
+                reply_markup=adding_foods_keyboard(),
+            )
+            return
         except Exception:
-            await message.answer(
+            await _reply(
+                message,
+                state,
                 "Не удалось загрузить фото. Попробуйте отправить его ещё раз.",
                 reply_markup=adding_foods_keyboard(),
             )
             return
-        try:
-            predicted = await extractor.guess_from_image(image_bytes)
-        except Exception:
-            await message.answer(
+        if guessed is None:
+            await _reply(
+                message,
+                state,
                 "Не получилось предположить состав по фото. Попробуйте снова.",
                 reply_markup=adding_foods_keyboard(),
             )
             return
+        predicted = guessed
     else:
-        dish_name = (message.text or "").strip()
-        if not dish_name:
-            await message.answer(
+        # «борщ\nкотлета\nпюре» и «борщ, котлета, пюре» — три блюда, а не одно название.
+        dishes = _extract_dishes(message.text or "")
+        if not dishes:
+            await _reply(
+                message,
+                state,
                 "Отправьте название блюда текстом или пришлите фото.",
                 reply_markup=adding_foods_keyboard(),
             )
             return
         try:
-            predicted = await extractor.guess_from_text(dish_name)
+            guesses = await _guess_dishes(extractor, dishes, state.key.user_id)
         except Exception:
-            await message.answer(
+            await _reply(
+                message,
+                state,
                 "Не получилось предположить состав по названию. Попробуйте ещё раз.",
                 reply_markup=adding_foods_keyboard(),
             )
             return
+        predicted = "\n".join(
+            deduplicate_preserve_order(
+                line for dish in dishes for line in guesses.get(dish, ())
+            )
+        )
 
     lines = _extract_lines(predicted)
     if not lines:
-        await message.answer(
+        await _reply(
+            message,
+            state,
             "Не удалось получить список ингредиентов. Попробуйте снова.",
             reply_markup=adding_foods_keyboard(),
         )
         return
 
-    await state.update_data(pending_lines=lines, pending_source="guess")
+    await _offer_lines(message, state, lines, "guess", dishes=guesses)
+
+
+async def _guess_dishes(
+    extractor: CompositionExtractor, dishes: List[str], user_id: int | None = None
+) -> Dict[str, List[str]]:
+    # Каждое блюдо кэшируется отдельно: в запрос идут только те, что ещё не встречались,
+    # а несколько новых блюд уходят одним пакетным запросом. Личный рецепт пользователя
+    # важнее общего кэша: это состав, который он сам подтвердил.
+    guesses: Dict[str, List[str]] = {}
+    missing: List[str] = []
+    for dish in deduplicate_preserve_order(dishes):
+        cached = None
+        if _recipe_store is not None:
+            cached = await _recipe_store.lookup(user_id, dish)
+        if not cached and _recognition_cache is not None:
+            cached = await _recognition_cache.get("dish", canonical_key(dish))
+        if cached:
+            guesses[dish] = cached
+        else:
+            missing.append(dish)
+    fresh: Dict[str, List[str]] = {}
+    if len(missing) > 1:
+        fresh = await extractor.guess_batch(missing)
+    # Блюда, которые модель пропустила в пакетном ответе, досылаются по одному.
+    unanswered = [dish for dish in missing if not fresh.get(dish)]
+    answers = await asyncio.gather(*(extractor.guess_from_text(dish) for dish in unanswered))
+    for dish, raw in zip(unanswered, answers):
+        fresh[dish] = _extract_lines(raw)
+    for dish, lines in fresh.items():
+        if lines:
+            guesses[dish] = lines
+            if _recognition_cache is not None:
+                await _recognition_cache.put("dish", canonical_key(dish), lines)
+    return guesses
+
+
+async def _offer_lines(
+    message: Message,
+    state: FSMContext,
+    lines: List[str],
+    source: str,
+    *,
+    dishes: Dict[str, List[str]] | None = None,
+) -> None:
+    # dishes — состав по каждому блюду: после подтверждения он уходит в личные рецепты.
+    await state.update_data(pending_lines=lines, pending_source=source, pending_dishes=dishes)
     await state.set_state(FoodLogStates.adding_foods)
     preview = "\n".join(lines)
-    await message.answer(
-        "Предположенный состав (проверьте и при необходимости исправьте):\n"
+    await _reply(
+        message,
+        state,
+        f"{SOURCE_TITLES[source]} (проверьте и при необходимости исправьте):\n"
         f"<pre>{html.escape(preview)}</pre>",
         reply_markup=composition_result_keyboard(),
     )
 
 
+async def _learn_recipes(state: FSMContext, dishes: Dict[str, List[str]] | None) -> None:
+    if _recipe_store is None or not dishes:
+        return
+    for dish, lines in dishes.items():
+        await _recipe_store.remember(state.key.user_id, dish, lines)
+
+
+def _is_edit_of(foods: List[str], proposed: List[str]) -> bool:
+    # Исправленный состав повторяет хотя бы половину предложенного; иначе это новые продукты.
+    proposed_keys = {canonical_key(line) for line in proposed}
+    kept = proposed_keys & {canonical_key(line) for line in foods}
+    return bool(proposed_keys) and len(kept) * 2 >= len(proposed_keys)
+
+
 @router.callback_query(
     FoodLogStates.ask_condition_bloating,
     ConditionBoolAction.filter(),
@@ -382,7 +660,9 @@ async def cb_condition_bloating(
     await state.update_data(condition=condition.model_dump())
     await state.set_state(FoodLogStates.ask_condition_diarrhea)
     await callback.answer()
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Есть ли диарея?", reply_markup=condition_bool_keyboard("diarrhea")
     )
 
@@ -408,7 +688,9 @@ async def cb_condition_diarrhea(
     await state.update_data(condition=condition.model_dump())
     await state.set_state(FoodLogStates.ask_condition_well_being)
     await callback.answer()
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Оцените самочувствие от 1 (плохо) до 10 (отлично).",
         reply_markup=condition_well_being_keyboard(),
     )
@@ -436,21 +718,46 @@ async def cb_condition_well_being(
         well_being=condition.well_being or 1,
     )
     await state.set_state(FoodLogStates.persisting)
-    service = _food_event_service()
-    result = await service.persist_event(draft, model)
-    await state.clear()
+    user_id = callback.from_user.id if callback.from_user else None
+    if _persist_queue is None:
+        result = await _food_event_service().persist_event(draft, model, user_id=user_id)
+        await callback.answer()
+        await _reply(
+            callback.message,
+            state,
+            persisted_text(result),
+            reply_markup=start_keyboard(),
+            immediate=True,
+        )
+        await state.clear()
+        return
+
+    # Сначала снимаем «часики» с кнопки, запись на диск идёт в фоне. Правка карточки
+    # не откладывается: потом её перепишет воркер очереди.
     await callback.answer()
-    await callback.message.answer(
-        "Записал событие. Продукты сохранены в FoodLog и симптомы — в ConditionLog.\n"
-        f"Всего ингредиентов: {len(result.foods)}.",
-        reply_markup=start_keyboard(),
+    message_id = await _reply(callback.message, state, PENDING_TEXT, immediate=True)
+    time_service = _time_service()
+    await _persist_queue.enqueue(
+        draft,
+        model,
+        user_id=user_id,
+        timestamp=time_service.now(),
+        short_id=time_service.short_id(),
+        chat_id=callback.message.chat.id,
+        message_id=message_id,
     )
+    await state.clear()
 
 
 def _extract_lines(text: str) -> List[str]:
     return [line.strip() for line in text.splitlines() if line.strip()]
 
 
+def _extract_dishes(text: str) -> List[str]:
+    # split_label не режет скобки и десятичные запятые: «паста (сыр, томаты)» — одно блюдо.
+    return [dish for line in _extract_lines(text) for dish in split_label(line)]
+
+
 async def _get_draft(state: FSMContext) -> FoodEventDraft:
     state_data = await state.get_data()
     draft_data = state_data.get("draft")
@@ -468,8 +775,11 @@ async def _get_condition(state: FSMContext) -> ConditionDraft:
 
 async def _cancel_condition(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
-    await state.clear()
-    await callback.message.answer(
+    await _reply(
+        callback.message,
+        state,
         "Фиксация отменена. Ничего не сохранено. Нажмите «Добавить еду», чтобы начать заново.",
         reply_markup=start_keyboard(),
+        immediate=True,
     )
+    await state.clear()
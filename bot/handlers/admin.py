@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from typing import Collection
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from ..profiler import ProfilerController, summarize_blocks
+from ..services.ingredient_canonicalizer import IngredientCanonicalizer
+
+router = Router()
+
+DEFAULT_PROFILE_SECONDS = 30
+MAX_PROFILE_SECONDS = 300
+
+_profiler_instance: ProfilerController | None = None
+_admin_ids: frozenset[int] = frozenset()
+_canonicalizer: IngredientCanonicalizer | None = None
+
+
+def setup_dependencies(
+    profiler: ProfilerController,
+    admin_ids: Collection[int],
+    canonicalizer: IngredientCanonicalizer | None = None,
+) -> None:
+    global _profiler_instance, _admin_ids, _canonicalizer
+    _profiler_instance = profiler
+    _admin_ids = frozenset(admin_ids)
+    _canonicalizer = canonicalizer
+
+
+def _is_admin(message: Message) -> bool:
+    return message.from_user is not None and message.from_user.id in _admin_ids
+
+
+def _profiler() -> ProfilerController:
+    if _profiler_instance is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("ProfilerController is not configured")
+    return _profiler_instance
+
+
+def _parse_seconds(raw: str | None) -> int | None:
+    if not raw or not raw.strip():
+        return DEFAULT_PROFILE_SECONDS
+    try:
+        seconds = int(raw.strip())
+    except ValueError:
+        return None
+    return seconds if 1 <= seconds <= MAX_PROFILE_SECONDS else None
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject) -> None:
+    if not _is_admin(message):
+        await message.answer("Команда доступна только администраторам.")
+        return
+    seconds = _parse_seconds(command.args)
+    if seconds is None:
+        await message.answer(f"Использование: /profile [1–{MAX_PROFILE_SECONDS}] (секунды).")
+        return
+    profiler = _profiler()
+    if profiler.running:
+        await message.answer("Профилировщик уже запущен, дождитесь результата.")
+        return
+
+    await message.answer(f"Снимаю профиль {seconds} с…")
+    started = time.time()
+    path, samples = await profiler.profile(seconds)
+    lines = [f"Профиль готов: {path.name} ({samples} сэмплов)."]
+    blocks = profiler.recent_blocks(started)
+    if blocks:
+        lines.append(f"Блокировок event loop за это время: {len(blocks)}. Худшие:")
+        lines.extend(
+            f"• {frame} — {stalled * 1000:.0f} мс"
+            for frame, stalled in summarize_blocks(blocks).items()
+        )
+    await message.answer("\n".join(lines), parse_mode=None)
+
+
+@router.message(Command("alias"))
+async def cmd_alias(message: Message, command: CommandObject) -> None:
+    if not _is_admin(message):
+        await message.answer("Команда доступна только администраторам.")
+        return
+    if _canonicalizer is None:
+        await message.answer("Таблица синонимов продуктов не подключена.")
+        return
+    alias, separator, canonical = (command.args or "").partition("=")
+    if not separator or not alias.strip() or not canonical.strip():
+        await message.answer("Использование: /alias молоко коровье = молоко")
+        return
+    _canonicalizer.add_alias(alias, canonical)
+    await _canonicalizer.save()
+    await message.answer(
+        f"Теперь «{alias.strip()}» записывается как «{_canonicalizer.canonicalize(alias)}».",
+        parse_mode=None,
+    )
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import html
+from contextlib import suppress
+
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command
+from aiogram.types import CallbackQuery, Message
+
+from ..services.food_log_index import FoodLogIndex, HistoryItem, HistoryPage
+from ..ui.callbacks import HistoryPageAction
+from ..ui.keyboards import history_keyboard
+
+router = Router()
+
+PAGE_SIZE = 10
+
+_index: FoodLogIndex | None = None
+
+
+def setup_dependencies(index: FoodLogIndex) -> None:
+    global _index
+    _index = index
+
+
+def _get_index() -> FoodLogIndex:
+    if _index is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("FoodLogIndex is not configured")
+    return _index
+
+
+def _format_condition(condition: dict) -> str:
+    parts = []
+    if condition.get("bloating"):
+        parts.append("вздутие")
+    if condition.get("diarrhea"):
+        parts.append("диарея")
+    if condition.get("well_being") is not None:
+        parts.append(f"самочувствие {condition['well_being']}")
+    return ", ".join(parts)
+
+
+def _format_item(item: HistoryItem) -> str:
+    foods = html.escape(", ".join(item.foods)) or "—"
+    line = f"<b>{item.timestamp:%d.%m %H:%M}</b> {foods}"
+    condition = _format_condition(item.condition)
+    if condition:
+        line += f"\n    <i>{condition}</i>"
+    return line
+
+
+def format_history(page: HistoryPage) -> str:
+    if not page.total:
+        return "История пуста. Добавьте приём пищи через /add."
+    lines = [f"История приёмов пищи ({page.total}):"]
+    lines.extend(_format_item(item) for item in page.items)
+    return "\n".join(lines)
+
+
+@router.message(Command("history"))
+async def cmd_history(message: Message) -> None:
+    page = await _get_index().page(0, PAGE_SIZE)
+    await message.answer(
+        format_history(page), reply_markup=history_keyboard(page.page, page.pages)
+    )
+
+
+@router.callback_query(HistoryPageAction.filter())
+async def cb_history_page(callback: CallbackQuery, callback_data: HistoryPageAction) -> None:
+    page = await _get_index().page(callback_data.page, PAGE_SIZE)
+    await callback.answer()
+    # Повторное нажатие на номер страницы даёт тот же текст — Telegram отвечает
+    # «message is not modified», это не ошибка.
+    with suppress(TelegramBadRequest):
+        await callback.message.edit_text(
+            format_history(page), reply_markup=history_keyboard(page.page, page.pages)
+        )
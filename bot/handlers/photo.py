@@ -6,7 +6,10 @@ from aiogram.types import Message
 
 from ..domain.models import FoodEventDraft
 from ..fsm.states import FoodLogStates
+from ..middlewares.admission import EXPENSIVE_FLAG
+from ..services.photo_fetcher import PhotoFetcher, PhotoTooLargeError
 from ..services.photo_intake import PhotoIntakeService
+from ..services.recognition_cache import RecognitionCache
 from ..services.time_service import TimeService
 from ..ui.keyboards import adding_foods_keyboard
 
@@ -14,14 +17,22 @@ router = Router()
 
 _photo_intake_service_instance: PhotoIntakeService | None = None
 _time_service_instance: TimeService | None = None
+_photo_fetcher_instance: PhotoFetcher | None = None
+_recognition_cache: RecognitionCache | None = None
 
 
 def setup_dependencies(
-    photo_intake_service: PhotoIntakeService, time_service: TimeService
+    photo_intake_service: PhotoIntakeService,
+    time_service: TimeService,
+    photo_fetcher: PhotoFetcher | None = None,
+    recognition_cache: RecognitionCache | None = None,
 ) -> None:
-    global _photo_intake_service_instance, _time_service_instance
+    global _photo_intake_service_instance, _time_service_instance, _photo_fetcher_instance
+    global _recognition_cache
     _photo_intake_service_instance = photo_intake_service
     _time_service_instance = time_service
+    _photo_fetcher_instance = photo_fetcher or PhotoFetcher()
+    _recognition_cache = recognition_cache
 
 
 def _photo_intake_service() -> PhotoIntakeService:
@@ -36,7 +47,23 @@ def _time_service() -> TimeService:
     return _time_service_instance
 
 
-@router.message(lambda message: bool(message.photo))
+def _photo_fetcher() -> PhotoFetcher:
+    if _photo_fetcher_instance is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("PhotoFetcher is not configured")
+    return _photo_fetcher_instance
+
+
+async def _recognize_ingredients(image: memoryview) -> list[str] | None:
+    try:
+        kind = await _photo_intake_service().classify_image(image)
+        if kind == "ingredients":
+            return await _photo_intake_service().ocr_ingredients(image)
+        return await _photo_intake_service().dish_to_ingredients(image)
+    except Exception:
+        return None
+
+
+@router.message(lambda message: bool(message.photo), flags={EXPENSIVE_FLAG: True})
 async def handle_photo(message: Message, state: FSMContext) -> None:
     if message.bot is None:
         await message.answer("Не удалось обработать фото: бот не инициализирован.")
@@ -46,23 +73,29 @@ async def handle_photo(message: Message, state: FSMContext) -> None:
         await message.answer("Не удалось обработать фото: снимок не найден.")
         return
 
+    photo = message.photo[-1]
+    file_unique_id = getattr(photo, "file_unique_id", None)
+    ingredients = (
+        await _recognition_cache.get("intake", file_unique_id) if _recognition_cache else None
+    )
     try:
-        file = await message.bot.get_file(message.photo[-1].file_id)
-        photo_bytes = await message.bot.download_file(file.file_path)
-        image_bytes = photo_bytes.read()
+        if ingredients is None:
+            async with _photo_fetcher().fetch(message.bot, photo) as image:
+                ingredients = await _recognize_ingredients(image)
+            if ingredients and _recognition_cache is not None:
+                await _recognition_cache.put("intake", file_unique_id, ingredients)
+    except PhotoTooLargeError:
+        await message.answer(
+            "Фото слишком большое. Отправьте его сжатым или используйте /add."
+        )
+        return
     except Exception:
         await message.answer(
             "Не смог загрузить фото. Попробуйте отправить ещё раз или используйте /add."
         )
         return
 
-    try:
-        kind = await _photo_intake_service().classify_image(image_bytes)
-        if kind == "ingredients":
-            ingredients = await _photo_intake_service().ocr_ingredients(image_bytes)
-        else:
-            ingredients = await _photo_intake_service().dish_to_ingredients(image_bytes)
-    except Exception:
+    if ingredients is None:
         await message.answer(
             "Сервис распознавания недоступен. Попробуйте позже или используйте /add."
         )
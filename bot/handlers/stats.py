@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import html
+import math
+from typing import List
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from ..services.symptom_stats import SYMPTOMS, IngredientStat, SymptomStatsService
+
+router = Router()
+
+SYMPTOM_TITLES = {"bloating": "вздутием", "diarrhea": "диареей"}
+SYMPTOM_ALIASES = {
+    "bloating": "bloating",
+    "вздутие": "bloating",
+    "diarrhea": "diarrhea",
+    "диарея": "diarrhea",
+}
+TOP_LIMIT = 10
+
+_stats_service: SymptomStatsService | None = None
+
+
+def setup_dependencies(stats_service: SymptomStatsService) -> None:
+    global _stats_service
+    _stats_service = stats_service
+
+
+def _stats() -> SymptomStatsService:
+    if _stats_service is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("SymptomStatsService is not configured")
+    return _stats_service
+
+
+def _format_stat(position: int, stat: IngredientStat) -> str:
+    lift = "—" if math.isnan(stat.lift) else f"{stat.lift:.2f}"
+    odds_ratio = math.exp(stat.log_odds)
+    line = (
+        f"{position}. <b>{html.escape(stat.ingredient)}</b>: {stat.with_symptom}/{stat.exposures}, "
+        f"lift {lift}, OR {odds_ratio:.2f} "
+        f"[{math.exp(stat.ci_low):.2f}–{math.exp(stat.ci_high):.2f}]"
+    )
+    if not math.isnan(stat.well_being_delta):
+        line += f", самочувствие {stat.well_being_delta:+.1f}"
+    return line
+
+
+def format_ranking(symptom: str, events: int, stats: List[IngredientStat]) -> str:
+    title = SYMPTOM_TITLES[symptom]
+    if not stats:
+        return (
+            f"Приёмов пищи: {events}. Пока мало данных, чтобы связать продукты с {title}: "
+            f"нужно хотя бы {_stats().min_exposures} записи с продуктом."
+        )
+    lines = [f"Продукты, чаще связанные с {title} (приёмов пищи: {events}):"]
+    lines.extend(_format_stat(position, stat) for position, stat in enumerate(stats, start=1))
+    lines.append(
+        "\nOR — отношение шансов с 95% интервалом; если нижняя граница больше 1, "
+        "связь устойчива. Это корреляция, а не диагноз."
+    )
+    return "\n".join(lines)
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message, command: CommandObject) -> None:
+    raw = (command.args or "bloating").strip().lower()
+    symptom = SYMPTOM_ALIASES.get(raw)
+    if symptom is None:
+        await message.answer(f"Использование: /stats [{' | '.join(SYMPTOMS)}].")
+        return
+    events, stats = await _stats().rank(symptom, limit=TOP_LIMIT)
+    await message.answer(format_ranking(symptom, events, stats))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from ..services.ingredient_index import IngredientPrefixIndex
+
+router = Router()
+
+_prefix_index_instance: IngredientPrefixIndex | None = None
+
+SUGGESTION_LIMIT = 10
+
+
+def setup_dependencies(prefix_index: IngredientPrefixIndex) -> None:
+    global _prefix_index_instance
+    _prefix_index_instance = prefix_index
+
+
+def _prefix_index() -> IngredientPrefixIndex:
+    if _prefix_index_instance is None:  # pragma: no cover - wiring issue
+        raise RuntimeError("IngredientPrefixIndex is not configured")
+    return _prefix_index_instance
+
+
+@router.inline_query()
+async def handle_ingredient_suggestions(inline_query: InlineQuery) -> None:
+    user_id = inline_query.from_user.id if inline_query.from_user else None
+    # Счётчики, которые насчитали другие воркеры с прошлого запроса.
+    await _prefix_index().refresh()
+    suggestions = _prefix_index().complete(
+        inline_query.query, k=SUGGESTION_LIMIT, user_id=user_id
+    )
+    results = [
+        InlineQueryResultArticle(
+            id=str(position),
+            title=name,
+            input_message_content=InputTextMessageContent(message_text=name),
+        )
+        for position, name in enumerate(suggestions)
+    ]
+    await inline_query.answer(results, cache_time=0, is_personal=True)
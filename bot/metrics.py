@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        # Дочерние метрики кешируются: на горячем пути остаётся один поиск в dict.
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):  # pragma: no cover - overridden
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_function")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def collect(self) -> float:
+        if self._function is not None:
+            try:
+                self.value = float(self._function())
+            except Exception:
+                self.value = math.nan
+        return self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+    def _render_child(self, values, child) -> List[str]:
+        child.collect()
+        return super()._render_child(values, child)
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "bot_handler_duration_seconds",
+    "Время обработки апдейта хэндлером.",
+    ("event", "router", "state"),
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "bot_handler_errors_total",
+    "Исключения, вылетевшие из хэндлеров.",
+    ("event", "router", "error"),
+)
+FILE_WRITE_LATENCY = REGISTRY.histogram(
+    "bot_file_write_duration_seconds", "Время атомарной записи файла хранилища."
+)
+FILE_WRITE_BYTES = REGISTRY.histogram(
+    "bot_file_write_bytes", "Размер записанных файлов.", buckets=BYTES_BUCKETS
+)
+EXTERNAL_CALL_LATENCY = REGISTRY.histogram(
+    "bot_external_call_duration_seconds",
+    "Время вызова внешних сервисов распознавания.",
+    ("service", "operation"),
+)
+EXTERNAL_CALL_ERRORS = REGISTRY.counter(
+    "bot_external_call_errors_total",
+    "Ошибки внешних сервисов по коду ответа или типу исключения.",
+    ("service", "operation", "code"),
+)
+HEDGED_REQUESTS = REGISTRY.counter(
+    "bot_hedged_requests_total",
+    "Запросы к LLM по исходу хеджирования: unhedged, primary или backup.",
+    ("service", "outcome"),
+)
+MODEL_ROUTE_DECISIONS = REGISTRY.counter(
+    "bot_model_route_decisions_total",
+    "Выбор модели роутером: warmup, slo, stale, explore или fallback.",
+    ("task", "model", "reason"),
+)
+MODEL_CALL_LATENCY = REGISTRY.histogram(
+    "bot_model_call_duration_seconds",
+    "Время попытки запроса к модели по исходу: ok, error или cancelled.",
+    ("task", "model", "outcome"),
+)
+MODEL_TOKENS = REGISTRY.counter(
+    "bot_model_tokens_total",
+    "Токены из поля usage ответов моделей.",
+    ("task", "model", "kind"),
+)
+RECIPE_LOOKUPS = REGISTRY.counter(
+    "bot_recipe_lookups_total",
+    "Поиск блюда в личных рецептах: exact, fuzzy или miss.",
+    ("outcome",),
+)
+SCHEDULER_LAG = REGISTRY.histogram(
+    "bot_scheduler_lag_seconds",
+    "Опоздание тика планировщика напоминаний относительно расписания.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0),
+)
+FSM_STORAGE_KEYS = REGISTRY.gauge(
+    "bot_fsm_storage_keys", "Количество ключей в FSM-хранилище."
+)
+
+
+def error_code(exc: BaseException) -> str:
+    status = getattr(exc, "status", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return str(status) if status is not None else type(exc).__name__
+
+
+@contextmanager
+def track_external_call(service: str, operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        EXTERNAL_CALL_ERRORS.labels(service, operation, error_code(exc)).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_LATENCY.labels(service, operation).observe(time.perf_counter() - started)
+
+
+def build_metrics_app(
+    registry: MetricsRegistry = REGISTRY, path: str = "/metrics"
+) -> web.Application:
+    # aiohttp.web тянет за собой сервер целиком, а нужен он только при METRICS_PORT.
+    from aiohttp import web
+
+    async def handle(_: web.Request) -> web.Response:
+        return web.Response(
+            body=registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    app = web.Application()
+    app.router.add_get(path, handle)
+    return app
+
+
+async def start_metrics_server(
+    host: str, port: int, registry: MetricsRegistry = REGISTRY
+) -> web.AppRunner:
+    from aiohttp import web
+
+    runner = web.AppRunner(build_metrics_app(registry), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
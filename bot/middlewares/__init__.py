@@ -0,0 +1 @@
+"""aiogram middlewares shared by all routers."""
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+
+EXPENSIVE_FLAG = "expensive"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    shed: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    max_wait: float = 0.0
+    recent_waits: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+
+class AdmissionControlMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        *,
+        global_limit: int = 4,
+        per_user_limit: int = 1,
+        max_queue: int = 16,
+        busy_text: str = "Уже обрабатываю ваше предыдущее фото или запрос. Дождитесь ответа.",
+        overloaded_text: str = "Сейчас слишком много запросов. Попробуйте через минуту.",
+        queued_text: str = "Запрос в очереди, обработаю в ближайшее время.",
+    ):
+        self._global = asyncio.Semaphore(global_limit)
+        self._per_user_limit = per_user_limit
+        self._per_user: Dict[int | None, asyncio.Semaphore] = {}
+        self._per_user_refs: Dict[int | None, int] = {}
+        self._max_queue = max_queue
+        self._busy_text = busy_text
+        self._overloaded_text = overloaded_text
+        self._queued_text = queued_text
+        self.stats = AdmissionStats()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not get_flag(data, EXPENSIVE_FLAG):
+            return await handler(event, data)
+
+        user = data.get("event_from_user")
+        user_id = user.id if user else None
+        if self._per_user_refs.get(user_id, 0) >= self._per_user_limit:
+            self.stats.shed += 1
+            await self._reply(event, self._busy_text)
+            return None
+        if self._global.locked() and self.stats.waiting >= self._max_queue:
+            self.stats.shed += 1
+            await self._reply(event, self._overloaded_text)
+            return None
+        user_semaphore = self._acquire_user(user_id)
+        started = time.monotonic()
+        self.stats.waiting += 1
+        try:
+            if self._global.locked():
+                self.stats.queued += 1
+                await self._reply(event, self._queued_text)
+            await user_semaphore.acquire()
+            try:
+                await self._global.acquire()
+            except BaseException:
+                user_semaphore.release()
+                raise
+        except BaseException:
+            self._release_user(user_id)
+            raise
+        finally:
+            self.stats.waiting -= 1
+
+        wait = time.monotonic() - started
+        self._record_wait(wait)
+        self.stats.admitted += 1
+        self.stats.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.stats.in_flight -= 1
+            self._global.release()
+            user_semaphore.release()
+            self._release_user(user_id)
+
+    def _acquire_user(self, user_id: int | None) -> asyncio.Semaphore:
+        semaphore = self._per_user.get(user_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._per_user_limit)
+            self._per_user[user_id] = semaphore
+        self._per_user_refs[user_id] = self._per_user_refs.get(user_id, 0) + 1
+        return semaphore
+
+    def _release_user(self, user_id: int | None) -> None:
+        refs = self._per_user_refs.get(user_id, 1) - 1
+        if refs <= 0:
+            self._per_user_refs.pop(user_id, None)
+            self._per_user.pop(user_id, None)
+        else:
+            self._per_user_refs[user_id] = refs
+
+    def _record_wait(self, wait: float) -> None:
+        self.stats.recent_waits.append(wait)
+        if wait > self.stats.max_wait:
+            self.stats.max_wait = wait
+        if wait > 0.5:
+            logger.info("Expensive handler waited %.2fs in admission queue", wait)
+
+    @staticmethod
+    async def _reply(event: TelegramObject, text: str) -> None:
+        answer = getattr(event, "answer", None)
+        if answer is None:
+            return
+        try:
+            await answer(text)
+        except Exception:  # pragma: no cover - reply is best effort
+            logger.warning("Failed to send admission notice", exc_info=True)
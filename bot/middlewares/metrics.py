@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from ..metrics import HANDLER_ERRORS, HANDLER_LATENCY
+
+
+class MetricsMiddleware(BaseMiddleware):
+    def __init__(self, event: str):
+        self._event = event
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        # Модуль хэндлера стабильнее имени Router(): у анонимных роутеров это id объекта.
+        router = (
+            handler_object.callback.__module__.rsplit(".", 1)[-1]
+            if handler_object is not None
+            else "unknown"
+        )
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as exc:
+            HANDLER_ERRORS.labels(self._event, router, type(exc).__name__).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(self._event, router, data.get("raw_state") or "none").observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from ..tracing import TraceSink, start_trace
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer-мидлварь на update: один trace на апдейт, спаны сервисов вкладываются в него."""
+
+    def __init__(self, sink: TraceSink):
+        self._sink = sink
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        event_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        attributes = {"update_id": getattr(event, "update_id", None)}
+        user = data.get("event_from_user")
+        if user is not None:
+            attributes["user_id"] = user.id
+        try:
+            with start_trace(f"update.{event_type}", **attributes) as trace:
+                return await handler(event, data)
+        finally:
+            self._sink.record(trace)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Deque, Dict
+
+from .metrics import REGISTRY
+
+LOOP_BLOCKS = REGISTRY.counter(
+    "bot_event_loop_blocks_total", "Сколько раз event loop не отвечал дольше порога."
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_name(frame: FrameType) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def collapse_stack(frame: FrameType | None, root: str) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Снимает стеки всех потоков по таймеру; результат — collapsed-формат для flamegraph."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+
+    def run(self, duration: float) -> Counter:
+        samples: Counter = Counter()
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                samples[collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+            time.sleep(self.interval)
+        return samples
+
+    @staticmethod
+    def write_collapsed(path: Path, samples: Counter) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {count}" for stack, count in samples.most_common()]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@dataclass(slots=True)
+class LoopBlock:
+    detected_at: float
+    stalled_for: float
+    stack: str
+
+
+class LoopBlockWatchdog:
+    """Сердцебиение в цикле + поток-наблюдатель: если цикл не отвечает дольше порога,
+    логируем стек потока цикла — это и есть блокирующий вызов."""
+
+    def __init__(self, threshold: float = 0.25, *, history: int = 100):
+        self.threshold = threshold
+        self._interval = threshold / 4
+        self.blocks: Deque[LoopBlock] = deque(maxlen=history)
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    async def start(self) -> None:
+        if self._heartbeat_task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self._interval)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self._interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self._interval
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            block = LoopBlock(time.time(), stalled, collapse_stack(frame, "event-loop"))
+            self.blocks.append(block)
+            LOOP_BLOCKS.inc()
+            logger.warning(
+                "Event loop blocked for %.0f ms in %s (stack: %s)",
+                stalled * 1000,
+                blocking_frame(block.stack),
+                block.stack,
+            )
+
+
+class ProfilerController:
+    def __init__(
+        self,
+        output_dir: Path,
+        *,
+        interval: float = 0.01,
+        watchdog: LoopBlockWatchdog | None = None,
+    ):
+        self.output_dir = output_dir
+        self.watchdog = watchdog
+        self._profiler = SamplingProfiler(interval)
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float) -> tuple[Path, int]:
+        async with self._lock:
+            started = datetime.now()
+            samples = await asyncio.to_thread(self._profiler.run, seconds)
+            path = self.output_dir / f"profile-{started:%Y%m%d-%H%M%S}.collapsed"
+            await asyncio.to_thread(self._profiler.write_collapsed, path, samples)
+            logger.info("Profile with %d samples written to %s", sum(samples.values()), path)
+            return path, sum(samples.values())
+
+    def recent_blocks(self, since: float) -> list[LoopBlock]:
+        if self.watchdog is None:
+            return []
+        return [block for block in self.watchdog.blocks if block.detected_at >= since]
+
+
+def blocking_frame(stack: str) -> str:
+    # Самый глубокий кадр бота информативнее листа — тот обычно внутри pathlib или io.
+    frames = stack.split(";")
+    own = [frame for frame in frames if frame.startswith("bot.")]
+    return own[-1] if own else frames[-1]
+
+
+def summarize_blocks(blocks: list[LoopBlock], limit: int = 3) -> Dict[str, float]:
+    worst: Dict[str, float] = {}
+    for block in blocks:
+        frame = blocking_frame(block.stack)
+        worst[frame] = max(worst.get(frame, 0.0), block.stalled_for)
+    return dict(sorted(worst.items(), key=lambda item: -item[1])[:limit])
@@ -2,12 +2,16 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
 from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Tuple, TypeVar
 
+from .file_lock import InterProcessLock
 from .file_store import FileStore
 
+T = TypeVar("T")
+
 
 @dataclass
 class BreathReminder:
@@ -20,8 +24,11 @@ class BreathReminder:
 
 class BreathReminderService:
     def __init__(self, file_store: FileStore, filename: str = "breath_reminders.json"):
+        self._file_store = file_store
         self._path = file_store.resolve(filename)
         self._lock = asyncio.Lock()
+        # Файл могут менять другие процессы бота, поэтому перечитываем его под блокировкой.
+        self._file_lock = InterProcessLock(self._path.with_name(self._path.name + ".lock"))
         self._reminders: List[BreathReminder] = self._load()
 
     def _load(self) -> List[BreathReminder]:
@@ -33,46 +40,71 @@ class BreathReminderService:
     def _save(self) -> None:
         payload = [asdict(item) for item in self._reminders]
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self._path)
 
-    async def add_or_update(self, user_id: int, chat_id: int, time_str: str, *, one_shot: bool = False) -> None:
+    async def _transaction(self, apply: Callable[[List[BreathReminder]], Tuple[T, bool]]) -> T:
+        # Блокировка файла, чтение, изменение и запись — одна задача I/O-пула,
+        # event loop не ждёт ни flock, ни диска.
         async with self._lock:
-            for reminder in self._reminders:
+            return await self._file_store.run_io(self._run_transaction, apply)
+
+    def _run_transaction(self, apply: Callable[[List[BreathReminder]], Tuple[T, bool]]) -> T:
+        with self._file_lock:
+            self._reminders = self._load()
+            result, changed = apply(self._reminders)
+            if changed:
+                self._save()
+            return result
+
+    async def add_or_update(self, user_id: int, chat_id: int, time_str: str, *, one_shot: bool = False) -> None:
+        def apply(reminders: List[BreathReminder]) -> Tuple[None, bool]:
+            for reminder in reminders:
                 if reminder.user_id == user_id:
                     reminder.chat_id = chat_id
                     reminder.time = time_str
                     reminder.one_shot = one_shot
-                    self._save()
-                    return
-            self._reminders.append(
+                    return None, True
+            reminders.append(
                 BreathReminder(user_id=user_id, chat_id=chat_id, time=time_str, one_shot=one_shot)
             )
-            self._save()
+            return None, True
+
+        await self._transaction(apply)
 
     async def get_due(self, time_str: str, date_str: str) -> List[BreathReminder]:
-        async with self._lock:
-            return [
+        def apply(reminders: List[BreathReminder]) -> Tuple[List[BreathReminder], bool]:
+            due = [
                 reminder
-                for reminder in self._reminders
+                for reminder in reminders
                 if reminder.time == time_str
                 and (reminder.one_shot or reminder.last_sent_date != date_str)
             ]
+            return due, False
+
+        return await self._transaction(apply)
 
     async def get_due_one_shot(self, timestamp: str) -> List[BreathReminder]:
-        async with self._lock:
-            return [
+        def apply(reminders: List[BreathReminder]) -> Tuple[List[BreathReminder], bool]:
+            due = [
                 reminder
-                for reminder in self._reminders
+                for reminder in reminders
                 if reminder.one_shot and reminder.time <= timestamp
             ]
+            return due, False
+
+        return await self._transaction(apply)
 
     async def mark_sent(self, reminder: BreathReminder, date_str: str) -> None:
-        async with self._lock:
-            for stored in self._reminders:
+        def apply(reminders: List[BreathReminder]) -> Tuple[None, bool]:
+            for stored in reminders:
                 if stored.user_id == reminder.user_id:
                     if stored.one_shot:
-                        self._reminders.remove(stored)
+                        reminders.remove(stored)
                     else:
                         stored.last_sent_date = date_str
                     break
-            self._save()
+            return None, True
+
+        await self._transaction(apply)
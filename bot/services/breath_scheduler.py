@@ -4,8 +4,10 @@ import asyncio
 
 from aiogram import Bot
 
+from ..metrics import SCHEDULER_LAG
 from ..ui.keyboards import breath_severity_keyboard
 from .breath_reminder_service import BreathReminderService
+from .lease import SQLiteLease
 from .time_service import TimeService
 
 
@@ -14,9 +16,11 @@ class BreathReminderScheduler:
         self,
         reminder_service: BreathReminderService,
         time_service: TimeService,
+        lease: SQLiteLease | None = None,
     ):
         self.reminder_service = reminder_service
         self.time_service = time_service
+        self.lease = lease
         self._task: asyncio.Task | None = None
         self._running = False
 
@@ -35,9 +39,16 @@ class BreathReminderScheduler:
             except asyncio.CancelledError:  # pragma: no cover - shutdown path
                 pass
             self._task = None
+        if self.lease is not None:
+            await self.lease.release()
 
     async def _loop(self, bot: Bot) -> None:
+        loop = asyncio.get_running_loop()
         while self._running:
+            # В многопроцессном режиме напоминания рассылает только держатель аренды.
+            if self.lease is not None and not await self.lease.acquire():
+                await asyncio.sleep(60)
+                continue
             now = self.time_service.now()
             time_str = now.strftime("%H:%M")
             date_str = now.strftime("%Y-%m-%d")
@@ -54,4 +65,6 @@ class BreathReminderScheduler:
                     await self.reminder_service.mark_sent(reminder, date_str)
                 except Exception:
                     continue
+            planned = loop.time() + 60
             await asyncio.sleep(60)
+            SCHEDULER_LAG.observe(max(0.0, loop.time() - planned))
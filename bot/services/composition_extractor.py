@@ -4,9 +4,44 @@ import asyncio
 import base64
 import json
 import os
-from typing import List
+import time
+from typing import Dict, List, Sequence, Tuple
 
-import requests
+import aiohttp
+
+from ..domain.canonicalize import canonical_key
+from ..domain.normalize import deduplicate_preserve_order
+from ..metrics import HEDGED_REQUESTS, track_external_call
+from ..tracing import span
+from .hedging import LatencyTracker, hedged_call
+from .model_router import ModelRouter
+
+
+def parse_batch_guess(raw: str, dishes: Sequence[str]) -> Dict[str, List[str]]:
+    """Разбирает JSON-ответ {"блюдо": ["ингредиент", ...]} под исходные названия.
+
+    Модель может поменять регистр или «ё» в ключах — сопоставляем по canonical_key;
+    блюда, которых нет в ответе, в результат не попадают."""
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("Batch guess response has no JSON object")
+    payload = json.loads(raw[start : end + 1])
+    if not isinstance(payload, dict):
+        raise ValueError("Batch guess response is not an object")
+    by_key: Dict[str, List[str]] = {}
+    for name, items in payload.items():
+        if isinstance(items, str):
+            items = items.splitlines()
+        if isinstance(items, list):
+            lines = [str(item).strip() for item in items if str(item).strip()]
+            if lines:
+                by_key[canonical_key(str(name))] = lines
+    result: Dict[str, List[str]] = {}
+    for dish in dishes:
+        lines = by_key.get(canonical_key(dish))
+        if lines:
+            result[dish] = lines
+    return result
 
 
 class CompositionExtractor:
@@ -18,8 +53,23 @@ class CompositionExtractor:
         recognize_prompt: str | None = None,
         guess_text_prompt: str | None = None,
         guess_image_prompt: str | None = None,
+        guess_batch_prompt: str | None = None,
+        backup_model: str | None = None,
+        timeout: float = 60.0,
+        latency: LatencyTracker | None = None,
+        router: ModelRouter | None = None,
     ) -> None:
         self.model = model or "openai/gpt-5-nano"
+        # Резервный запрос уходит в backup_model, а без неё — повтором в ту же модель.
+        self.backup_model = backup_model
+        # С роутером основная модель выбирается под задачу, self.model не используется.
+        self.router = router
+        self.timeout = timeout
+        # latency — образец настроек: окно времён ведётся отдельно для каждой пары
+        # (модель, операция), иначе пакетные запросы растягивают задержку одиночных.
+        self._latency_template = latency if latency is not None else LatencyTracker()
+        self._latency: Dict[Tuple[str, str], LatencyTracker] = {}
+        self._session: aiohttp.ClientSession | None = None
         self.endpoint = endpoint or "https://openrouter.ai/api/v1/chat/completions"
         self.recognize_prompt = recognize_prompt or (
             "На изображении текст состава продукта. Верни ингредиенты построчно, "
@@ -32,10 +82,26 @@ class CompositionExtractor:
         self.guess_image_prompt = guess_image_prompt or (
             "На фото блюдо. Предположи его состав и верни ингредиенты построчно без комментариев."
         )
+        self.guess_batch_prompt = guess_batch_prompt or (
+            "Для каждого блюда из списка предположи его состав (основные ингредиенты). "
+            "Верни JSON-объект: ключ — название блюда в точности как в списке, "
+            "значение — массив ингредиентов."
+        )
         self.system_prompt = (
             "Ты помогаешь определять состав блюд и продуктов. "
             "Отвечай только списком ингредиентов, по одному пункту на строку."
         )
+        self.batch_system_prompt = (
+            "Ты помогаешь определять состав блюд и продуктов. "
+            "Отвечай только JSON-объектом без пояснений."
+        )
+
+    def latency_tracker(self, model: str, operation: str) -> LatencyTracker:
+        tracker = self._latency.get((model, operation))
+        if tracker is None:
+            tracker = self._latency_template.empty_copy()
+            self._latency[(model, operation)] = tracker
+        return tracker
 
     def _load_api_key(self) -> str:
         key = os.environ.get("OPENROUTER_API_KEY")
@@ -43,33 +109,85 @@ class CompositionExtractor:
             raise RuntimeError("OPENROUTER_API_KEY is not set")
         return key
 
-    def _encode_image(self, data: bytes, mime: str) -> str:
-        encoded = base64.b64encode(data).decode("utf-8")
+    def _encode_image(self, data: bytes | memoryview, mime: str) -> str:
+        encoded = base64.b64encode(data).decode("ascii")
         return f"data:{mime};base64,{encoded}"
 
-    def _send_request(self, messages: List[dict]) -> str:
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self._session = aiohttp.ClientSession(timeout=timeout)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _send_request(
+        self,
+        messages: List[dict],
+        model: str,
+        operation: str,
+        response_format: dict | None = None,
+    ) -> str:
         api_key = self._load_api_key()
-        payload = {"model": self.model, "messages": messages}
+        payload = {"model": model, "messages": messages}
+        if response_format is not None:
+            payload["response_format"] = response_format
         headers = {
             "Authorization": f"Bearer {api_key}",
             "HTTP-Referer": "https://github.com/leoromanovich/food_calendar",
-            "Content-Type": "application/json",
         }
-        response = requests.post(
-            self.endpoint,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=60,
-        )
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"].strip()
+        started = time.perf_counter()
+        outcome, usage = "error", None
+        try:
+            async with self._get_session().post(
+                self.endpoint, headers=headers, json=payload
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+            content = data["choices"][0]["message"]["content"].strip()
+            outcome, usage = "ok", data.get("usage")
+            return content
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            if self.router is not None:
+                self.router.observe(
+                    model, operation, time.perf_counter() - started, outcome, usage=usage
+                )
+
+    async def _run(
+        self, messages: List[dict], operation: str, *, response_format: dict | None = None
+    ) -> str:
+        model = self.router.choose(operation).model if self.router is not None else self.model
+        backup_model = self.backup_model or model
+        latency = self.latency_tracker(model, operation)
+
+        def record_latency(attempt: str, seconds: float) -> None:
+            # Задержку хеджирования считаем по основной модели: резервная может быть быстрее.
+            if attempt == "primary" or backup_model == model:
+                latency.record(seconds)
 
-    async def _run(self, messages: List[dict]) -> str:
-        return await asyncio.to_thread(self._send_request, messages)
+        delay = latency.hedge_delay()
+        with track_external_call("composition_extractor", operation), span(
+            f"composition_extractor.{operation}", model=model, hedge_delay=round(delay, 3)
+        ):
+            result = await hedged_call(
+                lambda: self._send_request(messages, model, operation, response_format),
+                lambda: self._send_request(messages, backup_model, operation, response_format),
+                delay,
+                on_latency=record_latency,
+            )
+        HEDGED_REQUESTS.labels(
+            "composition_extractor", result.winner if result.hedged else "unhedged"
+        ).inc()
+        return result.value
 
     async def recognize_from_image(
-        self, data: bytes, *, prompt: str | None = None, mime: str = "image/jpeg"
+        self, data: bytes | memoryview, *, prompt: str | None = None, mime: str = "image/jpeg"
     ) -> str:
         prompt_text = prompt or self.recognize_prompt
         encoded = self._encode_image(data, mime)
@@ -83,7 +201,7 @@ class CompositionExtractor:
                 ],
             },
         ]
-        return await self._run(messages)
+        return await self._run(messages, "recognize_image")
 
     async def guess_from_text(self, dish_name: str, prompt: str | None = None) -> str:
         dish = dish_name.strip()
@@ -95,10 +213,28 @@ class CompositionExtractor:
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": [{"type": "text", "text": user_text}]},
         ]
-        return await self._run(messages)
+        return await self._run(messages, "guess_text")
+
+    async def guess_batch(
+        self, dishes: Sequence[str], prompt: str | None = None
+    ) -> Dict[str, List[str]]:
+        """Состав нескольких блюд одним запросом: {блюдо: [ингредиенты]}."""
+        names = deduplicate_preserve_order(dish.strip() for dish in dishes if dish.strip())
+        if not names:
+            raise ValueError("Dish list is empty")
+        listing = "\n".join(f"- {name}" for name in names)
+        user_text = f"{prompt or self.guess_batch_prompt}\n\nБлюда:\n{listing}"
+        messages = [
+            {"role": "system", "content": self.batch_system_prompt},
+            {"role": "user", "content": [{"type": "text", "text": user_text}]},
+        ]
+        raw = await self._run(
+            messages, "guess_batch", response_format={"type": "json_object"}
+        )
+        return parse_batch_guess(raw, names)
 
     async def guess_from_image(
-        self, data: bytes, *, prompt: str | None = None, mime: str = "image/jpeg"
+        self, data: bytes | memoryview, *, prompt: str | None = None, mime: str = "image/jpeg"
     ) -> str:
         prompt_text = prompt or self.guess_image_prompt
         encoded = self._encode_image(data, mime)
@@ -112,9 +248,9 @@ class CompositionExtractor:
                 ],
             },
         ]
-        return await self._run(messages)
+        return await self._run(messages, "guess_image")
 
     async def extract(
-        self, data: bytes, *, prompt: str | None = None, mime: str = "image/jpeg"
+        self, data: bytes | memoryview, *, prompt: str | None = None, mime: str = "image/jpeg"
     ) -> str:
         return await self.recognize_from_image(data, prompt=prompt, mime=mime)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: процессы не делят хранилище
+    fcntl = None
+
+
+class InterProcessLock:
+    def __init__(self, path: Path):
+        self._path = path
+        self._handle = None
+
+    def __enter__(self) -> "InterProcessLock":
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = open(self._path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._handle is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        self._handle.close()
+        self._handle = None
+
+    async def __aenter__(self) -> "InterProcessLock":
+        return await asyncio.to_thread(self.__enter__)
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__exit__(*exc_info)
@@ -1,34 +1,90 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
+import functools
 import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, TypeVar
 
-import aiofiles
+from ..metrics import FILE_WRITE_BYTES, FILE_WRITE_LATENCY
+from ..tracing import span
+
+T = TypeVar("T")
 
 
 class FileStore:
-    def __init__(self, base_dir: Path):
+    def __init__(self, base_dir: Path, *, io_workers: int = 4):
         self.base_dir = base_dir
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        # Свой пул, а не дефолтный executor цикла: запись заметок не должна
+        # стоять в очереди за LLM-запросами из asyncio.to_thread.
+        self._executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="file-io")
 
     def resolve(self, relative_path: str | Path) -> Path:
         return self.base_dir.joinpath(relative_path)
 
+    async def run_io(self, func: Callable[..., T], *args) -> T:
+        # Контекст копируем, чтобы спаны из потока попадали в трейс апдейта.
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def exists(self, relative_path: str | Path) -> bool:
+        return await self.run_io(self.resolve(relative_path).exists)
+
+    async def read_text(self, relative_path: str | Path) -> str:
+        return await self.run_io(
+            functools.partial(self.resolve(relative_path).read_text, encoding="utf-8")
+        )
+
     async def ensure_file(self, relative_path: str | Path, default_content: str = "") -> Path:
         target = self.resolve(relative_path)
-        if not target.exists():
-            target.parent.mkdir(parents=True, exist_ok=True)
-            await self._write_atomic(target, default_content)
+        await self._write_atomic(target, default_content, overwrite=False)
         return target
 
     async def write_text(self, relative_path: str | Path, content: str) -> Path:
         target = self.resolve(relative_path)
-        target.parent.mkdir(parents=True, exist_ok=True)
         await self._write_atomic(target, content)
         return target
 
-    async def _write_atomic(self, target: Path, content: str) -> None:
-        tmp_path = target.with_suffix(target.suffix + ".tmp")
-        async with aiofiles.open(tmp_path, "w", encoding="utf-8") as tmp_file:
-            await tmp_file.write(content)
-        os.replace(tmp_path, target)
+    async def _write_atomic(self, target: Path, content: str, *, overwrite: bool = True) -> bool:
+        started = time.perf_counter()
+        written = False
+        # Кириллица в UTF-8 занимает два байта: метрика и спан считают байты на диске.
+        data = content.encode("utf-8")
+        with span("file_store.write", path=target.name, bytes=len(data)):
+            try:
+                written = await self.run_io(self._write_atomic_sync, target, data, overwrite)
+            finally:
+                FILE_WRITE_LATENCY.observe(time.perf_counter() - started)
+                if written:
+                    FILE_WRITE_BYTES.observe(len(data))
+        return written
+
+    @staticmethod
+    def _write_atomic_sync(target: Path, data: bytes, overwrite: bool) -> bool:
+        # mkdir, запись и rename — одна задача пула, без лишних переключений в цикл.
+        if not overwrite and target.exists():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Уникальное имя tmp-файла: несколько процессов могут писать один и тот же target.
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+        tmp_path.write_bytes(data)
+        if overwrite:
+            os.replace(tmp_path, target)
+            return True
+        try:
+            # link() не перезаписывает существующий файл — побеждает первый процесс.
+            os.link(tmp_path, target)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp_path)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
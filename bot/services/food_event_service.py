@@ -7,10 +7,16 @@ from typing import Iterable, List
 
 from ..domain.models import Condition, FoodEventDraft, PersistedEvent
 from ..domain.normalize import deduplicate_preserve_order, normalize_food_name
+from ..tracing import span
 from .condition_service import ConditionService
 from .file_store import FileStore
+from .food_log_index import FoodLogIndex
 from .foods_service import FoodsService
+from .ingredient_canonicalizer import IngredientCanonicalizer
+from .ingredient_index import IngredientPrefixIndex
 from .markdown_helpers import build_log_filename, render_frontmatter
+from .recent_meals import RecentMealsCache
+from .symptom_stats import SymptomStatsService
 from .time_service import TimeService
 
 
@@ -28,35 +34,71 @@ class FoodEventService:
         condition_service: ConditionService,
         time_service: TimeService,
         food_log_dir: str = "FoodLog",
+        canonicalizer: IngredientCanonicalizer | None = None,
+        prefix_index: IngredientPrefixIndex | None = None,
+        recent_meals: RecentMealsCache | None = None,
+        symptom_stats: SymptomStatsService | None = None,
+        food_log_index: FoodLogIndex | None = None,
     ):
         self.file_store = file_store
         self.foods_service = foods_service
         self.condition_service = condition_service
         self.time_service = time_service
         self.food_log_dir = food_log_dir
+        self.canonicalizer = canonicalizer
+        self.prefix_index = prefix_index
+        self.recent_meals = recent_meals
+        self.symptom_stats = symptom_stats
+        self.food_log_index = food_log_index
 
     async def persist_event(
-        self, draft: FoodEventDraft, condition: Condition
+        self,
+        draft: FoodEventDraft,
+        condition: Condition,
+        user_id: int | None = None,
+        *,
+        timestamp: datetime | None = None,
+        short_id: str | None = None,
     ) -> PersistedEvent:
-        normalized_foods = self._normalize_foods(draft.foods_raw)
-        if not normalized_foods:
-            raise ValueError("Cannot persist event without foods")
+        # timestamp и short_id передаёт очередь записи: повтор задачи после сбоя
+        # должен попасть в те же файлы, а не создать дубликат.
+        with span("food_event.persist", user_id=user_id):
+            if self.canonicalizer is not None:
+                await self.canonicalizer.refresh()
+            normalized_foods = self._normalize_foods(draft.foods_raw)
+            if not normalized_foods:
+                raise ValueError("Cannot persist event without foods")
+            if self.canonicalizer is not None:
+                await self.canonicalizer.save()
 
-        await self.foods_service.ensure_notes(normalized_foods)
+            await self.foods_service.ensure_notes(normalized_foods)
 
-        timestamp = self.time_service.now()
-        short_id = self.time_service.short_id()
+            timestamp = timestamp or self.time_service.now()
+            short_id = short_id or self.time_service.short_id()
 
-        food_log_path = await self._write_food_log(timestamp, short_id, normalized_foods)
-        condition_record = await self.condition_service.persist(
-            timestamp=timestamp, short_id=short_id, condition=condition
-        )
+            food_log_path = await self._write_food_log(timestamp, short_id, normalized_foods)
+            condition_record = await self.condition_service.persist(
+                timestamp=timestamp, short_id=short_id, condition=condition
+            )
+            # Повтор задачи очереди перезаписывает те же файлы, а статистику и счётчики
+            # использования обновляет только первый проход по этому FoodLog.
+            fresh = True
+            if self.symptom_stats is not None:
+                fresh = await self.symptom_stats.record(
+                    normalized_foods, condition, event=Path(food_log_path).name
+                )
+            if fresh and self.prefix_index is not None:
+                await self.prefix_index.record(user_id, normalized_foods)
+            if self.recent_meals is not None:
+                await self.recent_meals.record(user_id, normalized_foods)
+            if self.food_log_index is not None:
+                self.food_log_index.append(food_log_path)
 
-        return PersistedEvent(
-            food_log_path=str(food_log_path),
-            condition_log_path=str(condition_record.path),
-            foods=normalized_foods,
-        )
+            return PersistedEvent(
+                food_log_path=str(food_log_path),
+                condition_log_path=str(condition_record.path),
+                foods=normalized_foods,
+            )
 
     async def _write_food_log(
         self, timestamp: datetime, short_id: str, foods: List[str]
@@ -67,9 +109,16 @@ class FoodEventService:
             "time": timestamp.strftime("%H:%M"),
             "foods": [f"[[{food}]]" for food in foods],
         }
-        content = render_frontmatter(payload)
+        with span("render.frontmatter"):
+            content = render_frontmatter(payload)
         return await self.file_store.write_text(Path(self.food_log_dir) / filename, content)
 
     def _normalize_foods(self, foods: Iterable[str]) -> List[str]:
         normalized = [normalize_food_name(food) for food in foods if food.strip()]
+        if self.canonicalizer is not None:
+            normalized = [
+                canonical
+                for canonical in self.canonicalizer.canonicalize_many(normalized)
+                if canonical
+            ]
         return deduplicate_preserve_order(normalized)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from bisect import insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .file_store import FileStore
+from .markdown_helpers import parse_frontmatter, unwrap_wiki_link
+
+LOG_STEM_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+
+@dataclass(slots=True, order=True)
+class FoodLogEntry:
+    timestamp: datetime
+    filename: str
+
+
+@dataclass(slots=True)
+class HistoryItem:
+    timestamp: datetime
+    foods: List[str]
+    condition: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class HistoryPage:
+    items: List[HistoryItem]
+    page: int
+    pages: int
+    total: int
+
+
+def parse_log_filename(name: str) -> datetime | None:
+    if not name.endswith(".md"):
+        return None
+    try:
+        return datetime.strptime(name[:19], LOG_STEM_FORMAT)
+    except ValueError:
+        return None
+
+
+class FoodLogIndex:
+    """Упорядоченный по времени список файлов FoodLog.
+
+    Строится по именам файлов (build_log_filename начинается с метки времени),
+    содержимое читается только для запрошенной страницы."""
+
+    def __init__(
+        self,
+        file_store: FileStore,
+        food_log_dir: str = "FoodLog",
+        condition_log_dir: str = "ConditionLog",
+        *,
+        shared: bool = False,
+    ):
+        self.file_store = file_store
+        self.food_log_dir = food_log_dir
+        self.condition_log_dir = condition_log_dir
+        # Несколько воркеров пишут в один FoodLog: чужие записи подхватываем
+        # повторным листингом каталога, если изменилось его mtime.
+        self._shared = shared
+        self._entries: List[FoodLogEntry] = []
+        self._names: set[str] = set()
+        self._directory_mtime: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self) -> int:
+        directory = self.file_store.resolve(self.food_log_dir)
+        entries: List[FoodLogEntry] = []
+        if directory.exists():
+            self._directory_mtime = directory.stat().st_mtime_ns
+            with os.scandir(directory) as scan:
+                for item in scan:
+                    timestamp = parse_log_filename(item.name)
+                    if timestamp is not None and item.is_file():
+                        entries.append(FoodLogEntry(timestamp, item.name))
+        entries.sort()
+        self._entries = entries
+        self._names = {entry.filename for entry in entries}
+        return len(entries)
+
+    def append(self, path: str | Path) -> None:
+        name = Path(path).name
+        timestamp = parse_log_filename(name)
+        if timestamp is None or name in self._names:
+            return
+        self._names.add(name)
+        # Почти всегда новая запись — самая поздняя, insort тогда кладёт её в конец.
+        insort(self._entries, FoodLogEntry(timestamp, name))
+
+    async def page(self, page: int, page_size: int = 10) -> HistoryPage:
+        if self._shared:
+            await self.file_store.run_io(self._refresh_if_changed)
+        total = len(self._entries)
+        pages = max(1, -(-total // page_size))
+        page = min(max(page, 0), pages - 1)
+        # Страница 0 — самые свежие записи.
+        end = total - page * page_size
+        selected = self._entries[max(0, end - page_size):end]
+        items = await asyncio.gather(*(self._load(entry) for entry in reversed(selected)))
+        return HistoryPage(items=list(items), page=page, pages=pages, total=total)
+
+    def _refresh_if_changed(self) -> None:
+        directory = self.file_store.resolve(self.food_log_dir)
+        if directory.exists() and directory.stat().st_mtime_ns != self._directory_mtime:
+            self.build()
+
+    async def _load(self, entry: FoodLogEntry) -> HistoryItem:
+        food_path = Path(self.food_log_dir) / entry.filename
+        condition_path = Path(self.condition_log_dir) / entry.filename
+        food_text, condition_text = await asyncio.gather(
+            self._read_optional(food_path), self._read_optional(condition_path)
+        )
+        foods = parse_frontmatter(food_text).get("foods") or []
+        return HistoryItem(
+            timestamp=entry.timestamp,
+            foods=[unwrap_wiki_link(str(item)) for item in foods if item],
+            condition=parse_frontmatter(condition_text),
+        )
+
+    async def _read_optional(self, relative_path: Path) -> str:
+        try:
+            return await self.file_store.read_text(relative_path)
+        except FileNotFoundError:
+            return ""
@@ -1,28 +1,64 @@
 from __future__ import annotations
 
+import asyncio
 from pathlib import Path
 from typing import Iterable, List
 
 from ..domain.normalize import sanitize_filename
+from ..tracing import span
 from .file_store import FileStore
+from .ingredient_index import IngredientPrefixIndex
 
 
 class FoodsService:
-    def __init__(self, file_store: FileStore, foods_dir: str = "Foods"):
+    def __init__(
+        self,
+        file_store: FileStore,
+        foods_dir: str = "Foods",
+        prefix_index: IngredientPrefixIndex | None = None,
+    ):
         self.file_store = file_store
         self.foods_dir = foods_dir
+        self.prefix_index = prefix_index
 
     async def ensure_notes(self, foods: Iterable[str]) -> List[Path]:
-        created_paths: List[Path] = []
+        foods = list(foods)
+        with span("foods.ensure_notes") as current:
+            # Подбор имён читает чужие заметки с диска — делаем это одной задачей I/O-пула.
+            paths = await self.file_store.run_io(self._select_unique_paths, foods)
+            # Пути уже уникальны, поэтому заметки можно создавать параллельно всем пулом.
+            writes = [
+                self.file_store.ensure_file(
+                    path, default_content=self._build_default_content(food, path.name)
+                )
+                for food, path in zip(foods, paths)
+            ]
+            created_paths = list(await asyncio.gather(*writes))
+            if self.prefix_index is not None:
+                for food in foods:
+                    self.prefix_index.add(food)
+            if current is not None:
+                current.attributes["foods"] = len(created_paths)
+        return created_paths
+
+    def list_names(self) -> List[str]:
+        directory = self.file_store.resolve(self.foods_dir)
+        if not directory.exists():
+            return []
+        names: List[str] = []
+        for note in directory.glob("*.md"):
+            content = note.read_text(encoding="utf-8")
+            names.append(self._extract_frontmatter_value(content, "original_name") or note.stem)
+        return names
+
+    def _select_unique_paths(self, foods: List[str]) -> List[Path]:
         reserved_names: set[str] = set()
+        paths: List[Path] = []
         for food in foods:
             path = self._select_unique_path(food, reserved_names)
             reserved_names.add(path.name)
-            filename = path.name
-            default_content = self._build_default_content(food, filename)
-            result = await self.file_store.ensure_file(path, default_content=default_content)
-            created_paths.append(result)
-        return created_paths
+            paths.append(path)
+        return paths
 
     def _select_unique_path(self, food: str, reserved_names: set[str]) -> Path:
         base_name = sanitize_filename(food)
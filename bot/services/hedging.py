@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Скользящее окно времён ответа; по нему считается задержка до резервного запроса."""
+
+    def __init__(
+        self,
+        *,
+        window: int = 200,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        initial: float = 5.0,
+        floor: float = 0.5,
+        ceiling: float = 30.0,
+    ):
+        self.window = window
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.initial = initial
+        self.floor = floor
+        self.ceiling = ceiling
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def empty_copy(self) -> LatencyTracker:
+        return LatencyTracker(
+            window=self.window,
+            quantile=self.quantile,
+            min_samples=self.min_samples,
+            initial=self.initial,
+            floor=self.floor,
+            ceiling=self.ceiling,
+        )
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, quantile: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        position = min(len(samples) - 1, max(0, math.ceil(quantile * len(samples)) - 1))
+        return samples[position]
+
+    def hedge_delay(self) -> float:
+        if len(self) < self.min_samples:
+            return self.initial
+        value = self.percentile(self.quantile)
+        return min(self.ceiling, max(self.floor, value if value is not None else self.initial))
+
+
+@dataclass(slots=True)
+class HedgedResult(Generic[T]):
+    value: T
+    winner: str
+    hedged: bool
+
+
+async def hedged_call(
+    primary: Callable[[], Awaitable[T]],
+    backup: Callable[[], Awaitable[T]],
+    delay: float,
+    *,
+    on_latency: Callable[[str, float], None] | None = None,
+) -> HedgedResult[T]:
+    """Запускает primary; если за delay ответа нет, параллельно запускает backup.
+
+    Возвращается первый успешный ответ, второй запрос отменяется. Если primary
+    падает раньше delay, backup стартует сразу. on_latency получает время каждой
+    попытки; у отменённой это время до отмены — оценка снизу, без которой медленные
+    ответы пропадали бы из окна и p95 сползал бы вниз."""
+    started: dict[asyncio.Task, tuple[str, float]] = {}
+
+    def launch(name: str, factory: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        task = asyncio.ensure_future(factory())
+        started[task] = (name, time.perf_counter())
+        return task
+
+    def report(task: asyncio.Task) -> None:
+        if on_latency is not None:
+            name, start = started[task]
+            on_latency(name, time.perf_counter() - start)
+
+    pending = {launch("primary", primary)}
+    hedged = False
+    error: BaseException | None = None
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        while True:
+            for task in done:
+                report(task)
+                if task.exception() is None:
+                    return HedgedResult(task.result(), started[task][0], hedged)
+                error = task.exception()
+            if not hedged:
+                hedged = True
+                pending.add(launch("backup", backup))
+            if not pending and error is not None:
+                raise error
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in pending:
+            task.cancel()
+            report(task)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, Set
+
+from ..domain.canonicalize import (
+    canonical_key,
+    canonical_name,
+    max_edit_distance,
+    trigrams,
+    typo_distance,
+)
+from .file_lock import InterProcessLock
+from .file_store import FileStore
+
+
+class IngredientCanonicalizer:
+    def __init__(
+        self,
+        file_store: FileStore,
+        filename: str = "ingredient_aliases.json",
+        *,
+        max_candidates: int = 8,
+        max_posting: int = 256,
+        cache_size: int = 100_000,
+    ):
+        self._file_store = file_store
+        self._filename = filename
+        self._path = file_store.resolve(filename)
+        self._lock = asyncio.Lock()
+        self._file_lock = InterProcessLock(self._path.with_name(f".{self._path.name}.lock"))
+        self._max_candidates = max_candidates
+        self._max_posting = max_posting
+        self._cache_size = cache_size
+        # Ключ сравнения (canonical_key) → имя продукта в том написании, что увидели первым.
+        self._aliases: Dict[str, str] = {}
+        # Словарь слов из канонических имён: нечёткий поиск идёт по словам, а не по именам.
+        self._words: Set[str] = set()
+        self._trigram_index: Dict[str, List[str]] = {}
+        self._cache: Dict[str, str] = {}
+        self._dirty = False
+        self._loaded_version = self._file_version()
+        for alias, canonical in self._load().items():
+            self.add_alias(alias, canonical)
+        self._dirty = False
+
+    def _file_version(self) -> tuple[int, int] | None:
+        # Файл заменяется атомарно, поэтому новый inode выдаёт запись и при грубом mtime.
+        if not self._path.exists():
+            return None
+        stat = self._path.stat()
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _load(self) -> Dict[str, str]:
+        if not self._path.exists():
+            return {}
+        data = json.loads(self._path.read_text(encoding="utf-8"))
+        return dict(data.get("aliases", {}))
+
+    async def save(self) -> None:
+        async with self._lock:
+            if not self._dirty:
+                return
+            try:
+                # Другие воркеры пишут тот же файл: под межпроцессной блокировкой
+                # дочитываем их синонимы и сохраняем объединение, а не свою копию.
+                async with self._file_lock:
+                    for alias, canonical in (await self._file_store.run_io(self._load)).items():
+                        self._merge_alias(alias, canonical)
+                    # Сериализуем в цикле: словарь может меняться, пока пул пишет файл.
+                    content = json.dumps(
+                        {"aliases": self._aliases}, ensure_ascii=False, indent=0, sort_keys=True
+                    )
+                    self._dirty = False
+                    await self._file_store.write_text(self._filename, content)
+                    self._loaded_version = await self._file_store.run_io(self._file_version)
+            except BaseException:
+                self._dirty = True
+                raise
+
+    async def refresh(self) -> None:
+        """Подхватывает синонимы, которые другие воркеры (например, /alias) уже сохранили."""
+        version = await self._file_store.run_io(self._file_version)
+        if version == self._loaded_version:
+            return
+        async with self._lock:
+            # Версия снята до чтения: запись, случившаяся позже, заметится в следующий раз.
+            for alias, canonical in (await self._file_store.run_io(self._load)).items():
+                self._merge_alias(alias, canonical)
+            self._loaded_version = version
+
+    def _merge_alias(self, alias: str, canonical: str) -> None:
+        current = self._aliases.get(alias)
+        # Свои записи новее прочитанных с диска. Исключение — явный синоним с диска
+        # поверх своей записи «имя → само себя»: его добавил администратор.
+        if current is not None and (
+            canonical_key(current) != alias or canonical_key(canonical) == alias
+        ):
+            return
+        self._register_canonical(canonical)
+        self._index_words(alias)
+        self._aliases[alias] = canonical
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def add_alias(self, alias: str, canonical: str) -> None:
+        alias_key = canonical_key(alias)
+        target_key = canonical_key(canonical)
+        if not alias_key or not target_key:
+            return
+        # Синоним синонима ведёт сразу к итоговому продукту в уже известном написании.
+        name = self._aliases.get(target_key) or canonical_name(canonical)
+        self._register_canonical(name)
+        self._index_words(alias_key)
+        if self._aliases.get(alias_key) != name:
+            self._aliases[alias_key] = name
+            self._dirty = True
+            self._cache.clear()
+
+    def canonicalize(self, raw: str) -> str:
+        cached = self._cache.get(raw)
+        if cached is not None:
+            return cached
+        key = canonical_key(raw)
+        if not key:
+            return key
+        result = self._aliases.get(key)
+        if result is None:
+            # Нечёткое совпадение живёт только в кэше процесса: в таблицу синонимов
+            # попадают лишь явные add_alias, поэтому ошибка склейки не сохраняется навсегда.
+            result = self._fuzzy_match(key)
+            if result is None:
+                result = canonical_name(raw)
+                self._register_canonical(result)
+        if len(self._cache) >= self._cache_size:
+            self._cache.clear()
+        self._cache[raw] = result
+        return result
+
+    def canonicalize_many(self, values: Iterable[str]) -> List[str]:
+        return [self.canonicalize(value) for value in values]
+
+    def _register_canonical(self, name: str) -> None:
+        key = canonical_key(name)
+        if key in self._aliases:
+            return
+        self._index_words(key)
+        self._aliases[key] = name
+        self._dirty = True
+
+    def _index_words(self, name: str) -> None:
+        for word in name.split():
+            if word not in self._words:
+                self._words.add(word)
+                for gram in _word_grams(word):
+                    self._trigram_index.setdefault(gram, []).append(word)
+
+    def _fuzzy_match(self, key: str) -> str | None:
+        # Исправляем опечатку ровно в одном незнакомом слове: знакомое слово
+        # («вареная» рядом с «жареная») означает другой продукт, а не описку.
+        words = key.split()
+        unknown = [index for index, word in enumerate(words) if word not in self._words]
+        if len(unknown) != 1:
+            return None
+        position = unknown[0]
+        best: str | None = None
+        best_distance = 0
+        for candidate in self._similar_words(words[position]):
+            distance = typo_distance(words[position], candidate)
+            if distance is None:
+                continue
+            words[position] = candidate
+            resolved = self._aliases.get(" ".join(words))
+            if resolved is not None and (best is None or distance < best_distance):
+                best, best_distance = resolved, distance
+        return best
+
+    def _similar_words(self, word: str) -> List[str]:
+        limit = max_edit_distance(word)
+        if limit == 0:
+            return []
+        shared: Counter[str] = Counter()
+        used = 0
+        for gram in _word_grams(word):
+            posting = self._trigram_index.get(gram, ())
+            if len(posting) <= self._max_posting:
+                shared.update(posting)
+                used += 1
+        # Одна правка разрушает не больше трёх триграмм.
+        required = used - 3 * limit
+        candidates = [
+            candidate
+            for candidate, count in shared.items()
+            if count >= required and abs(len(candidate) - len(word)) <= limit
+        ]
+        if len(candidates) > self._max_candidates:
+            candidates.sort(key=shared.__getitem__, reverse=True)
+            del candidates[self._max_candidates :]
+        return candidates
+
+
+def _word_grams(word: str) -> Set[str]:
+    # Опечатка не меняет первую букву, поэтому триграммы индексируем вместе с ней, а
+    # начальные «  а»/« аб» пропускаем: они и так заданы первой буквой и дают самые
+    # длинные списки кандидатов.
+    return {word[0] + gram for gram in trigrams(word) if gram[0] != " "}
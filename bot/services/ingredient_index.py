@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from ..domain.normalize import normalize_food_name
+from ..fsm.storage import open_shared_database
+
+# Строка общих счётчиков в ingredient_usage: id пользователей Telegram положительные.
+GLOBAL_USER = 0
+
+
+class IngredientPrefixIndex:
+    """Подсказки ингредиентов по префиксу: поиск в памяти, ранжирование по частоте.
+
+    С path счётчики использования хранятся в общей SQLite-базе: переживают
+    перезапуск, а refresh() подтягивает то, что насчитали другие воркеры."""
+
+    def __init__(
+        self, *, scan_limit: int = 256, cache_depth: int = 50, path: Path | None = None
+    ):
+        self._names: List[str] = []
+        self._known: set[str] = set()
+        self._counts: Dict[str, int] = {}
+        self._user_counts: Dict[int, Dict[str, int]] = {}
+        self._top_cache: Dict[str, List[str]] = {}
+        self._scan_limit = scan_limit
+        self._cache_depth = cache_depth
+        self._connection = None
+        self._lock = threading.Lock()
+        # seq растёт с каждой записью: refresh() читает только изменившиеся строки.
+        self._synced = 0
+        if path is not None:
+            self._connection = open_shared_database(path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ingredient_usage ("
+                "user_id INTEGER NOT NULL, name TEXT NOT NULL, uses INTEGER NOT NULL, "
+                "seq INTEGER NOT NULL, PRIMARY KEY (user_id, name))"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ingredient_usage_seq ON ingredient_usage (seq)"
+            )
+            self._apply(self._fetch_since(0))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str) -> bool:
+        key = normalize_food_name(name)
+        if not key or key in self._known:
+            return False
+        self._known.add(key)
+        insort(self._names, key)
+        self._invalidate(key)
+        return True
+
+    def add_many(self, names: Iterable[str]) -> None:
+        fresh = {normalize_food_name(name) for name in names} - self._known - {""}
+        if not fresh:
+            return
+        self._known.update(fresh)
+        self._names = sorted(self._known)
+        self._top_cache.clear()
+
+    def record_usage(self, user_id: int | None, names: Iterable[str]) -> None:
+        user_counts = self._user_counts.setdefault(user_id, {}) if user_id is not None else None
+        for name in names:
+            key = normalize_food_name(name)
+            if not key:
+                continue
+            self.add(key)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if user_counts is not None:
+                user_counts[key] = user_counts.get(key, 0) + 1
+            self._invalidate(key)
+
+    async def record(self, user_id: int | None, names: Iterable[str]) -> None:
+        keys = [key for key in (normalize_food_name(name) for name in names) if key]
+        self.record_usage(user_id, keys)
+        if self._connection is not None and keys:
+            await asyncio.to_thread(self._store, user_id, Counter(keys))
+
+    async def refresh(self) -> None:
+        if self._connection is None:
+            return
+        rows = await asyncio.to_thread(self._fetch_since, self._synced)
+        self._apply(rows)
+
+    def _store(self, user_id: int | None, uses: Counter[str]) -> None:
+        owners = [GLOBAL_USER] if user_id is None else [GLOBAL_USER, user_id]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                (seq,) = self._connection.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM ingredient_usage"
+                ).fetchone()
+                self._connection.executemany(
+                    "INSERT INTO ingredient_usage VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, name) DO UPDATE SET "
+                    "uses = uses + excluded.uses, seq = excluded.seq",
+                    [(owner, name, count, seq) for owner in owners for name, count in uses.items()],
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _fetch_since(self, seq: int) -> List[Tuple[int, str, int, int]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT user_id, name, uses, seq FROM ingredient_usage WHERE seq > ?", (seq,)
+            ).fetchall()
+
+    def _apply(self, rows: List[Tuple[int, str, int, int]]) -> None:
+        # В базе — итоговые значения, поэтому свои же записи применяются повторно без вреда.
+        fresh = {name for _, name, _, _ in rows} - self._known
+        if fresh:
+            self.add_many(fresh)
+        for user_id, name, uses, seq in rows:
+            if user_id == GLOBAL_USER:
+                self._counts[name] = uses
+                self._invalidate(name)
+            else:
+                self._user_counts.setdefault(user_id, {})[name] = uses
+            self._synced = max(self._synced, seq)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+
+    def complete(self, prefix: str, k: int = 10, user_id: int | None = None) -> List[str]:
+        key = normalize_food_name(prefix)
+        result: List[str] = []
+        user_counts = self._user_counts.get(user_id) if user_id is not None else None
+        if user_counts:
+            own = [name for name in user_counts if name.startswith(key)]
+            result = heapq.nlargest(k, sorted(own), key=user_counts.__getitem__)
+        if len(result) >= k:
+            return result
+        seen = set(result)
+        for name in self._global_top(key, k + len(result)):
+            if name not in seen:
+                result.append(name)
+                if len(result) == k:
+                    break
+        return result
+
+    def _global_top(self, key: str, k: int) -> List[str]:
+        low = bisect_left(self._names, key)
+        high = bisect_left(self._names, key + "\uffff", low)
+        if high - low <= self._scan_limit or k > self._cache_depth:
+            return heapq.nlargest(k, self._names[low:high], key=self._count)
+        cached = self._top_cache.get(key)
+        if cached is None:
+            cached = heapq.nlargest(self._cache_depth, self._names[low:high], key=self._count)
+            self._top_cache[key] = cached
+        return cached[:k]
+
+    def _count(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+    def _invalidate(self, key: str) -> None:
+        if not self._top_cache:
+            return
+        for length in range(len(key) + 1):
+            self._top_cache.pop(key[:length], None)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from ..fsm.storage import open_shared_database
+
+
+class SQLiteLease:
+    def __init__(self, path: Path, name: str, *, ttl_seconds: float = 90.0, owner: str | None = None):
+        self.name = name
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._ttl = ttl_seconds
+        self._connection = open_shared_database(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> bool:
+        return await asyncio.to_thread(self._acquire, time.time())
+
+    def _acquire(self, now: float) -> bool:
+        with self._lock:
+            # Захват и продление — одна атомарная операция: чужую живую аренду не трогаем.
+            cursor = self._connection.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, "
+                "expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (self.name, self.owner, now + self._ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    async def release(self) -> None:
+        await asyncio.to_thread(self._release)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM leases WHERE name = ? AND owner = ?", (self.name, self.owner)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
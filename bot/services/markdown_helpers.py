@@ -1,9 +1,35 @@
 from __future__ import annotations
 
+import re
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-import yaml
+# Неявные резолверы YAML 1.1 из yaml.resolver: строку, которая под них подходит,
+# safe_dump берёт в кавычки, иначе при чтении она станет датой, числом или bool.
+_IMPLICIT_SCALAR = re.compile(
+    r"""^(?:yes|Yes|YES|no|No|NO|true|True|TRUE|false|False|FALSE|on|On|ON|off|Off|OFF
+    |[-+]?(?:[0-9][0-9_]*)\.[0-9_]*(?:[eE][-+][0-9]+)?
+    |\.[0-9][0-9_]*(?:[eE][-+][0-9]+)?
+    |[-+]?[0-9][0-9_]*(?::[0-5]?[0-9])+\.[0-9_]*
+    |[-+]?\.(?:inf|Inf|INF)
+    |\.(?:nan|NaN|NAN)
+    |[-+]?0b[0-1_]+
+    |[-+]?0[0-7_]+
+    |[-+]?(?:0|[1-9][0-9_]*)
+    |[-+]?0x[0-9a-fA-F_]+
+    |[-+]?[1-9][0-9_]*(?::[0-5]?[0-9])+
+    |<<|~|null|Null|NULL|=
+    |[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]
+    |[0-9][0-9][0-9][0-9]\ -[0-9][0-9]?\ -[0-9][0-9]?
+     (?:[Tt]|[\ \t]+)[0-9][0-9]?
+     :[0-9][0-9]\ :[0-9][0-9]\ (?:\.[0-9]*)?
+     (?:[\ \t]*(?:Z|[-+][0-9][0-9]?(?::[0-9][0-9])?))?)$""",
+    re.X,
+)
+_KEY = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLAIN_FORBIDDEN_START = frozenset("#,[]{}&*!|>'\"%@`")
+# Дальше этой колонки emitter PyYAML начинает переносить строки по пробелам.
+_YAML_WIDTH = 80
 
 
 def build_log_filename(timestamp: datetime, short_id: str) -> str:
@@ -11,6 +37,97 @@ def build_log_filename(timestamp: datetime, short_id: str) -> str:
     return f"{slug}_{short_id}.md"
 
 
+def parse_frontmatter(content: str) -> Dict[str, Any]:
+    if not content.startswith("---"):
+        return {}
+    end = content.find("\n---", 3)
+    if end == -1:
+        return {}
+    import yaml
+
+    try:
+        return yaml.safe_load(content[3:end]) or {}
+    except yaml.YAMLError:
+        return {}
+
+
+def unwrap_wiki_link(value: str) -> str:
+    value = value.strip()
+    if value.startswith("[[") and value.endswith("]]"):
+        return value[2:-2].strip()
+    return value
+
+
 def render_frontmatter(payload: Dict[str, Any]) -> str:
-    yaml_body = yaml.safe_dump(payload, allow_unicode=True, sort_keys=False).strip()
+    yaml_body = _emit_flat_yaml(payload)
+    if yaml_body is None:
+        import yaml
+
+        yaml_body = yaml.safe_dump(payload, allow_unicode=True, sort_keys=False).strip()
     return f"---\n{yaml_body}\n---\n\n#foodtracker\n"
+
+
+def _emit_flat_yaml(payload: Dict[str, Any]) -> str | None:
+    """Побайтово повторяет yaml.safe_dump для плоских схем логов (строки, bool, int,
+    списки строк). None — значение не из схемы или спорное, тогда рендерит PyYAML."""
+    lines: List[str] = []
+    for key, value in payload.items():
+        if not isinstance(key, str) or not _KEY.match(key) or _IMPLICIT_SCALAR.match(key):
+            return None
+        if isinstance(value, list):
+            if not value:
+                lines.append(f"{key}: []")
+                continue
+            lines.append(f"{key}:")
+            for item in value:
+                scalar = _emit_scalar(item, 2)
+                if scalar is None:
+                    return None
+                lines.append(f"- {scalar}")
+            continue
+        scalar = _emit_scalar(value, len(key) + 2)
+        if scalar is None:
+            return None
+        lines.append(f"{key}: {scalar}")
+    if not lines:
+        return None
+    return "\n".join(lines)
+
+
+def _emit_scalar(value: Any, column: int) -> str | None:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if type(value) is int:
+        return str(value)
+    if type(value) is not str:
+        return None
+    if not value:
+        return "''"
+    # Непечатаемые символы, табы и переводы строк PyYAML пишет в двойных кавычках
+    # или переносит — такие строки отдаём ему целиком.
+    if not value.isprintable():
+        return None
+    if _is_plain(value):
+        rendered = value
+    else:
+        rendered = "'" + value.replace("'", "''") + "'"
+    if column + len(rendered) > _YAML_WIDTH and " " in value:
+        return None
+    return rendered
+
+
+def _is_plain(value: str) -> bool:
+    first = value[0]
+    if first in _PLAIN_FORBIDDEN_START or first == " " or value[-1] == " ":
+        return False
+    if first in "?:-" and (len(value) == 1 or value[1] == " "):
+        return False
+    if value.startswith(("---", "...")):
+        return False
+    if ": " in value or value.endswith(":") or " #" in value:
+        return False
+    return _IMPLICIT_SCALAR.match(value) is None
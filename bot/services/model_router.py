@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Mapping, Sequence, Tuple
+
+from ..metrics import MODEL_CALL_LATENCY, MODEL_ROUTE_DECISIONS, MODEL_TOKENS
+from .hedging import LatencyTracker
+
+# Бюджет времени ответа по задачам: по фото модели заметно медленнее, чем по тексту.
+DEFAULT_SLOS: Dict[str, float] = {
+    "recognize_image": 8.0,
+    "guess_image": 8.0,
+    "guess_text": 4.0,
+    "guess_batch": 6.0,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class ModelProfile:
+    name: str
+    # Цена за миллион токенов; важна только для сравнения моделей между собой.
+    price: float
+
+
+@dataclass(slots=True)
+class _ModelStats:
+    latency: LatencyTracker
+    outcomes: Deque[bool]
+    samples: int = 0
+    tokens: float | None = None
+    last_seen: float | None = None
+
+    @property
+    def error_rate(self) -> float:
+        return 1.0 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+
+@dataclass(slots=True)
+class RouteDecision:
+    model: str
+    reason: str
+
+
+class ModelRouter:
+    """Выбирает самую дешёвую модель, чей p95 укладывается в SLO задачи.
+
+    Статистика (время ответа, доля ошибок, токены из usage) ведётся отдельно по
+    паре модель+задача. Модель без статистики или с давно не обновлявшейся
+    статистикой получает запрос вне очереди, а с вероятностью explore запрос
+    уходит случайной модели — иначе оценки «забракованных» моделей не обновятся."""
+
+    def __init__(
+        self,
+        models: Sequence[ModelProfile],
+        *,
+        slos: Mapping[str, float] | None = None,
+        quantile: float = 0.95,
+        max_error_rate: float = 0.2,
+        min_samples: int = 5,
+        window: int = 100,
+        explore: float = 0.05,
+        stale_after: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        rng: random.Random | None = None,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        unknown = set(slos or {}) - set(DEFAULT_SLOS)
+        if unknown:
+            raise ValueError(f"Unknown composition tasks in SLO: {', '.join(sorted(unknown))}")
+        self.models = list(models)
+        self.slos = {**DEFAULT_SLOS, **(slos or {})}
+        self.quantile = quantile
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.explore = explore
+        self.stale_after = stale_after
+        self._window = window
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self._task_tokens: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_stats(self, model: str, task: str) -> _ModelStats:
+        key = (model, task)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = _ModelStats(
+                LatencyTracker(window=self._window, min_samples=1),
+                deque(maxlen=self._window),
+            )
+            self._stats[key] = stats
+        return stats
+
+    def _expected_cost(self, profile: ModelProfile, task: str) -> float:
+        stats = self._get_stats(profile.name, task)
+        tokens = stats.tokens or self._task_tokens.get(task) or 1.0
+        return profile.price * tokens
+
+    def _meets_slo(self, stats: _ModelStats, task: str) -> bool:
+        p95 = stats.latency.percentile(self.quantile)
+        slo = self.slos.get(task)
+        return (
+            stats.error_rate <= self.max_error_rate
+            and p95 is not None
+            and (slo is None or p95 <= slo)
+        )
+
+    def choose(self, task: str) -> RouteDecision:
+        decision = self._decide(task)
+        MODEL_ROUTE_DECISIONS.labels(task, decision.model, decision.reason).inc()
+        return decision
+
+    def _decide(self, task: str) -> RouteDecision:
+        now = self._clock()
+        with self._lock:
+            ordered = sorted(self.models, key=lambda profile: self._expected_cost(profile, task))
+            chosen: str | None = None
+            for profile in ordered:
+                stats = self._get_stats(profile.name, task)
+                if stats.samples < self.min_samples:
+                    return RouteDecision(profile.name, "warmup")
+                if stats.last_seen is not None and now - stats.last_seen > self.stale_after:
+                    # Отмечаем сразу, чтобы за устаревшей оценкой не пошла целая пачка запросов.
+                    stats.last_seen = now
+                    return RouteDecision(profile.name, "stale")
+                if self._meets_slo(stats, task):
+                    chosen = profile.name
+                    break
+            if len(ordered) > 1 and self._rng.random() < self.explore:
+                others = [profile.name for profile in ordered if profile.name != chosen]
+                return RouteDecision(self._rng.choice(others), "explore")
+            if chosen is not None:
+                return RouteDecision(chosen, "slo")
+            # SLO не держит никто — берём модель с лучшим p95 среди работающих.
+            fallback = min(ordered, key=lambda profile: self._fallback_key(profile, task))
+            return RouteDecision(fallback.name, "fallback")
+
+    def _fallback_key(self, profile: ModelProfile, task: str) -> Tuple[bool, float]:
+        stats = self._get_stats(profile.name, task)
+        p95 = stats.latency.percentile(self.quantile)
+        return stats.error_rate > self.max_error_rate, p95 if p95 is not None else float("inf")
+
+    def observe(
+        self,
+        model: str,
+        task: str,
+        seconds: float,
+        outcome: str = "ok",
+        *,
+        usage: Mapping[str, int] | None = None,
+    ) -> None:
+        """outcome: ok, error или cancelled — проигравшая хеджирование попытка.
+
+        Время отменённой попытки — оценка снизу; без неё медленная модель, которую
+        всегда обгоняет резервный запрос, выглядела бы быстрой."""
+        MODEL_CALL_LATENCY.labels(task, model, outcome).observe(seconds)
+        total = None
+        if usage:
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if usage.get(kind):
+                    MODEL_TOKENS.labels(task, model, kind.removesuffix("_tokens")).inc(usage[kind])
+            total = usage.get("total_tokens") or (
+                (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+            )
+        with self._lock:
+            stats = self._get_stats(model, task)
+            stats.last_seen = self._clock()
+            stats.samples += 1
+            if outcome != "cancelled":
+                stats.outcomes.append(outcome == "ok")
+            if outcome != "error":
+                stats.latency.record(seconds)
+            if total:
+                stats.tokens = total if stats.tokens is None else 0.8 * stats.tokens + 0.2 * total
+                previous = self._task_tokens.get(task)
+                self._task_tokens[task] = (
+                    total if previous is None else 0.8 * previous + 0.2 * total
+                )
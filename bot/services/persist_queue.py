@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from aiogram import Bot
+
+from ..domain.models import Condition, FoodEventDraft, PersistedEvent
+from ..fsm.storage import open_shared_database
+from ..tracing import Trace, TraceSink, current_trace, start_trace
+from ..ui.keyboards import start_keyboard
+from .food_event_service import FoodEventService
+
+PENDING_TEXT = "Сохраняю запись…"
+FAILED_TEXT = (
+    "Не удалось сохранить запись после нескольких попыток. "
+    "Нажмите «Добавить еду», чтобы ввести её заново."
+)
+
+# Повторять имеет смысл только сбои ввода-вывода: пустой список продуктов или битая
+# задача при повторе не исправятся, пользователь должен узнать об этом сразу.
+RETRYABLE_ERRORS = (OSError, sqlite3.OperationalError)
+
+logger = logging.getLogger(__name__)
+
+
+def persisted_text(result: PersistedEvent) -> str:
+    return (
+        "Записал событие. Продукты сохранены в FoodLog и симптомы — в ConditionLog.\n"
+        f"Всего ингредиентов: {len(result.foods)}."
+    )
+
+
+@dataclass(slots=True)
+class PersistJob:
+    id: int
+    draft: FoodEventDraft
+    condition: Condition
+    user_id: int | None
+    timestamp: datetime
+    short_id: str
+    chat_id: int | None
+    message_id: int | None
+    attempts: int = 0
+    # Трейс апдейта, который поставил задачу: по нему трейс записи связывается с ним.
+    trace_id: str | None = None
+
+
+class PersistQueue:
+    """Очередь записи событий в общей SQLite-базе.
+
+    Хэндлер кладёт задачу и сразу отвечает пользователю; воркер пишет заметки и
+    правит сообщение-подтверждение. Задача удаляется только после записи, поэтому
+    после падения процесса она будет выполнена повторно: время и short_id хранятся
+    в задаче, повтор перезаписывает те же файлы, а статистика учитывает FoodLog один раз.
+    Пока задача выполняется, аренда продлевается. Повторяются только сбои
+    ввода-вывода; ошибка в данных сразу помечает задачу failed."""
+
+    def __init__(
+        self,
+        path: Path,
+        food_event_service: FoodEventService,
+        *,
+        max_attempts: int = 8,
+        lease_seconds: float = 60.0,
+        retry_base: float = 2.0,
+        retry_cap: float = 300.0,
+        poll_interval: float = 30.0,
+        owner: str | None = None,
+        trace_sink: TraceSink | None = None,
+    ):
+        self.food_event_service = food_event_service
+        self.trace_sink = trace_sink
+        self.max_attempts = max_attempts
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._lease = lease_seconds
+        self._retry_base = retry_base
+        self._retry_cap = retry_cap
+        self._poll_interval = poll_interval
+        self._connection = open_shared_database(path)
+        # available_at у pending — время следующей попытки, у running — конец аренды:
+        # задачу упавшего процесса подберёт любой воркер после её истечения.
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS persist_jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "available_at REAL NOT NULL, owner TEXT, last_error TEXT)"
+        )
+        self._lock = threading.Lock()
+        self._bot: Bot | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(
+        self,
+        draft: FoodEventDraft,
+        condition: Condition,
+        *,
+        user_id: int | None,
+        timestamp: datetime,
+        short_id: str,
+        chat_id: int | None = None,
+        message_id: int | None = None,
+    ) -> int:
+        trace = current_trace()
+        payload = json.dumps(
+            {
+                "draft": draft.model_dump(mode="json"),
+                "condition": condition.model_dump(),
+                "user_id": user_id,
+                "timestamp": timestamp.isoformat(),
+                "short_id": short_id,
+                "chat_id": chat_id,
+                "message_id": message_id,
+                "trace_id": trace.trace_id if trace is not None else None,
+            },
+            ensure_ascii=False,
+        )
+        job_id = await asyncio.to_thread(self._insert, payload, time.time())
+        self._wakeup.set()
+        return job_id
+
+    def _insert(self, payload: str, now: float) -> int:
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO persist_jobs (payload, available_at) VALUES (?, ?)", (payload, now)
+            )
+            return int(cursor.lastrowid)
+
+    async def start(self, bot: Bot) -> None:
+        if self._task:
+            return
+        self._bot = bot
+        # Первый проход сразу подбирает задачи, оставшиеся с прошлого запуска.
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:  # pragma: no cover - shutdown path
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run_pending()
+            delay = await asyncio.to_thread(self._next_delay, time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run_pending(self) -> int:
+        processed = 0
+        while True:
+            job = await asyncio.to_thread(self._claim, time.time())
+            if job is None:
+                return processed
+            await self._process(job)
+            processed += 1
+
+    async def _process(self, job: PersistJob) -> None:
+        # Задача выполняется вне апдейта, поэтому открывает свой трейс: иначе спаны
+        # записи (food_event.persist, foods.ensure_notes, file_store.write) терялись бы.
+        try:
+            with start_trace(
+                "persist_job",
+                job_id=job.id,
+                attempt=job.attempts,
+                user_id=job.user_id,
+                origin_trace=job.trace_id,
+            ) as trace:
+                await self._run(job, trace)
+        finally:
+            if self.trace_sink is not None:
+                self.trace_sink.record(trace)
+
+    async def _run(self, job: PersistJob, trace: Trace) -> None:
+        heartbeat = asyncio.create_task(self._keep_lease(job.id))
+        try:
+            result = await self.food_event_service.persist_event(
+                job.draft,
+                job.condition,
+                user_id=job.user_id,
+                timestamp=job.timestamp,
+                short_id=job.short_id,
+            )
+        except Exception as exc:
+            trace.root.error = type(exc).__name__
+            retryable = isinstance(exc, RETRYABLE_ERRORS)
+            logger.exception(
+                "Persist job %s failed (attempt %s, retryable=%s)", job.id, job.attempts, retryable
+            )
+            exhausted = await asyncio.to_thread(
+                self._fail, job, repr(exc), time.time(), permanent=not retryable
+            )
+            if exhausted:
+                await self._notify(job, FAILED_TEXT)
+            return
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        if not await asyncio.to_thread(self._complete, job.id):
+            # Аренду успел перехватить другой воркер: уведомит он.
+            logger.warning("Persist job %s was taken over by another worker", job.id)
+            return
+        await self._notify(job, persisted_text(result))
+
+    async def _keep_lease(self, job_id: int) -> None:
+        # Медленная запись не должна отдать задачу второму воркеру по истечении аренды.
+        if self._lease <= 0:
+            return
+        while True:
+            await asyncio.sleep(self._lease / 3)
+            try:
+                await asyncio.to_thread(self._extend, job_id, time.time())
+            except Exception:
+                # Занятая база — не повод бросать аренду: попробуем на следующем такте.
+                logger.warning("Could not extend lease of persist job %s", job_id, exc_info=True)
+
+    async def _notify(self, job: PersistJob, text: str) -> None:
+        if self._bot is None or job.chat_id is None:
+            return
+        try:
+            if job.message_id is None:
+                await self._bot.send_message(job.chat_id, text, reply_markup=start_keyboard())
+            else:
+                await self._bot.edit_message_text(
+                    text,
+                    chat_id=job.chat_id,
+                    message_id=job.message_id,
+                    reply_markup=start_keyboard(),
+                )
+        except Exception:
+            # Запись уже на диске; потерянное уведомление не повод повторять задачу.
+            logger.warning("Could not notify chat %s about job %s", job.chat_id, job.id)
+
+    def _claim(self, now: float) -> PersistJob | None:
+        while True:
+            with self._lock:
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._connection.execute(
+                        "SELECT id, payload, attempts FROM persist_jobs "
+                        "WHERE status IN ('pending', 'running') AND available_at <= ? "
+                        "ORDER BY id LIMIT 1",
+                        (now,),
+                    ).fetchone()
+                    if row is not None:
+                        self._connection.execute(
+                            "UPDATE persist_jobs SET status = 'running', owner = ?, "
+                            "attempts = attempts + 1, available_at = ? WHERE id = ?",
+                            (self.owner, now + self._lease, row[0]),
+                        )
+                except BaseException:
+                    self._connection.execute("ROLLBACK")
+                    raise
+                self._connection.execute("COMMIT")
+            if row is None:
+                return None
+            try:
+                return self._decode(row[0], row[1], row[2] + 1)
+            except (ValueError, KeyError, TypeError) as exc:
+                # Битую задачу повтор не починит: помечаем её сразу и берём следующую.
+                logger.error("Persist job %s has a malformed payload: %r", row[0], exc)
+                with self._lock:
+                    self._connection.execute(
+                        "UPDATE persist_jobs SET status = 'failed', owner = NULL, "
+                        "last_error = ? WHERE id = ? AND owner = ?",
+                        (repr(exc), row[0], self.owner),
+                    )
+
+    @staticmethod
+    def _decode(job_id: int, payload: str, attempts: int) -> PersistJob:
+        data = json.loads(payload)
+        return PersistJob(
+            id=job_id,
+            draft=FoodEventDraft.model_validate(data["draft"]),
+            condition=Condition.model_validate(data["condition"]),
+            user_id=data["user_id"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            short_id=data["short_id"],
+            chat_id=data["chat_id"],
+            message_id=data["message_id"],
+            attempts=attempts,
+            trace_id=data.get("trace_id"),
+        )
+
+    def _extend(self, job_id: int, now: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "UPDATE persist_jobs SET available_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (now + self._lease, job_id, self.owner),
+            )
+
+    def _complete(self, job_id: int) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM persist_jobs WHERE id = ? AND owner = ?", (job_id, self.owner)
+            )
+            return cursor.rowcount > 0
+
+    def _fail(self, job: PersistJob, error: str, now: float, *, permanent: bool = False) -> bool:
+        exhausted = permanent or job.attempts >= self.max_attempts
+        delay = min(self._retry_cap, self._retry_base * 2 ** (job.attempts - 1))
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE persist_jobs SET status = ?, available_at = ?, owner = NULL, "
+                "last_error = ? WHERE id = ? AND owner = ?",
+                ("failed" if exhausted else "pending", now + delay, error, job.id, self.owner),
+            )
+        return exhausted and cursor.rowcount > 0
+
+    def _next_delay(self, now: float) -> float:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MIN(available_at) FROM persist_jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()
+        if row is None or row[0] is None:
+            return self._poll_interval
+        return min(self._poll_interval, max(0.0, row[0] - now))
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM persist_jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from aiogram import Bot
+from aiogram.types import PhotoSize
+
+from ..tracing import span
+
+# Bot API отдаёт файлы не больше 20 МБ, фото обычно укладываются в несколько сотен КБ.
+DEFAULT_MAX_PHOTO_BYTES = 20 * 1024 * 1024
+DEFAULT_INITIAL_CAPACITY = 512 * 1024
+
+
+class PhotoTooLargeError(RuntimeError):
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Photo is {size} bytes, limit is {limit}")
+        self.size = size
+        self.limit = limit
+
+
+class PhotoBuffer:
+    """Переиспользуемый приёмник для Bot.download_file: пишет чанки в один bytearray."""
+
+    def __init__(self, limit: int, initial_capacity: int = DEFAULT_INITIAL_CAPACITY):
+        self._limit = limit
+        self._data = bytearray(min(initial_capacity, limit))
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, chunk) -> int:
+        length = len(chunk)
+        end = self._size + length
+        if end > self._limit:
+            raise PhotoTooLargeError(end, self._limit)
+        if end > len(self._data):
+            grown = min(max(end, 2 * len(self._data)), self._limit)
+            self._data.extend(bytes(grown - len(self._data)))
+        self._data[self._size:end] = chunk
+        self._size = end
+        return length
+
+    def flush(self) -> None:
+        pass
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return 0
+
+    def reset(self) -> None:
+        self._size = 0
+
+    def view(self) -> memoryview:
+        return memoryview(self._data)[: self._size]
+
+
+class PhotoFetcher:
+    def __init__(
+        self,
+        *,
+        max_bytes: int = DEFAULT_MAX_PHOTO_BYTES,
+        pool_size: int = 4,
+        initial_capacity: int = DEFAULT_INITIAL_CAPACITY,
+    ):
+        self.max_bytes = max_bytes
+        self._pool_size = pool_size
+        self._initial_capacity = initial_capacity
+        self._free: List[PhotoBuffer] = []
+
+    @asynccontextmanager
+    async def fetch(self, bot: Bot, photo: PhotoSize) -> AsyncIterator[memoryview]:
+        # Представление действительно только внутри блока: после выхода буфер уйдёт
+        # следующему фото, поэтому вниз по конвейеру не сохраняем ссылки на него.
+        self._check_size(getattr(photo, "file_size", None))
+        with span("telegram.get_file"):
+            file = await bot.get_file(photo.file_id)
+        self._check_size(getattr(file, "file_size", None))
+        buffer = self._acquire()
+        try:
+            with span("telegram.download") as current:
+                await bot.download_file(file.file_path, destination=buffer, seek=False)
+                if current is not None:
+                    current.attributes["bytes"] = len(buffer)
+            view = buffer.view()
+            try:
+                yield view
+            finally:
+                view.release()
+        finally:
+            self._release(buffer)
+
+    def _check_size(self, size: int | None) -> None:
+        if size is not None and size > self.max_bytes:
+            raise PhotoTooLargeError(size, self.max_bytes)
+
+    def _acquire(self) -> PhotoBuffer:
+        if self._free:
+            return self._free.pop()
+        return PhotoBuffer(self.max_bytes, self._initial_capacity)
+
+    def _release(self, buffer: PhotoBuffer) -> None:
+        buffer.reset()
+        if len(self._free) < self._pool_size:
+            self._free.append(buffer)
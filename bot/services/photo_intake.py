@@ -5,6 +5,9 @@ from typing import Literal
 
 import aiohttp
 
+from ..metrics import track_external_call
+from ..tracing import span
+
 
 @dataclass(slots=True)
 class PhotoIntakeConfig:
@@ -17,19 +20,23 @@ class PhotoIntakeService:
     def __init__(self, config: PhotoIntakeConfig) -> None:
         self._config = config
 
-    async def classify_image(self, image: bytes) -> Literal["dish", "ingredients"]:
-        payload = await self._post_image(image)
+    async def classify_image(self, image: bytes | memoryview) -> Literal["dish", "ingredients"]:
+        payload = await self._post_image(image, "classify")
         return self._parse_kind(payload)
 
-    async def dish_to_ingredients(self, image: bytes) -> list[str]:
-        payload = await self._post_image(image)
+    async def dish_to_ingredients(self, image: bytes | memoryview) -> list[str]:
+        payload = await self._post_image(image, "dish")
         return self._parse_ingredients(payload)
 
-    async def ocr_ingredients(self, image: bytes) -> list[str]:
-        payload = await self._post_image(image)
+    async def ocr_ingredients(self, image: bytes | memoryview) -> list[str]:
+        payload = await self._post_image(image, "ocr")
         return self._parse_ingredients(payload)
 
-    async def _post_image(self, image: bytes) -> dict:
+    async def _post_image(self, image: bytes | memoryview, operation: str) -> dict:
+        with track_external_call("photo_intake", operation), span(f"photo_intake.{operation}"):
+            return await self._request(image)
+
+    async def _request(self, image: bytes | memoryview) -> dict:
         headers = {"Accept": "application/json"}
         if self._config.token:
             headers["Authorization"] = f"Bearer {self._config.token}"
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from ..fsm.storage import open_shared_database
+
+
+@dataclass(slots=True)
+class RecentMeal:
+    key: str
+    foods: List[str]
+
+
+class RecentMealsCache:
+    """Последние приёмы пищи по пользователям: LRU в памяти процесса.
+
+    С path список пишется и в общую SQLite-базу, а load() перечитывает его перед
+    показом: кнопку «повторить», выданную одним воркером, поймёт любой другой,
+    и история переживает перезапуск. Чужие приёмы пищи не предлагаются никогда."""
+
+    def __init__(self, capacity: int = 5, max_users: int = 1000, *, path: Path | None = None):
+        self._capacity = capacity
+        self._max_users = max_users
+        self._meals: OrderedDict[int | None, OrderedDict[str, List[str]]] = OrderedDict()
+        self._connection = None
+        if path is not None:
+            self._connection = open_shared_database(path)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS recent_meals ("
+                "user_id INTEGER NOT NULL, meal_key TEXT NOT NULL, foods TEXT NOT NULL, "
+                "used_at REAL NOT NULL, PRIMARY KEY (user_id, meal_key))"
+            )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def meal_key(foods: Sequence[str]) -> str:
+        digest = hashlib.sha1("\n".join(foods).encode("utf-8")).hexdigest()
+        return digest[:10]
+
+    def remember(self, user_id: int | None, foods: Sequence[str]) -> RecentMeal | None:
+        items = [food for food in foods if food]
+        if not items:
+            return None
+        bucket = self._meals.get(user_id)
+        if bucket is None:
+            bucket = OrderedDict()
+            self._meals[user_id] = bucket
+            if len(self._meals) > self._max_users:
+                self._evict_user()
+        self._meals.move_to_end(user_id)
+        key = self.meal_key(items)
+        bucket.pop(key, None)
+        bucket[key] = items
+        while len(bucket) > self._capacity:
+            bucket.popitem(last=False)
+        return RecentMeal(key=key, foods=items)
+
+    async def record(self, user_id: int | None, foods: Sequence[str]) -> RecentMeal | None:
+        meal = self.remember(user_id, foods)
+        if meal is not None and user_id is not None and self._connection is not None:
+            await asyncio.to_thread(self._store, user_id, meal, time.time())
+        return meal
+
+    async def load(self, user_id: int | None) -> None:
+        if user_id is None or self._connection is None:
+            return
+        rows = await asyncio.to_thread(self._fetch, user_id)
+        if not rows:
+            return
+        bucket: OrderedDict[str, List[str]] = OrderedDict()
+        # Строки идут от старых к новым, как в LRU.
+        for key, foods in rows:
+            bucket[key] = json.loads(foods)
+        self._meals[user_id] = bucket
+        self._meals.move_to_end(user_id)
+        if len(self._meals) > self._max_users:
+            self._evict_user()
+
+    def _store(self, user_id: int, meal: RecentMeal, now: float) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT INTO recent_meals VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, meal_key) DO UPDATE SET used_at = excluded.used_at",
+                    (user_id, meal.key, json.dumps(meal.foods, ensure_ascii=False), now),
+                )
+                self._connection.execute(
+                    "DELETE FROM recent_meals WHERE user_id = ? AND meal_key NOT IN ("
+                    "SELECT meal_key FROM recent_meals WHERE user_id = ? "
+                    "ORDER BY used_at DESC LIMIT ?)",
+                    (user_id, user_id, self._capacity),
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _fetch(self, user_id: int) -> List[tuple[str, str]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT meal_key, foods FROM recent_meals WHERE user_id = ? ORDER BY used_at",
+                (user_id,),
+            ).fetchall()
+
+    def recent(self, user_id: int | None) -> List[RecentMeal]:
+        bucket = self._bucket(user_id)
+        return [RecentMeal(key=key, foods=list(foods)) for key, foods in reversed(bucket.items())]
+
+    def get(self, user_id: int | None, key: str) -> List[str] | None:
+        foods = self._bucket(user_id).get(key)
+        return list(foods) if foods is not None else None
+
+    def _bucket(self, user_id: int | None) -> Dict[str, List[str]]:
+        return self._meals.get(user_id) or {}
+
+    def close(self) -> None:
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+
+    def _evict_user(self) -> None:
+        self._meals.popitem(last=False)
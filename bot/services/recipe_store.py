@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from ..domain.canonicalize import canonical_key, word_typo_distance
+from ..domain.normalize import deduplicate_preserve_order
+from ..fsm.storage import open_shared_database
+from ..metrics import RECIPE_LOOKUPS
+
+# Больше двух правок в одном слове опечаткой не считается (см. max_edit_distance).
+MAX_TYPO_EDITS = 2
+
+
+def recipe_key(dish: str) -> str:
+    # «Котлета куриная» и «куриная котлета» — одно блюдо: порядок слов не важен.
+    return " ".join(sorted(canonical_key(dish).split()))
+
+
+class RecipeStore:
+    """Личные рецепты: блюдо → принятый пользователем состав.
+
+    Ключ — нормализованное название, поэтому «Борщ» и «борщ.» находят одну запись.
+    Нечётко совпадает только опечатка внутри одного слова: «блины с медом» и
+    «блины с мясом» — разные блюда."""
+
+    def __init__(self, path: Path):
+        self._connection = open_shared_database(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS recipes ("
+            "user_id INTEGER NOT NULL, dish_key TEXT NOT NULL, key_length INTEGER NOT NULL, "
+            "dish TEXT NOT NULL, lines TEXT NOT NULL, uses INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (user_id, dish_key))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS recipes_length ON recipes (user_id, key_length)"
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, user_id: int | None, dish: str) -> List[str] | None:
+        key = recipe_key(dish)
+        if user_id is None or not key:
+            return None
+        lines, outcome = await asyncio.to_thread(self._lookup, user_id, key)
+        RECIPE_LOOKUPS.labels(outcome).inc()
+        if lines is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return lines
+
+    def _lookup(self, user_id: int, key: str) -> tuple[List[str] | None, str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT lines FROM recipes WHERE user_id = ? AND dish_key = ?", (user_id, key)
+            ).fetchone()
+            if row is not None:
+                return json.loads(row[0]), "exact"
+            candidates = self._connection.execute(
+                "SELECT dish_key, lines FROM recipes "
+                "WHERE user_id = ? AND key_length BETWEEN ? AND ?",
+                (user_id, len(key) - MAX_TYPO_EDITS, len(key) + MAX_TYPO_EDITS),
+            ).fetchall()
+        best: tuple[int, str, str] | None = None
+        for candidate, lines in candidates:
+            distance = word_typo_distance(key, candidate)
+            if distance is not None and (best is None or (distance, candidate) < best[:2]):
+                best = (distance, candidate, lines)
+        if best is None:
+            return None, "miss"
+        return json.loads(best[2]), "fuzzy"
+
+    async def remember(self, user_id: int | None, dish: str, lines: List[str]) -> None:
+        key = recipe_key(dish)
+        lines = deduplicate_preserve_order(line.strip() for line in lines if line.strip())
+        if user_id is None or not key or not lines:
+            return
+        await asyncio.to_thread(self._remember, user_id, key, dish.strip(), lines)
+
+    def _remember(self, user_id: int, key: str, dish: str, lines: List[str]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO recipes VALUES (?, ?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(user_id, dish_key) DO UPDATE SET "
+                "dish = excluded.dish, lines = excluded.lines, "
+                "uses = uses + 1, updated_at = excluded.updated_at",
+                (
+                    user_id,
+                    key,
+                    len(key),
+                    dish,
+                    json.dumps(lines, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
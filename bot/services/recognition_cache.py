@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Tuple
+
+
+class RecognitionCache:
+    """Результаты распознавания фото по file_unique_id: LRU в памяти, вытесненное — на диск."""
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        *,
+        capacity: int = 256,
+        max_disk_entries: int = 5000,
+    ):
+        self._directory = directory
+        self._capacity = capacity
+        self._max_disk_entries = max_disk_entries
+        self._memory: OrderedDict[Tuple[str, str], Any] = OrderedDict()
+        self._disk_entries = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._disk_entries = sum(1 for _ in directory.glob("*.json"))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    async def get(self, kind: str, file_unique_id: str | None) -> Any | None:
+        if not file_unique_id:
+            return None
+        key = (kind, file_unique_id)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+        value = None
+        if self._directory is not None:
+            value = await asyncio.to_thread(self._read, self._path(key))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        await self._remember(key, value)
+        return value
+
+    async def put(self, kind: str, file_unique_id: str | None, value: Any) -> None:
+        if not file_unique_id or value is None:
+            return
+        await self._remember((kind, file_unique_id), value)
+
+    async def _remember(self, key: Tuple[str, str], value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        spilled = []
+        while len(self._memory) > self._capacity:
+            spilled.append(self._memory.popitem(last=False))
+        if spilled and self._directory is not None:
+            await asyncio.to_thread(self._spill, spilled)
+
+    def _path(self, key: Tuple[str, str]) -> Path:
+        digest = hashlib.sha1(f"{key[0]}:{key[1]}".encode("utf-8")).hexdigest()
+        return self._directory / f"{digest}.json"
+
+    @staticmethod
+    def _read(path: Path) -> Any | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _spill(self, entries) -> None:
+        for key, value in entries:
+            path = self._path(key)
+            existed = path.exists()
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"value": value}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+            if not existed:
+                self._disk_entries += 1
+        if self._disk_entries > self._max_disk_entries:
+            self._prune()
+
+    def _prune(self) -> None:
+        # Удаляем самые старые записи с запасом, чтобы не сканировать каталог на каждом вытеснении.
+        files = sorted(self._directory.glob("*.json"), key=_mtime)
+        keep = int(self._max_disk_entries * 0.9)
+        for path in files[: max(0, len(files) - keep)]:
+            path.unlink(missing_ok=True)
+        self._disk_entries = min(len(files), keep)
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from ..domain.models import Condition
+from ..fsm.storage import open_shared_database
+from .markdown_helpers import parse_frontmatter, unwrap_wiki_link
+
+SYMPTOMS = ("bloating", "diarrhea")
+# Строка с пустым именем хранит итоги по всем приёмам пищи.
+TOTAL_KEY = ""
+Z_95 = 1.959964
+
+Counts = List[int]  # events, bloating, diarrhea, well_being_sum, well_being_sq
+_ADD_COUNTS = (
+    "INSERT INTO symptom_stats VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(ingredient) DO UPDATE SET "
+    "events = events + excluded.events, "
+    "bloating = bloating + excluded.bloating, "
+    "diarrhea = diarrhea + excluded.diarrhea, "
+    "well_being_sum = well_being_sum + excluded.well_being_sum, "
+    "well_being_sq = well_being_sq + excluded.well_being_sq"
+)
+
+
+@dataclass(slots=True)
+class IngredientStat:
+    ingredient: str
+    exposures: int
+    with_symptom: int
+    lift: float
+    log_odds: float
+    ci_low: float
+    ci_high: float
+    well_being_mean: float
+    well_being_delta: float
+
+
+def _condition_counts(condition: Condition) -> Counts:
+    well_being = condition.well_being
+    return [
+        1,
+        int(condition.bloating),
+        int(condition.diarrhea),
+        well_being,
+        well_being * well_being,
+    ]
+
+
+def _mean_and_variance(count: int, total: int, squares: int) -> Tuple[float, float]:
+    if count == 0:
+        return math.nan, math.nan
+    mean = total / count
+    if count < 2:
+        return mean, math.nan
+    return mean, max(squares - count * mean * mean, 0.0) / (count - 1)
+
+
+def score_ingredient(
+    ingredient: str, counts: Sequence[int], totals: Sequence[int], symptom: str
+) -> IngredientStat:
+    column = 1 + SYMPTOMS.index(symptom)
+    exposures, events = counts[0], totals[0]
+    # Таблица 2×2: ингредиент был/не был × симптом был/не был.
+    a = counts[column]
+    b = exposures - a
+    c = totals[column] - a
+    d = events - exposures - c
+    # Поправка Холдейна: нулевые ячейки не ломают логарифм и дают конечный интервал.
+    log_odds = math.log((a + 0.5) * (d + 0.5) / ((b + 0.5) * (c + 0.5)))
+    margin = Z_95 * math.sqrt(1 / (a + 0.5) + 1 / (b + 0.5) + 1 / (c + 0.5) + 1 / (d + 0.5))
+    base_rate = totals[column] / events if events else 0.0
+    lift = (a / exposures) / base_rate if exposures and base_rate else math.nan
+    mean, _ = _mean_and_variance(exposures, counts[3], counts[4])
+    rest_mean, _ = _mean_and_variance(
+        events - exposures, totals[3] - counts[3], totals[4] - counts[4]
+    )
+    return IngredientStat(
+        ingredient=ingredient,
+        exposures=exposures,
+        with_symptom=a,
+        lift=lift,
+        log_odds=log_odds,
+        ci_low=log_odds - margin,
+        ci_high=log_odds + margin,
+        well_being_mean=mean,
+        well_being_delta=mean - rest_mean,
+    )
+
+
+class SymptomStatsService:
+    """Достаточные статистики «ингредиент × симптом» в общей SQLite-базе.
+
+    Каждый приём пищи обновляет по строке на ингредиент, поэтому рейтинг
+    подозрительных продуктов считается без прохода по хранилищу."""
+
+    def __init__(self, path: Path, *, min_exposures: int = 3):
+        self.min_exposures = min_exposures
+        self._connection = open_shared_database(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS symptom_stats ("
+            "ingredient TEXT PRIMARY KEY, events INTEGER NOT NULL, "
+            "bloating INTEGER NOT NULL, diarrhea INTEGER NOT NULL, "
+            "well_being_sum INTEGER NOT NULL, well_being_sq INTEGER NOT NULL)"
+        )
+        # Учтённые приёмы пищи по имени файла FoodLog: повтор задачи записи не считается дважды.
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS symptom_events (event TEXT PRIMARY KEY)"
+        )
+        self._lock = threading.Lock()
+
+    async def record(
+        self, foods: Iterable[str], condition: Condition, *, event: str | None = None
+    ) -> bool:
+        """Добавляет приём пищи в статистику; False, если событие event уже учтено."""
+        return await asyncio.to_thread(
+            self._record, list(foods), _condition_counts(condition), event
+        )
+
+    def _record(self, foods: List[str], counts: Counts, event: str | None) -> bool:
+        rows = [(name, *counts) for name in [TOTAL_KEY, *dict.fromkeys(foods)]]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if event is not None:
+                    cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO symptom_events VALUES (?)", (event,)
+                    )
+                    if cursor.rowcount == 0:
+                        self._connection.execute("COMMIT")
+                        return False
+                self._connection.executemany(_ADD_COUNTS, rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return True
+
+    async def rank(
+        self, symptom: str = "bloating", limit: int = 10
+    ) -> Tuple[int, List[IngredientStat]]:
+        if symptom not in SYMPTOMS:
+            raise ValueError(f"Unknown symptom: {symptom}")
+        rows = await asyncio.to_thread(self._fetch_all)
+        totals = rows.pop(TOTAL_KEY, None)
+        if totals is None:
+            return 0, []
+        stats = [
+            score_ingredient(name, counts, totals, symptom)
+            for name, counts in rows.items()
+            if counts[0] >= self.min_exposures
+        ]
+        # Сортируем по нижней границе интервала: редкий продукт с парой совпадений
+        # не обгоняет частый с устойчивой связью.
+        stats.sort(key=lambda stat: (-stat.ci_low, -stat.exposures, stat.ingredient))
+        return totals[0], stats[:limit]
+
+    def _fetch_all(self) -> Dict[str, Counts]:
+        with self._lock:
+            cursor = self._connection.execute("SELECT * FROM symptom_stats")
+            return {row[0]: list(row[1:]) for row in cursor}
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM symptom_stats LIMIT 1").fetchone()
+            return row is None
+
+    def rebuild(self, food_log_dir: Path, condition_log_dir: Path) -> int:
+        """Досчитывает за один проход по FoodLog приёмы пищи, которых ещё нет в базе.
+
+        Состояние лежит в ConditionLog под тем же именем. Каждый приём учитывается
+        через symptom_events, как в record(), поэтому пересчёт можно запускать из
+        нескольких воркеров сразу и параллельно с записью: ничего не считается дважды
+        и не стирается. Возвращает число добавленных приёмов."""
+        scanned: List[Tuple[str, List[str], Counts]] = []
+        paths = sorted(food_log_dir.glob("*.md")) if food_log_dir.exists() else []
+        for food_path in paths:
+            condition_path = condition_log_dir / food_path.name
+            if not condition_path.exists():
+                continue
+            condition = _read_condition(condition_path)
+            foods = parse_frontmatter(food_path.read_text(encoding="utf-8")).get("foods") or []
+            names = [unwrap_wiki_link(str(item)) for item in foods if item]
+            if condition is None or not names:
+                continue
+            scanned.append((food_path.name, names, _condition_counts(condition)))
+        aggregated: Dict[str, Counts] = defaultdict(lambda: [0, 0, 0, 0, 0])
+        events = 0
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for event, names, counts in scanned:
+                    cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO symptom_events VALUES (?)", (event,)
+                    )
+                    if cursor.rowcount == 0:
+                        continue
+                    for name in [TOTAL_KEY, *dict.fromkeys(names)]:
+                        aggregated[name] = [
+                            left + right for left, right in zip(aggregated[name], counts)
+                        ]
+                    events += 1
+                self._connection.executemany(
+                    _ADD_COUNTS, [(name, *counts) for name, counts in aggregated.items()]
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return events
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def _read_condition(path: Path) -> Condition | None:
+    payload = parse_frontmatter(path.read_text(encoding="utf-8"))
+    try:
+        return Condition(
+            bloating=bool(payload["bloating"]),
+            diarrhea=bool(payload["diarrhea"]),
+            well_being=int(payload["well_being"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
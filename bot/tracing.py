@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    span_id: int
+    parent_id: int | None
+    start: float
+    end: float | None = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Trace:
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = secrets.token_hex(8)
+        self.started_at = time.time()
+        self._ids = itertools.count(1)
+        self.spans: List[Span] = []
+        self.root = self.open(name, None, attributes)
+
+    def open(self, name: str, parent_id: int | None, attributes: Dict[str, Any]) -> Span:
+        # list.append атомарен, поэтому спаны из asyncio.to_thread пишутся без блокировки.
+        span = Span(name, next(self._ids), parent_id, time.perf_counter(), attributes=attributes)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def to_record(self) -> Dict[str, Any]:
+        origin = self.root.start
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": round(self.started_at, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.root.attributes,
+            "error": self.root.error,
+            "spans": [
+                {
+                    "id": span.span_id,
+                    "parent": span.parent_id,
+                    "name": span.name,
+                    "offset_ms": round((span.start - origin) * 1000, 3),
+                    "duration_ms": round(span.duration * 1000, 3),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in self.spans[1:]
+            ],
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    trace = Trace(name, **attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as exc:
+        trace.root.error = type(exc).__name__
+        raise
+    finally:
+        trace.root.end = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    trace = _current_trace.get()
+    if trace is None:
+        # Вне апдейта (планировщик, скрипты) трассировка ничего не стоит.
+        yield None
+        return
+    parent = _current_span.get()
+    current = trace.open(name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = type(exc).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+class TraceSink:
+    """Пишет отобранные трейсы в JSONL.
+
+    record() только решает и сериализует, а дописывает файл (и ротирует его)
+    фоновый поток: хэндлер на цикле событий не ждёт файловую систему."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        sample_rate: float = 0.01,
+        slow_threshold: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        max_pending: int = 10_000,
+        random_source: Callable[[], float] = random.random,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_bytes = max_bytes
+        self._random = random_source
+        self._lock = threading.Lock()
+        self._queue: queue.Queue[str | None] = queue.Queue(maxsize=max_pending)
+        self._writer: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def should_keep(self, trace: Trace) -> bool:
+        if trace.duration >= self.slow_threshold or trace.root.error is not None:
+            return True
+        return self.sample_rate > 0 and self._random() < self.sample_rate
+
+    def record(self, trace: Trace) -> bool:
+        if not self.should_keep(trace):
+            return False
+        line = json.dumps(trace.to_record(), ensure_ascii=False, default=str) + "\n"
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            # Диск не успевает: трейс теряем, а не тормозим обработку апдейтов.
+            self.dropped += 1
+            return False
+        self._ensure_writer()
+        return True
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._drain, name="trace-sink", daemon=True
+                )
+                self._writer.start()
+
+    def _drain(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            # Всё, что накопилось, дописываем одним открытием файла.
+            while len(lines) < 256:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [line for line in lines if line is not None]
+            try:
+                if batch:
+                    self._rotate_if_needed()
+                    with self.path.open("a", encoding="utf-8") as sink:
+                        sink.writelines(batch)
+                    self.written += len(batch)
+            except OSError:
+                logger.warning("Could not write %d traces to %s", len(batch), self.path)
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+            if len(batch) != len(lines):
+                return
+
+    def _rotate_if_needed(self) -> None:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size >= self.max_bytes:
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
@@ -18,9 +18,14 @@ class AddFlowAction(CallbackData, prefix="addflow"):
         "guess_start",
         "composition_accept",
         "composition_retry",
+        "repeat",
     ]
 
 
+class RepeatMealAction(CallbackData, prefix="repeat"):
+    key: str
+
+
 class ConditionBoolAction(CallbackData, prefix="condbool"):
     symptom: Literal["bloating", "diarrhea"]
     value: Literal["yes", "no", "cancel"]
@@ -44,3 +49,7 @@ class BreathReminderAction(CallbackData, prefix="breathrem"):
 
 class BreathSkipAction(CallbackData, prefix="breathskip"):
     pass
+
+
+class HistoryPageAction(CallbackData, prefix="history"):
+    page: int
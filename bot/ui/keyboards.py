@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Sequence
+
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -10,13 +12,17 @@ from .callbacks import (
     BreathSkipAction,
     ConditionBoolAction,
     ConditionWellBeingAction,
+    HistoryPageAction,
     OtherAction,
+    RepeatMealAction,
 )
+from ..services.recent_meals import RecentMeal
 
 
 def start_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="Добавить еду", callback_data=AddFlowAction(action="start"))
+    builder.button(text="Повторить приём пищи", callback_data=AddFlowAction(action="repeat"))
     builder.button(text="Самочувствие", callback_data=AddFlowAction(action="condition"))
     builder.button(text="Другое", callback_data=OtherAction(action="menu"))
     builder.adjust(1)
@@ -26,6 +32,7 @@ def start_keyboard() -> InlineKeyboardMarkup:
 def adding_foods_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="Продолжить ввод", callback_data=AddFlowAction(action="continue"))
+    builder.button(text="Подсказать ингредиент", switch_inline_query_current_chat="")
     builder.button(text="Завершить", callback_data=AddFlowAction(action="finish"))
     builder.button(text="Отменить", callback_data=AddFlowAction(action="cancel"))
     builder.button(
@@ -138,3 +145,28 @@ def composition_result_keyboard() -> InlineKeyboardMarkup:
     )
     builder.adjust(1)
     return builder.as_markup()
+
+
+def recent_meals_keyboard(meals: Sequence[RecentMeal]) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for meal in meals:
+        label = ", ".join(meal.foods)
+        if len(label) > 48:
+            label = label[:47].rstrip() + "…"
+        builder.button(text=label, callback_data=RepeatMealAction(key=meal.key))
+    builder.button(text="Назад", callback_data=OtherAction(action="back"))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def history_keyboard(page: int, pages: int) -> InlineKeyboardMarkup | None:
+    if pages <= 1:
+        return None
+    builder = InlineKeyboardBuilder()
+    if page > 0:
+        builder.button(text="← Новее", callback_data=HistoryPageAction(page=page - 1))
+    builder.button(text=f"{page + 1}/{pages}", callback_data=HistoryPageAction(page=page))
+    if page + 1 < pages:
+        builder.button(text="Старее →", callback_data=HistoryPageAction(page=page + 1))
+    builder.adjust(3)
+    return builder.as_markup()
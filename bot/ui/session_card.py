@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardMarkup, Message
+
+CARD_KEY = "card_message_id"
+
+logger = logging.getLogger(__name__)
+
+CardId = Tuple[int, int]
+
+
+@dataclass(slots=True)
+class _PendingEdit:
+    bot: Bot
+    state: FSMContext
+    text: str
+    reply_markup: InlineKeyboardMarkup | None
+
+
+def _markup_signature(reply_markup: InlineKeyboardMarkup | None) -> str:
+    return reply_markup.model_dump_json() if reply_markup is not None else ""
+
+
+class SessionCardEditor:
+    """Одна «карточка» на черновик: шаги диалога правят её, а не шлют новые сообщения.
+
+    Правки одной карточки, пришедшие в пределах debounce, склеиваются в один
+    вызов API; правка без изменений не отправляется вовсе. При флуд-контроле
+    последняя правка повторяется через retry_after."""
+
+    def __init__(self, debounce: float = 0.3, *, max_cards: int = 10_000):
+        self.debounce = debounce
+        self._max_cards = max_cards
+        self._pending: Dict[CardId, _PendingEdit] = {}
+        self._tasks: Dict[CardId, asyncio.Task] = {}
+        self._locks: Dict[CardId, asyncio.Lock] = {}
+        # Что сейчас показано в карточке — чтобы не слать «message is not modified».
+        self._shown: OrderedDict[CardId, Tuple[str, str]] = OrderedDict()
+
+    async def show(
+        self,
+        message: Message,
+        state: FSMContext,
+        text: str,
+        reply_markup: InlineKeyboardMarkup | None = None,
+        *,
+        immediate: bool = False,
+    ) -> int:
+        data = await state.get_data()
+        message_id = data.get(CARD_KEY)
+        if message_id is None:
+            sent = await message.answer(text, reply_markup=reply_markup)
+            await state.update_data({CARD_KEY: sent.message_id})
+            self._remember((message.chat.id, sent.message_id), text, reply_markup)
+            return sent.message_id
+        card = (message.chat.id, message_id)
+        self._pending[card] = _PendingEdit(message.bot, state, text, reply_markup)
+        if immediate:
+            task = self._tasks.pop(card, None)
+            if task is not None:
+                task.cancel()
+            # Если карточку пришлось отправить заново, id у неё уже другой.
+            return await self._apply(card)
+        if card not in self._tasks:
+            self._tasks[card] = asyncio.create_task(self._apply_later(card))
+        return message_id
+
+    async def flush(self) -> None:
+        # Повтор после флуд-контроля ставит новую задачу — ждём и её.
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _apply_later(self, card: CardId, delay: float | None = None) -> None:
+        try:
+            await asyncio.sleep(self.debounce if delay is None else delay)
+        except asyncio.CancelledError:
+            return
+        self._tasks.pop(card, None)
+        try:
+            await self._apply(card)
+        except Exception:
+            # Ошибку фоновой правки некому поймать, кроме нас.
+            logger.exception("Session card %s update failed", card)
+
+    async def _apply(self, card: CardId) -> int:
+        chat_id, message_id = card
+        lock = self._locks.setdefault(card, asyncio.Lock())
+        async with lock:
+            edit = self._pending.pop(card, None)
+            if edit is None:
+                return message_id
+            signature = (edit.text, _markup_signature(edit.reply_markup))
+            shown = self._shown.get(card)
+            if shown == signature:
+                return message_id
+            try:
+                if shown is not None and shown[0] == edit.text:
+                    await edit.bot.edit_message_reply_markup(
+                        chat_id=chat_id, message_id=message_id, reply_markup=edit.reply_markup
+                    )
+                else:
+                    await edit.bot.edit_message_text(
+                        edit.text,
+                        chat_id=chat_id,
+                        message_id=message_id,
+                        reply_markup=edit.reply_markup,
+                    )
+            except TelegramRetryAfter as exc:
+                # Более свежая правка, пришедшая за это время, важнее нашей.
+                self._pending.setdefault(card, edit)
+                task = self._tasks.pop(card, None)
+                if task is not None:
+                    task.cancel()
+                self._tasks[card] = asyncio.create_task(
+                    self._apply_later(card, delay=exc.retry_after)
+                )
+                logger.info("Session card %s is rate limited for %ss", card, exc.retry_after)
+                return message_id
+            except TelegramBadRequest as exc:
+                if "not modified" in str(exc):
+                    self._remember(card, edit.text, edit.reply_markup)
+                    return message_id
+                # Карточку удалили или она слишком старая — продолжаем новым сообщением.
+                logger.info("Session card %s is not editable: %s", card, exc)
+                sent = await edit.bot.send_message(
+                    chat_id, edit.text, reply_markup=edit.reply_markup
+                )
+                data = await edit.state.get_data()
+                if data.get(CARD_KEY) == message_id:
+                    await edit.state.update_data({CARD_KEY: sent.message_id})
+                self._remember((chat_id, sent.message_id), edit.text, edit.reply_markup)
+                return sent.message_id
+            self._remember(card, edit.text, edit.reply_markup)
+            return message_id
+
+    def _remember(
+        self, card: CardId, text: str, reply_markup: InlineKeyboardMarkup | None
+    ) -> None:
+        self._shown[card] = (text, _markup_signature(reply_markup))
+        self._shown.move_to_end(card)
+        while len(self._shown) > self._max_cards:
+            evicted, _ = self._shown.popitem(last=False)
+            self._locks.pop(evicted, None)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from pydantic import ValidationError
+
+from .config import Settings
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookUpdateHandler:
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        secret_token: str | None = None,
+        max_concurrency: int = 32,
+    ):
+        self._dispatcher = dispatcher
+        self._bot = bot
+        self._secret_token = secret_token
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self._secret_token and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self._secret_token
+        ):
+            return web.Response(status=401, text="Unauthorized")
+        try:
+            payload = await request.json()
+            update = Update.model_validate(payload, context={"bot": self._bot})
+        except (ValueError, ValidationError):
+            return web.Response(status=400, text="Bad update")
+
+        # Пока все слоты заняты, не отвечаем Telegram — он сам притормозит доставку.
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=200)
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self._dispatcher.feed_update(self._bot, update)
+        except Exception:
+            logger.exception("Failed to process update %s", update.update_id)
+        finally:
+            self._semaphore.release()
+
+    async def drain(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+HANDLER_KEY = web.AppKey("webhook_handler", WebhookUpdateHandler)
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    path: str,
+    secret_token: str | None = None,
+    max_concurrency: int = 32,
+) -> web.Application:
+    handler = WebhookUpdateHandler(
+        dispatcher, bot, secret_token=secret_token, max_concurrency=max_concurrency
+    )
+    app = web.Application()
+    app[HANDLER_KEY] = handler
+    app.router.add_post(path, handler.handle)
+
+    async def _drain(_: web.Application) -> None:
+        await handler.drain()
+
+    app.on_shutdown.append(_drain)
+    return app
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    settings: Settings,
+    *,
+    register_webhook: bool = True,
+) -> None:
+    if not settings.webhook_url:
+        raise RuntimeError("WEBHOOK_URL is not set in environment")
+    app = build_webhook_app(
+        dispatcher,
+        bot,
+        path=settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        max_concurrency=settings.webhook_concurrency,
+    )
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(
+        runner,
+        settings.webhook_host,
+        settings.webhook_port,
+        reuse_port=settings.workers > 1,
+    )
+
+    await dispatcher.emit_startup(bot=bot)
+    try:
+        await site.start()
+        if register_webhook:
+            await bot.set_webhook(
+                url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+                secret_token=settings.webhook_secret,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+        logger.info(
+            "Webhook server listening on %s:%s%s",
+            settings.webhook_host,
+            settings.webhook_port,
+            settings.webhook_path,
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await dispatcher.emit_shutdown(bot=bot)
+        await bot.session.close()
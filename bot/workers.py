@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(worker_index: int) -> None:
+    from .app import run
+
+    try:
+        asyncio.run(run(worker_index=worker_index))
+    except KeyboardInterrupt:  # pragma: no cover - shutdown path
+        pass
+
+
+def run_workers(count: int) -> None:
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_main, args=(index,), name=f"bot-worker-{index}")
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    logger.info("Started %s bot workers", count)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:  # pragma: no cover - shutdown path
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
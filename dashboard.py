@@ -0,0 +1,5 @@
+from bot.dashboard import main
+
+
+if __name__ == "__main__":
+    main()
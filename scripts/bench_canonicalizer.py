@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bot.services.file_store import FileStore
+from bot.services.ingredient_canonicalizer import IngredientCanonicalizer
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Замеряет время канонизации ингредиентов на большой таблице синонимов."
+    )
+    parser.add_argument("--aliases", type=int, default=50_000, help="Размер таблицы.")
+    parser.add_argument("--queries", type=int, default=5_000, help="Число запросов.")
+    return parser
+
+
+def random_name(rng: random.Random) -> str:
+    words = rng.randint(1, 3)
+    return " ".join(
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 9))) for _ in range(words)
+    )
+
+
+def measure(canonicalizer: IngredientCanonicalizer, queries: list[str]) -> float:
+    started = time.perf_counter()
+    for query in queries:
+        canonicalizer.canonicalize(query)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    rng = random.Random(42)
+    names = list({random_name(rng) for _ in range(args.aliases)})
+    with tempfile.TemporaryDirectory() as tmp:
+        canonicalizer = IngredientCanonicalizer(FileStore(Path(tmp)))
+        for name in names:
+            canonicalizer.add_alias(name, name)
+        exact = [name.upper() for name in rng.sample(names, args.queries)]
+        typos = [name[:-1] + "я" for name in rng.sample(names, args.queries)]
+
+        print(f"Таблица синонимов: {len(canonicalizer)}")
+        print(f"Точное совпадение, мкс/запрос: {measure(canonicalizer, exact):.2f}")
+        print(f"Из кэша, мкс/запрос: {measure(canonicalizer, exact):.2f}")
+        print(f"Нечёткий поиск, мкс/запрос: {measure(canonicalizer, typos):.2f}")
+
+
+if __name__ == "__main__":
+    main()
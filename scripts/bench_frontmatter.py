@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import yaml
+
+from bot.services.markdown_helpers import render_frontmatter
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшщыэюя"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Сравнивает рендер frontmatter логов с yaml.safe_dump."
+    )
+    parser.add_argument("--logs", type=int, default=5_000, help="Число логов.")
+    parser.add_argument("--foods", type=int, default=6, help="Продуктов в одном приёме пищи.")
+    return parser
+
+
+def random_name(rng: random.Random) -> str:
+    words = rng.randint(1, 3)
+    return " ".join(
+        "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 9))) for _ in range(words)
+    )
+
+
+def build_payloads(rng: random.Random, count: int, foods: int) -> List[Dict[str, Any]]:
+    payloads: List[Dict[str, Any]] = []
+    for index in range(count):
+        stamp = {"date": "2025-03-12", "time": f"{index % 24:02d}:{index % 60:02d}"}
+        if index % 2 == 0:
+            stamp["foods"] = [f"[[{random_name(rng)}]]" for _ in range(foods)]
+        else:
+            stamp.update(bloating=rng.random() < 0.5, diarrhea=False, well_being=rng.randint(0, 10))
+        payloads.append(stamp)
+    return payloads
+
+
+def yaml_render(payload: Dict[str, Any]) -> str:
+    yaml_body = yaml.safe_dump(payload, allow_unicode=True, sort_keys=False).strip()
+    return f"---\n{yaml_body}\n---\n\n#foodtracker\n"
+
+
+def measure(render: Callable[[Dict[str, Any]], str], payloads: List[Dict[str, Any]]) -> float:
+    started = time.perf_counter()
+    for payload in payloads:
+        render(payload)
+    return (time.perf_counter() - started) / len(payloads) * 1e6
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    payloads = build_payloads(random.Random(42), args.logs, args.foods)
+    mismatches = sum(render_frontmatter(p) != yaml_render(p) for p in payloads)
+    baseline = min(measure(yaml_render, payloads) for _ in range(3))
+    fast = min(measure(render_frontmatter, payloads) for _ in range(3))
+    print(f"yaml.safe_dump:     {baseline:8.1f} мкс/лог")
+    print(f"render_frontmatter: {fast:8.1f} мкс/лог")
+    print(f"ускорение:          {baseline / fast:8.1f}x, расхождений: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from bot.domain.label_parser import parse_label
+
+LABELS = [
+    "Состав: мука пшеничная хлебопекарная высшего сорта, сахар, масло растительное (пальмовое), "
+    "соль 0,5%, разрыхлитель (гидрокарбонат натрия), ароматизатор. Пищевая ценность в 100 г: "
+    "белки 7,5 г, жиры 16 г, углеводы 70 г.",
+    "Состав: молоко нормализованное, закваска на чистых культурах молочнокислых "
+    "микроорганизмов. Хранить при температуре от +2 до +6 °С.",
+    "СОСТАВ ПРОДУКТА: свинина, вода, соль, белок соевый, крахмал картофельный, стабилизаторы "
+    "(Е450, Е451, Е452), усилитель вкуса и аромата (Е621), антиокислитель (Е 316), специи, "
+    "фиксатор окраски (Е250). Может содержать следы горчицы и сельдерея.",
+    "Шоколад молочный. Состав: сахар, какао-масло, молоко сухое цельное, какао тёртое, "
+    "молочный жир, эмульгаторы (лецитин соевый, Е476), ароматизатор; какао-продукты не менее "
+    "30%. Энергетическая ценность 550 ккал.",
+    "Ингредиенты: вода питьевая, сок яблочный концентрированный, сахар, регулятор кислотности "
+    "(лимонная кислота), витамин С.",
+    "Состав: томаты, огурцы маринованные [огурцы, вода, уксус, соль, сахар (тростниковый, "
+    "свекловичный)], лук репчатый, масло подсолнечное рафинированное, перец чёрный молотый.",
+    "Состав - творог (молоко, закваска, фермент), сахар 8,5%, ванилин.",
+    "гречка, курица, лук, морковь, соль, перец",
+]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Замеряет разбор вставленного текста этикеток локальным парсером."
+    )
+    parser.add_argument("--labels", type=int, default=20_000, help="Число строк в корпусе.")
+    return parser
+
+
+def build_corpus(rng: random.Random, count: int) -> list[str]:
+    corpus = []
+    for _ in range(count):
+        label = rng.choice(LABELS)
+        # Этикетки часто вставляют с переносами строк из фото-распознавания.
+        if rng.random() < 0.3:
+            label = label.replace(", ", ",\n", rng.randint(1, 4))
+        corpus.append(label)
+    return corpus
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    corpus = build_corpus(random.Random(42), args.labels)
+    timings = []
+    for label in corpus:
+        started = time.perf_counter()
+        parse_label(label)
+        timings.append((time.perf_counter() - started) * 1e6)
+    items = [len(parse_label(label) or []) for label in LABELS]
+    timings.sort()
+    print(f"Этикеток: {len(corpus)}, позиций в образцах: {items}")
+    print(f"медиана: {statistics.median(timings):6.1f} мкс")
+    print(f"p99:     {timings[int(len(timings) * 0.99)]:6.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
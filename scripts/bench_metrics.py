@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from bot.metrics import HANDLER_LATENCY, REGISTRY
+from bot.middlewares.metrics import MetricsMiddleware
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Замеряет накладные расходы метрик на горячем пути обработки апдейта."
+    )
+    parser.add_argument("--updates", type=int, default=20_000, help="Число апдейтов.")
+    parser.add_argument("--rounds", type=int, default=5, help="Повторы, берётся лучший.")
+    parser.add_argument("--observations", type=int, default=1_000_000, help="Число observe().")
+    return parser
+
+
+def make_update(update_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1741800000,
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+                "text": "паста",
+            },
+        }
+    )
+
+
+def build_dispatcher(with_metrics: bool) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def _handle(message: Message) -> None:
+        return None
+
+    dispatcher = Dispatcher()
+    if with_metrics:
+        dispatcher.message.middleware(MetricsMiddleware("message"))
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+async def measure_updates(dispatcher: Dispatcher, bot: Bot, updates: list[Update]) -> float:
+    started = time.perf_counter()
+    for update in updates:
+        await dispatcher.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1e6
+
+
+async def compare(updates: list[Update], rounds: int) -> tuple[float, float]:
+    bot = Bot(token="42:BENCH")
+    plain, instrumented = build_dispatcher(False), build_dispatcher(True)
+    best_plain = best_instrumented = float("inf")
+    # Чередуем прогоны и берём минимум: одиночные замеры сильно шумят.
+    for _ in range(rounds):
+        best_plain = min(best_plain, await measure_updates(plain, bot, updates))
+        best_instrumented = min(
+            best_instrumented, await measure_updates(instrumented, bot, updates)
+        )
+    await bot.session.close()
+    return best_plain, best_instrumented
+
+
+def measure_observe(count: int) -> float:
+    child = HANDLER_LATENCY.labels("message", "bench", "none")
+    started = time.perf_counter()
+    for index in range(count):
+        child.observe(index * 1e-6)
+    return (time.perf_counter() - started) / count * 1e9
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    updates = [make_update(index) for index in range(args.updates)]
+    baseline, instrumented = asyncio.run(compare(updates, args.rounds))
+    print(f"Апдейт без метрик, мкс: {baseline:.2f}")
+    print(f"Апдейт с метриками, мкс: {instrumented:.2f}")
+    overhead = instrumented - baseline
+    print(f"Накладные расходы: {overhead:.2f} мкс ({overhead / baseline:.1%})")
+    print(f"Histogram.observe, нс: {measure_observe(args.observations):.0f}")
+    started = time.perf_counter()
+    body = REGISTRY.render()
+    print(f"Рендер /metrics: {(time.perf_counter() - started) * 1e3:.2f} мс, {len(body)} байт")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import ClientSession, web
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+
+from bot.webhook import build_webhook_app
+
+TOKEN = "42:BENCH"
+
+
+class StubTelegramApi:
+    def __init__(self) -> None:
+        self.updates: asyncio.Queue[dict] = asyncio.Queue()
+        self.replies: asyncio.Queue[float] = asyncio.Queue()
+        self._message_id = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        if method == "getupdates":
+            form = await request.post()
+            timeout = float(form.get("timeout", 0) or 0)
+            try:
+                update = await asyncio.wait_for(self.updates.get(), timeout=timeout or 0.01)
+                result = [update]
+            except asyncio.TimeoutError:
+                result = []
+            return web.json_response({"ok": True, "result": result})
+        if method == "sendmessage":
+            await self.replies.put(time.perf_counter())
+            self._message_id += 1
+            form = await request.post()
+            return web.json_response(
+                {
+                    "ok": True,
+                    "result": {
+                        "message_id": self._message_id,
+                        "date": 1741800000,
+                        "chat": {"id": int(form["chat_id"]), "type": "private"},
+                        "text": form.get("text", ""),
+                    },
+                }
+            )
+        if method == "getme":
+            return web.json_response(
+                {"ok": True, "result": {"id": 42, "is_bot": True, "first_name": "Bench"}}
+            )
+        return web.json_response({"ok": True, "result": True})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Сравнивает задержку update→ответ для long polling и webhook на заглушке API."
+    )
+    parser.add_argument("--updates", type=int, default=200, help="Число апдейтов на режим.")
+    return parser
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1741800000,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Bench"},
+            "text": "ping",
+        },
+    }
+
+
+def make_dispatcher() -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def _echo(message: Message) -> None:
+        await message.answer("pong")
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+async def start_site(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def summarize(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<8} median={statistics.median(ordered) * 1000:.2f}ms "
+        f"p95={p95 * 1000:.2f}ms max={ordered[-1] * 1000:.2f}ms"
+    )
+
+
+async def bench_polling(api: StubTelegramApi, base_url: str, count: int) -> list[float]:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    dispatcher = make_dispatcher()
+    polling = asyncio.create_task(
+        dispatcher.start_polling(bot, handle_signals=False, polling_timeout=10)
+    )
+    latencies = []
+    try:
+        await asyncio.sleep(0.2)
+        for update_id in range(1, count + 1):
+            started = time.perf_counter()
+            await api.updates.put(make_update(update_id))
+            latencies.append(await api.replies.get() - started)
+    finally:
+        await dispatcher.stop_polling()
+        await polling
+    return latencies
+
+
+async def bench_webhook(api: StubTelegramApi, base_url: str, count: int) -> list[float]:
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base_url)))
+    app = build_webhook_app(make_dispatcher(), bot, path="/webhook")
+    runner = await start_site(app, 8091)
+    latencies = []
+    try:
+        async with ClientSession() as client:
+            for update_id in range(1, count + 1):
+                started = time.perf_counter()
+                async with client.post(
+                    "http://127.0.0.1:8091/webhook", json=make_update(update_id)
+                ) as response:
+                    response.raise_for_status()
+                latencies.append(await api.replies.get() - started)
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+    return latencies
+
+
+async def run(count: int) -> None:
+    api = StubTelegramApi()
+    api_runner = await start_site(api.app(), 8090)
+    base_url = "http://127.0.0.1:8090"
+    try:
+        summarize("polling", await bench_polling(api, base_url, count))
+        summarize("webhook", await bench_webhook(api, base_url, count))
+    finally:
+        await api_runner.cleanup()
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    asyncio.run(run(args.updates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_PATH = ROOT / "data" / ".bot" / "traces.jsonl"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Сводка трейсов бота: p50/p95/p99 по апдейтам и по спанам внутри них."
+    )
+    parser.add_argument(
+        "path", type=Path, nargs="?", default=DEFAULT_PATH, help="JSONL-файл с трейсами."
+    )
+    parser.add_argument("--name", help="Учитывать только трейсы с этим именем (update.message).")
+    parser.add_argument("--top", type=int, default=20, help="Сколько спанов показать.")
+    return parser
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_traces(path: Path, name: str | None = None) -> List[dict]:
+    traces = []
+    with path.open(encoding="utf-8") as source:
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                trace = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if name is None or trace.get("name") == name:
+                traces.append(trace)
+    return traces
+
+
+def summarize(traces: Iterable[dict]) -> Dict[str, Dict[str, List[float]]]:
+    roots: Dict[str, List[float]] = defaultdict(list)
+    spans: Dict[str, List[float]] = defaultdict(list)
+    for trace in traces:
+        roots[trace["name"]].append(trace["duration_ms"])
+        # Один спан может встречаться в трейсе несколько раз (по записи на файл) — суммируем.
+        per_trace: Dict[str, float] = defaultdict(float)
+        for span in trace.get("spans", []):
+            per_trace[span["name"]] += span["duration_ms"]
+        for span_name, total in per_trace.items():
+            spans[span_name].append(total)
+    return {"traces": dict(roots), "spans": dict(spans)}
+
+
+def format_rows(rows: Dict[str, List[float]], top: int | None = None) -> List[str]:
+    lines = [f"{'name':40} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"]
+    ordered = sorted(rows.items(), key=lambda item: -sum(item[1]))
+    for name, values in ordered[:top]:
+        values = sorted(values)
+        lines.append(
+            f"{name:40} {len(values):>7} {percentile(values, 0.5):>10.1f} "
+            f"{percentile(values, 0.95):>10.1f} {percentile(values, 0.99):>10.1f}"
+        )
+    return lines
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if not args.path.exists():
+        print(f"Файл не найден: {args.path}", file=sys.stderr)
+        raise SystemExit(1)
+    traces = load_traces(args.path, args.name)
+    if not traces:
+        print("Трейсов нет.")
+        return
+    summary = summarize(traces)
+    print(f"Трейсов: {len(traces)}\n")
+    print("\n".join(format_rows(summary["traces"])))
+    print()
+    print("\n".join(format_rows(summary["spans"], args.top)))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Sequence, Tuple
 
-import yaml
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.model_selection import train_test_split
@@ -16,7 +15,17 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from bot.analytics.lagged_features import build_lagged_exposures, parse_windows
+from bot.analytics.vault import (
+    clean_food_entry,
+    load_condition_observations,
+    load_frontmatter,
+    load_meals,
+)
 from bot.config import load_settings
+from bot.domain.normalize import deduplicate_preserve_order
+from bot.services.file_store import FileStore
+from bot.services.ingredient_canonicalizer import IngredientCanonicalizer
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -36,30 +45,21 @@ def build_parser() -> argparse.ArgumentParser:
         default=0.2,
         help="Доля тестовой выборки для оценки качества (0-1).",
     )
+    parser.add_argument(
+        "--lag-windows",
+        help=(
+            "Окна экспозиции в часах до записи состояния, например '0-3,3-12,12-48'. "
+            "Без флага состояние сопоставляется только с едой из того же события."
+        ),
+    )
+    parser.add_argument(
+        "--canonicalize",
+        action="store_true",
+        help="Склеивать варианты написания ингредиентов по таблице синонимов бота.",
+    )
     return parser
 
 
-def load_frontmatter(path: Path) -> dict:
-    text = path.read_text(encoding="utf-8")
-    if not text.startswith("---"):
-        return {}
-    end = text.find("\n---", 3)
-    if end == -1:
-        return {}
-    yaml_text = text[3:end]
-    try:
-        return yaml.safe_load(yaml_text) or {}
-    except yaml.YAMLError:
-        return {}
-
-
-def clean_food_entry(value: str) -> str:
-    value = value.strip()
-    if value.startswith("[[") and value.endswith("]]"):
-        value = value[2:-2]
-    return value.strip().lower()
-
-
 def load_food_events(directory: Path) -> Dict[str, List[str]]:
     result: Dict[str, List[str]] = {}
     if not directory.exists():
@@ -101,16 +101,42 @@ def build_dataset(
     return x, y
 
 
+def canonicalize_foods(
+    canonicalizer: IngredientCanonicalizer | None, foods: List[str]
+) -> List[str]:
+    if canonicalizer is None:
+        return foods
+    return deduplicate_preserve_order(
+        item for item in canonicalizer.canonicalize_many(foods) if item
+    )
+
+
+def build_lagged_dataset(
+    data_dir: Path, windows: str, canonicalizer: IngredientCanonicalizer | None = None
+) -> Tuple[object, List[int], List[str]]:
+    meals = load_meals(data_dir / "FoodLog")
+    observations = [
+        item
+        for item in load_condition_observations(data_dir / "ConditionLog")
+        if item.bloating is not None
+    ]
+    exposures = build_lagged_exposures(
+        [meal.timestamp for meal in meals],
+        [canonicalize_foods(canonicalizer, meal.foods) for meal in meals],
+        [item.timestamp for item in observations],
+        windows=parse_windows(windows),
+    )
+    y = [1 if item.bloating else 0 for item in observations]
+    return exposures.to_sparse(), y, exposures.feature_names()
+
+
 def train_model(
-    x: List[List[str]], y: List[int], test_size: float
+    x_transformed, y: List[int], feature_names: Sequence[str], test_size: float
 ) -> None:
-    if len(x) < 2 or len(set(y)) < 2:
+    if len(y) < 2 or len(set(y)) < 2:
         print("Недостаточно данных для обучения (требуются разные метки и минимум 2 записи).")
         return
 
-    mlb = MultiLabelBinarizer()
-    x_transformed = mlb.fit_transform(x)
-
     x_train, x_test, y_train, y_test = train_test_split(
         x_transformed,
         y,
@@ -128,7 +154,7 @@ def train_model(
     print(classification_report(y_test, y_pred, digits=3))
 
     contributions = sorted(
-        zip(mlb.classes_, model.coef_[0]),
+        zip(feature_names, model.coef_[0]),
         key=lambda pair: abs(pair[1]),
         reverse=True,
     )
@@ -144,10 +170,28 @@ def main() -> None:
     settings = load_settings()
     data_dir = (args.data_dir or settings.data_dir).resolve()
 
+    canonicalizer = (
+        IngredientCanonicalizer(FileStore(data_dir)) if args.canonicalize else None
+    )
+
+    if args.lag_windows:
+        x_matrix, y, feature_names = build_lagged_dataset(
+            data_dir, args.lag_windows, canonicalizer
+        )
+        print(f"Найдено {len(y)} записей состояния.")
+        if not y:
+            print("Данных для обучения нет.")
+            return
+        train_model(x_matrix, y, feature_names, args.test_size)
+        return
+
     foods_dir = data_dir / "FoodLog"
     condition_dir = data_dir / "ConditionLog"
 
-    foods = load_food_events(foods_dir)
+    foods = {
+        key: canonicalize_foods(canonicalizer, items)
+        for key, items in load_food_events(foods_dir).items()
+    }
     conditions = load_conditions(condition_dir)
 
     x, y = build_dataset(foods, conditions)
@@ -156,7 +200,9 @@ def main() -> None:
         print("Данных для обучения нет.")
         return
 
-    train_model(x, y, args.test_size)
+    mlb = MultiLabelBinarizer()
+    x_transformed = mlb.fit_transform(x)
+    train_model(x_transformed, y, list(mlb.classes_), args.test_size)
 
 
 if __name__ == "__main__":
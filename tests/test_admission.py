@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.middlewares.admission import EXPENSIVE_FLAG, AdmissionControlMiddleware
+
+
+class StubEvent:
+    def __init__(self):
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, reply_markup=None):
+        self.replies.append(text)
+
+
+def _data(user_id: int, expensive: bool = True) -> dict:
+    return {
+        "handler": SimpleNamespace(flags={EXPENSIVE_FLAG: expensive}),
+        "event_from_user": SimpleNamespace(id=user_id),
+    }
+
+
+def test_admission_queues_and_sheds_load():
+    asyncio.run(_run_admission())
+
+
+async def _run_admission() -> None:
+    middleware = AdmissionControlMiddleware(global_limit=1, per_user_limit=1, max_queue=1)
+    release = asyncio.Event()
+    started: list[int] = []
+
+    async def handler(event, data):
+        started.append(data["event_from_user"].id)
+        await release.wait()
+        return "done"
+
+    first, second, third, repeat = StubEvent(), StubEvent(), StubEvent(), StubEvent()
+    first_task = asyncio.create_task(middleware(handler, first, _data(1)))
+    await asyncio.sleep(0)
+    second_task = asyncio.create_task(middleware(handler, second, _data(2)))
+    await asyncio.sleep(0)
+
+    assert await middleware(handler, repeat, _data(1)) is None
+    assert await middleware(handler, third, _data(3)) is None
+    assert middleware.stats.shed == 2
+    assert repeat.replies == [middleware._busy_text]
+    assert third.replies == [middleware._overloaded_text]
+    assert second.replies == [middleware._queued_text]
+    assert started == [1]
+
+    release.set()
+    assert await first_task == "done"
+    assert await second_task == "done"
+    assert started == [1, 2]
+    assert middleware.stats.admitted == 2
+    assert middleware.stats.in_flight == 0
+    assert len(middleware.stats.recent_waits) == 2
+
+
+def test_cheap_handlers_bypass_admission():
+    asyncio.run(_run_cheap_bypass())
+
+
+async def _run_cheap_bypass() -> None:
+    middleware = AdmissionControlMiddleware(global_limit=1, per_user_limit=1)
+
+    async def handler(event, data):
+        return "ok"
+
+    results = await asyncio.gather(
+        *(middleware(handler, StubEvent(), _data(1, expensive=False)) for _ in range(5))
+    )
+    assert results == ["ok"] * 5
+    assert middleware.stats.admitted == 0
@@ -0,0 +1,133 @@
+import asyncio
+import json
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.fsm.states import FoodLogStates
+from bot.handlers import add_food
+from bot.services.composition_extractor import CompositionExtractor, parse_batch_guess
+from bot.services.recognition_cache import RecognitionCache
+
+
+def test_parse_batch_guess_matches_dishes_loosely():
+    raw = (
+        "```json\n"
+        '{"Борщ": ["свёкла", "капуста", " "], "котлета": "фарш\\nлук", "суп": []}\n'
+        "```"
+    )
+    assert parse_batch_guess(raw, ["борщ", "Котлета", "пюре", "суп"]) == {
+        "борщ": ["свёкла", "капуста"],
+        "Котлета": ["фарш", "лук"],
+    }
+    with pytest.raises(ValueError):
+        parse_batch_guess("не знаю", ["борщ"])
+
+
+def test_guess_batch_sends_one_structured_request(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    asyncio.run(_run_batch_request())
+
+
+async def _run_batch_request():
+    payloads: list[dict] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        payloads.append(await request.json())
+        content = json.dumps(
+            {"борщ": ["свёкла", "капуста"], "пюре": ["картофель", "молоко"]}, ensure_ascii=False
+        )
+        return web.json_response({"choices": [{"message": {"content": content}}]})
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", handle)
+    async with TestServer(app) as server:
+        extractor = CompositionExtractor(endpoint=str(server.make_url("/chat/completions")))
+        result = await extractor.guess_batch(["борщ", "пюре", "борщ", " "])
+        await extractor.close()
+
+    assert result == {"борщ": ["свёкла", "капуста"], "пюре": ["картофель", "молоко"]}
+    assert len(payloads) == 1
+    assert payloads[0]["response_format"] == {"type": "json_object"}
+    assert "- борщ\n- пюре" in payloads[0]["messages"][1]["content"][0]["text"]
+
+
+class CountingExtractor:
+    def __init__(self):
+        self.calls: list[tuple[str, list[str]]] = []
+
+    async def guess_from_text(self, dish_name: str, prompt: str | None = None) -> str:
+        self.calls.append(("single", [dish_name]))
+        return f"{dish_name} основа\nсоль"
+
+    async def guess_batch(self, dishes, prompt: str | None = None):
+        self.calls.append(("batch", list(dishes)))
+        return {dish: [f"{dish} основа", "соль"] for dish in dishes}
+
+
+class StubMessage:
+    def __init__(self, text: str):
+        self.text = text
+        self.photo = []
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, reply_markup=None):
+        self.replies.append(text)
+
+
+def test_multi_dish_guess_costs_one_call_and_caches_each_dish():
+    asyncio.run(_run_multi_dish())
+
+
+async def _run_multi_dish():
+    extractor = CountingExtractor()
+    add_food.setup_dependencies(None, None, extractor, recognition_cache=RecognitionCache())
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+
+    async def guess(text: str) -> list[str]:
+        await state.set_state(FoodLogStates.guess_input)
+        await add_food.handle_guess_input(StubMessage(text), state)
+        return (await state.get_data())["pending_lines"]
+
+    assert await guess("борщ\nкотлета\nпюре") == [
+        "борщ основа",
+        "соль",
+        "котлета основа",
+        "пюре основа",
+    ]
+    assert extractor.calls == [("batch", ["борщ", "котлета", "пюре"])]
+
+    assert await guess("Борщ\nсалат") == ["борщ основа", "соль", "салат основа"]
+    assert extractor.calls[1:] == [("single", ["салат"])]
+
+    assert await guess("котлета\nпюре") == ["котлета основа", "соль", "пюре основа"]
+    assert len(extractor.calls) == 2
+
+
+class ForgetfulExtractor(CountingExtractor):
+    """Пакетный ответ теряет последнее блюдо — как бывает у модели на длинных списках."""
+
+    async def guess_batch(self, dishes, prompt: str | None = None):
+        self.calls.append(("batch", list(dishes)))
+        return {dish: [f"{dish} основа"] for dish in dishes[:-1]}
+
+
+def test_dish_missing_from_batch_answer_is_guessed_alone():
+    asyncio.run(_run_forgotten_dish())
+
+
+async def _run_forgotten_dish():
+    extractor = ForgetfulExtractor()
+    add_food.setup_dependencies(None, None, extractor, recognition_cache=RecognitionCache())
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.set_state(FoodLogStates.guess_input)
+    await add_food.handle_guess_input(StubMessage("борщ\nкотлета\nпюре"), state)
+
+    data = await state.get_data()
+    assert data["pending_lines"] == ["борщ основа", "котлета основа", "пюре основа", "соль"]
+    assert set(data["pending_dishes"]) == {"борщ", "котлета", "пюре"}
+    assert extractor.calls == [("batch", ["борщ", "котлета", "пюре"]), ("single", ["пюре"])]
@@ -0,0 +1,105 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bot.services.markdown_helpers import build_log_filename, render_frontmatter
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Всё, что до start_polling: импорт приложения, настройки, диспетчер и Bot.
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+from aiogram import Bot
+from bot.app import build_dispatcher
+from bot.config import load_settings
+settings = load_settings(use_dotenv=False)
+built = time.perf_counter()
+build_dispatcher(settings)
+build = time.perf_counter() - built
+Bot(token=settings.bot_token)
+print(json.dumps(
+    {"seconds": time.perf_counter() - started, "build": build, "modules": sorted(sys.modules)}
+))
+"""
+# Нужны только в аналитике или при первом обращении к внешним сервисам.
+LAZY_MODULES = ("nicegui", "sklearn", "numpy", "requests", "yaml", "aiohttp.web", "bot.webhook")
+# Собственные модули бота по -X importtime (self time); aiogram сюда не входит.
+OWN_IMPORT_BUDGET_MS = 250
+# Хранилище за полтора года: два-три приёма пищи в день и пара сотен продуктов.
+SEEDED_MEALS = 1200
+SEEDED_FOODS = 250
+# Сканы хранилища при старте (заметки продуктов, индекс FoodLog) — внутри build_dispatcher.
+BUILD_BUDGET_SECONDS = 1
+# Основную часть занимает импорт aiogram, и под -X importtime он заметно медленнее.
+TOTAL_BUDGET_SECONDS = 10
+
+
+def _seed_vault(root: Path) -> None:
+    rng = random.Random(40)
+    foods = [f"продукт {index}" for index in range(SEEDED_FOODS)]
+    for directory in ("FoodLog", "ConditionLog", "Foods"):
+        (root / directory).mkdir(parents=True)
+    for name in foods:
+        (root / "Foods" / f"{name}.md").write_text(
+            f"---\noriginal_name: {name}\n---\n\n#food\n", encoding="utf-8"
+        )
+    started = datetime(2024, 1, 1, 8, 0)
+    for index in range(SEEDED_MEALS):
+        timestamp = started + timedelta(hours=11 * index, seconds=index)
+        filename = build_log_filename(timestamp, f"{index:08x}")
+        day = {"date": timestamp.strftime("%Y-%m-%d"), "time": timestamp.strftime("%H:%M")}
+        meal = [f"[[{name}]]" for name in rng.sample(foods, 4)]
+        (root / "FoodLog" / filename).write_text(
+            render_frontmatter({**day, "foods": meal}), encoding="utf-8"
+        )
+        condition = {
+            **day,
+            "bloating": rng.random() < 0.2,
+            "diarrhea": rng.random() < 0.1,
+            "well_being": rng.randint(3, 9),
+        }
+        (root / "ConditionLog" / filename).write_text(
+            render_frontmatter(condition), encoding="utf-8"
+        )
+
+
+def _cold_start(tmp_path: Path):
+    env = dict(
+        os.environ, BOT_TOKEN="123456:cold-start", DATA_DIR=str(tmp_path), FSM_STORAGE="memory"
+    )
+    env.pop("WEBHOOK_URL", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", COLD_START],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    own_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if name.strip().split(".")[0] == "bot":
+            own_us += int(self_us)
+    return json.loads(result.stdout.strip().splitlines()[-1]), own_us / 1000
+
+
+def test_cold_start_stays_lazy_and_within_budget(tmp_path: Path):
+    _seed_vault(tmp_path)
+    # Первый запуск собирает статистику из хранилища (и читает YAML) — это разовая работа.
+    _cold_start(tmp_path)
+    report, own_ms = _cold_start(tmp_path)
+
+    loaded = set(report["modules"])
+    assert [name for name in LAZY_MODULES if name in loaded] == []
+    assert own_ms < OWN_IMPORT_BUDGET_MS, f"bot.* imports took {own_ms:.0f} ms"
+    assert report["build"] < BUILD_BUDGET_SECONDS, f"startup scans took {report['build']:.2f} s"
+    assert report["seconds"] < TOTAL_BUDGET_SECONDS, f"cold start took {report['seconds']:.1f} s"
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import bot.analytics.dashboard_cache as dashboard_cache
+from bot.analytics.dashboard_cache import DashboardCache
+from bot.domain.models import Condition, FoodEventDraft
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.foods_service import FoodsService
+
+
+class SteppingTimeService:
+    def __init__(self):
+        self._now = datetime(2025, 3, 12, 8, 0, tzinfo=ZoneInfo("UTC"))
+        self._counter = 0
+
+    def now(self):
+        self._now += timedelta(hours=1)
+        return self._now
+
+    def short_id(self, length: int = 8) -> str:
+        self._counter += 1
+        return f"{self._counter:08x}"
+
+
+def _persist_meals(file_store: FileStore, time_service, meals):
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=time_service,
+    )
+
+    async def run():
+        for foods, bloating in meals:
+            draft = FoodEventDraft(started_at=datetime.now(), foods_raw=foods)
+            condition = Condition(bloating=bloating, diarrhea=False, well_being=5)
+            await service.persist_event(draft, condition)
+
+    asyncio.run(run())
+
+
+def test_dashboard_cache_reads_only_new_files(tmp_path: Path, monkeypatch):
+    file_store = FileStore(tmp_path)
+    time_service = SteppingTimeService()
+    _persist_meals(file_store, time_service, [(["фасоль"], True)] * 3 + [(["рис"], False)] * 3)
+    asyncio.run(ConditionService(file_store).persist_breath(datetime(2025, 3, 13, 7, 0), "weak"))
+
+    reads = []
+    original = dashboard_cache.read_meal
+    monkeypatch.setattr(
+        dashboard_cache, "read_meal", lambda path: reads.append(path.name) or original(path)
+    )
+    cache = DashboardCache(tmp_path)
+    assert cache.refresh() is True
+    first = cache.snapshot()
+    assert len(reads) == 6
+    assert first.suspects[0].ingredient == "фасоль"
+    assert sum(count for _, count in first.meals_per_day) == 6
+    assert first.breath[0][1] == "weak"
+
+    # Страница берёт кэш: без новых файлов ничего не перечитывается и снимок тот же.
+    assert cache.refresh() is False
+    assert cache.snapshot() is first
+    assert len(reads) == 6
+
+    _persist_meals(file_store, time_service, [(["фасоль", "рис"], True)])
+    assert cache.refresh() is True
+    assert len(reads) == 7
+    second = cache.snapshot()
+    assert second.version == first.version + 1
+    assert second.recent_meals[0].foods == ["фасоль", "рис"]
+    stats = {stat.ingredient: stat for stat in second.suspects}
+    assert stats["фасоль"].exposures == 4 and stats["рис"].exposures == 4
+    file_store.close()
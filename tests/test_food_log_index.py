@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from bot.domain.models import Condition, FoodEventDraft
+from bot.handlers.history import format_history
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.food_log_index import FoodLogIndex
+from bot.services.foods_service import FoodsService
+from bot.ui.keyboards import history_keyboard
+
+
+class SteppingTimeService:
+    def __init__(self):
+        self._now = datetime(2025, 3, 12, 8, 0, tzinfo=ZoneInfo("UTC"))
+        self._counter = 0
+
+    def now(self):
+        self._now += timedelta(hours=1)
+        return self._now
+
+    def short_id(self, length: int = 8) -> str:
+        self._counter += 1
+        return f"{self._counter:08x}"
+
+
+class CountingFileStore(FileStore):
+    def __init__(self, base_dir: Path):
+        super().__init__(base_dir)
+        self.reads = 0
+
+    async def read_text(self, relative_path):
+        self.reads += 1
+        return await super().read_text(relative_path)
+
+
+def test_history_pages_read_only_requested_files(tmp_path: Path):
+    asyncio.run(_run_history(tmp_path))
+
+
+async def _run_history(tmp_path: Path):
+    file_store = CountingFileStore(tmp_path)
+    # Запись, сделанная до запуска: индекс узнаёт о ней только по имени файла.
+    legacy = file_store.resolve("FoodLog") / "2025-03-01_09-00-00_00000000.md"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text("---\nfoods:\n- '[[овсянка]]'\n---\n", encoding="utf-8")
+    (file_store.resolve("FoodLog") / "notes.md").write_text("без метки времени", encoding="utf-8")
+
+    index = FoodLogIndex(file_store)
+    assert index.build() == 1
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=SteppingTimeService(),
+        food_log_index=index,
+    )
+    for number in range(24):
+        draft = FoodEventDraft(started_at=datetime.now(), foods_raw=[f"блюдо {number}"])
+        condition = Condition(bloating=number == 23, diarrhea=False, well_being=7)
+        await service.persist_event(draft, condition)
+    assert len(index) == 25
+
+    file_store.reads = 0
+    first = await index.page(0, page_size=10)
+    # По два файла на запись: FoodLog и парный ConditionLog.
+    assert file_store.reads == 20
+    assert (first.page, first.pages, first.total) == (0, 3, 25)
+    assert first.items[0].foods == ["блюдо 23"]
+    assert first.items[0].condition["bloating"] is True
+    assert first.items[0].timestamp > first.items[-1].timestamp
+
+    last = await index.page(99, page_size=10)
+    assert last.page == 2
+    assert [item.foods for item in last.items][-1] == ["овсянка"]
+    assert last.items[-1].condition == {}
+
+    text = format_history(first)
+    assert "блюдо 23" in text and "вздутие" in text
+    buttons = [button.text for row in history_keyboard(1, 3).inline_keyboard for button in row]
+    assert buttons == ["← Новее", "2/3", "Старее →"]
+    assert history_keyboard(0, 1) is None
+    file_store.close()
@@ -11,6 +11,7 @@ from bot.ui.callbacks import (
     BreathSeverityAction,
     ConditionBoolAction,
     ConditionWellBeingAction,
+    RepeatMealAction,
 )
 from bot.fsm.states import FoodLogStates
 from bot.services.breath_reminder_service import BreathReminderService
@@ -19,6 +20,7 @@ from bot.services.file_store import FileStore
 from bot.services.food_event_service import FoodEventService
 from bot.services.foods_service import FoodsService
 from bot.services.composition_extractor import CompositionExtractor
+from bot.services.recent_meals import RecentMealsCache
 
 
 class FakeTimeService:
@@ -46,10 +48,14 @@ class StubBot:
     async def get_file(self, file_id: str):
         return type("File", (), {"file_path": f"{file_id}.jpg"})
 
-    async def download_file(self, file_path: str):
+    async def download_file(self, file_path: str, destination=None, seek: bool = True):
         from io import BytesIO
 
-        return BytesIO(b"fake-image")
+        destination = destination if destination is not None else BytesIO()
+        destination.write(b"fake-image")
+        if seek:
+            destination.seek(0)
+        return destination
 
 
 class StubPhoto:
@@ -361,3 +367,41 @@ async def _run_condition_only_flow(tmp_path: Path) -> None:
     assert await state.get_state() is None
     condition_logs = list((tmp_path / "ConditionLog").glob("*.md"))
     assert len(condition_logs) == 1
+
+
+def test_repeat_meal_skips_food_entry(tmp_path: Path):
+    asyncio.run(_run_repeat_meal(tmp_path))
+
+
+async def _run_repeat_meal(tmp_path: Path) -> None:
+    state = _build_state(tmp_path)
+    service = add_food._food_event_service()
+    service.recent_meals = RecentMealsCache()
+    service.recent_meals.remember(1, ["овсянка", "банан"])
+
+    menu_callback = StubCallback(StubMessage())
+    await add_food.cb_repeat_menu(menu_callback)
+    meal = service.recent_meals.recent(1)[0]
+
+    await add_food.cb_repeat_meal(
+        StubCallback(StubMessage()), RepeatMealAction(key=meal.key), state
+    )
+    assert await state.get_state() == FoodLogStates.ask_condition_bloating.state
+
+    await add_food.cb_condition_bloating(
+        StubCallback(StubMessage()),
+        ConditionBoolAction(symptom="bloating", value="no"),
+        state,
+    )
+    await add_food.cb_condition_diarrhea(
+        StubCallback(StubMessage()),
+        ConditionBoolAction(symptom="diarrhea", value="no"),
+        state,
+    )
+    await add_food.cb_condition_well_being(
+        StubCallback(StubMessage()), ConditionWellBeingAction(score=9), state
+    )
+
+    assert len(list((tmp_path / "FoodLog").glob("*.md"))) == 1
+    assert [item.foods for item in service.recent_meals.recent(1)] == [["овсянка", "банан"]]
+    assert service.recent_meals.recent(2) == []
@@ -0,0 +1,172 @@
+import asyncio
+import random
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.services.composition_extractor import CompositionExtractor
+from bot.services.hedging import LatencyTracker, hedged_call
+
+
+class MockLLM:
+    """Локальный OpenRouter: задержка ответа задаётся распределением по модели."""
+
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self.requests: list[str] = []
+        self.cancelled = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        model = payload["model"]
+        self.requests.append(model)
+        try:
+            await asyncio.sleep(self.latencies(model, len(self.requests)))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return web.json_response({"choices": [{"message": {"content": f"{model}\nсыр "}}]})
+
+    def server(self) -> TestServer:
+        app = web.Application(handler_args={"handler_cancellation": True})
+        app.router.add_post("/chat/completions", self.handle)
+        return TestServer(app)
+
+
+def _extractor(server: TestServer, **kwargs) -> CompositionExtractor:
+    return CompositionExtractor(endpoint=str(server.make_url("/chat/completions")), **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def _api_key(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+
+
+def test_latency_tracker_uses_quantile_after_warm_up():
+    tracker = LatencyTracker(min_samples=10, initial=3.0, floor=0.1, ceiling=10.0)
+    assert tracker.hedge_delay() == 3.0
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.hedge_delay() == pytest.approx(0.95)
+    for _ in range(100):
+        tracker.record(100.0)
+    assert tracker.hedge_delay() == 10.0
+
+
+def test_slow_primary_is_hedged_to_backup_model():
+    asyncio.run(_run_backup_wins())
+
+
+async def _run_backup_wins():
+    mock = MockLLM(lambda model, _: 5.0 if model == "slow" else 0.01)
+    async with mock.server() as server:
+        extractor = _extractor(
+            server,
+            model="slow",
+            backup_model="fast",
+            latency=LatencyTracker(initial=0.05, floor=0.01),
+        )
+        started = time.perf_counter()
+        result = await extractor.guess_from_text("паста")
+        elapsed = time.perf_counter() - started
+        await extractor.close()
+        await asyncio.sleep(0.05)
+
+    assert result == "fast\nсыр"
+    assert elapsed < 1.0
+    assert mock.requests == ["slow", "fast"]
+    assert mock.cancelled == 1
+
+
+def test_fast_primary_does_not_hedge():
+    asyncio.run(_run_no_hedge())
+
+
+async def _run_no_hedge():
+    mock = MockLLM(lambda model, _: 0.01)
+    async with mock.server() as server:
+        extractor = _extractor(server, latency=LatencyTracker(initial=1.0))
+        assert await extractor.guess_from_text("паста") == "openai/gpt-5-nano\nсыр"
+        await extractor.close()
+    assert mock.requests == ["openai/gpt-5-nano"]
+    assert len(extractor.latency_tracker("openai/gpt-5-nano", "guess_text")) == 1
+
+
+def test_latency_is_tracked_per_model_and_operation():
+    asyncio.run(_run_per_operation())
+
+
+async def _run_per_operation():
+    mock = MockLLM(lambda model, _: 0.2)
+    async with mock.server() as server:
+        extractor = _extractor(
+            server, latency=LatencyTracker(min_samples=2, initial=1.0, floor=0.01)
+        )
+        for _ in range(2):
+            await extractor.guess_from_text("паста")
+        await extractor.close()
+
+    slow = extractor.latency_tracker("openai/gpt-5-nano", "guess_text")
+    assert len(slow) == 2
+    assert 0.2 <= slow.hedge_delay() < 1.0
+    # Медленные ответы одной операции не сдвигают задержку хеджирования другой.
+    assert len(extractor.latency_tracker("openai/gpt-5-nano", "guess_batch")) == 0
+    assert extractor.latency_tracker("openai/gpt-5-nano", "guess_batch").hedge_delay() == 1.0
+    assert len(extractor.latency_tracker("other/model", "guess_text")) == 0
+
+
+def test_failed_primary_fires_backup_immediately():
+    asyncio.run(_run_failed_primary())
+
+
+async def _run_failed_primary():
+    calls: list[str] = []
+
+    async def primary():
+        calls.append("primary")
+        raise ConnectionError("reset")
+
+    async def backup():
+        calls.append("backup")
+        return "ok"
+
+    started = time.perf_counter()
+    result = await hedged_call(primary, backup, delay=5.0)
+    assert (result.value, result.winner, result.hedged) == ("ok", "backup", True)
+    assert time.perf_counter() - started < 1.0
+
+    async def broken():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        await hedged_call(broken, broken, delay=0.01)
+
+
+def test_hedging_cuts_tail_latency_on_heavy_tailed_upstream():
+    asyncio.run(_run_tail())
+
+
+async def _run_tail():
+    # 3% ответов «зависают» на 1 с, остальные — 5–25 мс: p95 лежит в быстрой части,
+    # и резервный запрос уходит вскоре после неё.
+    rng = random.Random(5)
+    slow = {index for index in range(1, 200) if rng.random() < 0.03}
+    mock = MockLLM(lambda model, index: 1.0 if index in slow else rng.uniform(0.005, 0.025))
+    async with mock.server() as server:
+        extractor = _extractor(
+            server, latency=LatencyTracker(min_samples=10, initial=0.05, floor=0.01)
+        )
+        timings = []
+        for _ in range(80):
+            started = time.perf_counter()
+            await extractor.guess_from_text("паста")
+            timings.append(time.perf_counter() - started)
+        await extractor.close()
+
+    stalls = [index for index in range(1, len(mock.requests) + 1) if index in slow]
+    assert len(stalls) >= 4
+    # Без хеджирования каждая из них стоила бы пользователю секунду.
+    assert max(timings) < 0.5
+    assert len(mock.requests) < 80 * 1.2
@@ -0,0 +1,172 @@
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from aiogram.filters import CommandObject
+
+from bot.domain.canonicalize import bounded_levenshtein, canonical_key, canonical_name
+from bot.domain.models import Condition, FoodEventDraft
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.handlers import admin
+from bot.services.foods_service import FoodsService
+from bot.services.ingredient_canonicalizer import IngredientCanonicalizer
+
+
+class StubUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class StubMessage:
+    def __init__(self, user_id: int):
+        self.from_user = StubUser(user_id)
+        self.answers: list[str] = []
+
+    async def answer(self, text: str, **_):
+        self.answers.append(text)
+
+
+class FixedTimeService:
+    def now(self):
+        return datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+    def short_id(self, length: int = 8) -> str:
+        return "deadbeef"
+
+
+def test_canonical_key_drops_percentages_and_yo():
+    assert canonical_key("  Молоко 3.2% ") == "молоко"
+    assert canonical_key("Сметана 15 %") == "сметана"
+    assert canonical_key("Мёд.") == "мед"
+    assert canonical_name("Мёд.") == "мёд"
+
+
+def test_bounded_levenshtein_respects_limit():
+    assert bounded_levenshtein("молоко", "малоко", 1) == 1
+    assert bounded_levenshtein("молоко", "малака", 1) is None
+    assert bounded_levenshtein("", "ab", 2) == 2
+
+
+def test_canonicalizer_merges_aliases_and_typos(tmp_path: Path):
+    canonicalizer = IngredientCanonicalizer(FileStore(tmp_path))
+    canonicalizer.add_alias("молоко коровье", "молоко")
+
+    assert canonicalizer.canonicalize("Молоко 3.2%") == "молоко"
+    assert canonicalizer.canonicalize("молоко коровье") == "молоко"
+    assert canonicalizer.canonicalize("малоко") == "молоко"
+    assert canonicalizer.canonicalize("молоко каровье") == "молоко"
+    assert canonicalizer.canonicalize("банан") == "банан"
+    assert canonicalizer.canonicalize("баран") == "баран"
+
+
+def test_canonicalizer_does_not_persist_fuzzy_matches(tmp_path: Path):
+    canonicalizer = IngredientCanonicalizer(FileStore(tmp_path))
+    canonicalizer.canonicalize("творожок")
+    assert canonicalizer.canonicalize("тварожок") == "творожок"
+    asyncio.run(canonicalizer.save())
+
+    payload = json.loads((tmp_path / "ingredient_aliases.json").read_text(encoding="utf-8"))
+    assert "тварожок" not in payload["aliases"]
+
+    reloaded = IngredientCanonicalizer(FileStore(tmp_path))
+    assert reloaded.canonicalize("Тварожок") == "творожок"
+
+
+def test_cooking_methods_are_not_merged(tmp_path: Path):
+    canonicalizer = IngredientCanonicalizer(FileStore(tmp_path))
+    for name in ("курица жареная", "яйцо вареное", "картофель вареный", "сыр плавленый"):
+        canonicalizer.canonicalize(name)
+
+    assert canonicalizer.canonicalize("курица вареная") == "курица вареная"
+    assert canonicalizer.canonicalize("яйцо жареное") == "яйцо жареное"
+    assert canonicalizer.canonicalize("картофель жареный") == "картофель жареный"
+    # Знакомое слово в другом сочетании — тоже не опечатка.
+    assert canonicalizer.canonicalize("курица вареное") == "курица вареное"
+    # Опечатка в одном слове по-прежнему исправляется, в двух — нет.
+    assert canonicalizer.canonicalize("картофель варенный") == "картофель вареный"
+    assert canonicalizer.canonicalize("сыр плавленный") == "сыр плавленый"
+    assert canonicalizer.canonicalize("картафель варенный") == "картафель варенный"
+
+
+def test_food_event_service_uses_canonical_names(tmp_path: Path):
+    asyncio.run(_run_canonical_persist(tmp_path))
+
+
+async def _run_canonical_persist(tmp_path: Path) -> None:
+    file_store = FileStore(tmp_path)
+    canonicalizer = IngredientCanonicalizer(file_store)
+    canonicalizer.add_alias("молоко коровье", "молоко")
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=FixedTimeService(),
+        canonicalizer=canonicalizer,
+    )
+    draft = FoodEventDraft(
+        started_at=datetime.now(),
+        foods_raw=["Молоко 3.2%", "молоко", "молоко коровье"],
+    )
+
+    result = await service.persist_event(
+        draft, Condition(bloating=False, diarrhea=False, well_being=8)
+    )
+
+    assert result.foods == ["молоко"]
+    assert [path.name for path in (tmp_path / "Foods").iterdir()] == ["молоко.md"]
+
+
+def test_canonicalizer_keeps_user_spelling_of_yo(tmp_path: Path):
+    canonicalizer = IngredientCanonicalizer(FileStore(tmp_path))
+    assert canonicalizer.canonicalize("Мёд") == "мёд"
+    # «ё» не различается при сравнении, но имя заметки не переписывается.
+    assert canonicalizer.canonicalize("мед") == "мёд"
+    canonicalizer.add_alias("медок", "мед")
+    assert canonicalizer.canonicalize("медок") == "мёд"
+
+
+def test_alias_command_merges_products_for_every_worker(tmp_path: Path):
+    asyncio.run(_run_alias_command(tmp_path))
+
+
+async def _run_alias_command(tmp_path: Path) -> None:
+    file_store = FileStore(tmp_path)
+    worker = IngredientCanonicalizer(file_store)
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=FixedTimeService(),
+        canonicalizer=worker,
+    )
+    # Воркер уже видел «молоко коровье» как отдельный продукт.
+    assert service._normalize_foods(["Молоко коровье", "молоко"]) == [
+        "молоко коровье",
+        "молоко",
+    ]
+    await worker.save()
+
+    admin_side = IngredientCanonicalizer(file_store)
+    admin.setup_dependencies(None, admin_ids=[42], canonicalizer=admin_side)
+    stranger = StubMessage(7)
+    await admin.cmd_alias(stranger, CommandObject(command="alias", args="а = б"))
+    assert stranger.answers == ["Команда доступна только администраторам."]
+    usage = StubMessage(42)
+    await admin.cmd_alias(usage, CommandObject(command="alias", args="молоко коровье"))
+    assert usage.answers[0].startswith("Использование")
+
+    owner = StubMessage(42)
+    await admin.cmd_alias(owner, CommandObject(command="alias", args="Молоко коровье = молоко"))
+    assert owner.answers == ["Теперь «Молоко коровье» записывается как «молоко»."]
+
+    result = await service.persist_event(
+        FoodEventDraft(started_at=datetime.now(), foods_raw=["молоко коровье", "хлеб"]),
+        Condition(bloating=False, diarrhea=False, well_being=8),
+    )
+    assert result.foods == ["молоко", "хлеб"]
+    assert service._normalize_foods(["Молоко коровье"]) == ["молоко"]
+    assert IngredientCanonicalizer(file_store).canonicalize("молоко коровье") == "молоко"
@@ -0,0 +1,92 @@
+import asyncio
+import random
+import time
+from pathlib import Path
+
+from bot.services.file_store import FileStore
+from bot.services.foods_service import FoodsService
+from bot.services.ingredient_index import IngredientPrefixIndex
+
+
+def test_complete_orders_by_frequency_and_prefers_user_history():
+    index = IngredientPrefixIndex()
+    index.add_many(["молоко", "мед", "морковь", "мука", "сыр"])
+    index.record_usage(1, ["морковь"])
+    index.record_usage(2, ["мука", "мука", "мед"])
+
+    assert index.complete("Мо", k=3) == ["морковь", "молоко"]
+    assert index.complete("м", k=3) == ["мука", "мед", "морковь"]
+    assert index.complete("м", k=3, user_id=1) == ["морковь", "мука", "мед"]
+    assert index.complete("хлеб") == []
+
+
+def test_cached_prefix_results_are_invalidated_on_update():
+    index = IngredientPrefixIndex(scan_limit=1, cache_depth=5)
+    index.add_many(["сыр", "сыворотка", "сельдь"])
+    assert index.complete("с", k=1) == ["сельдь"]
+
+    index.record_usage(None, ["сыр"])
+    assert index.complete("с", k=1) == ["сыр"]
+
+    index.add("свёкла")
+    assert "свёкла" in index.complete("с", k=5)
+
+
+def test_usage_counts_survive_restarts_and_are_shared_by_workers(tmp_path: Path):
+    asyncio.run(_run_shared_counts(tmp_path / "state.sqlite3"))
+
+
+async def _run_shared_counts(path: Path):
+    first = IngredientPrefixIndex(path=path)
+    second = IngredientPrefixIndex(path=path)
+    for index in (first, second):
+        index.add_many(["молоко", "мед", "морковь"])
+    await first.record(1, ["Морковь"])
+    await first.record(2, ["мед", "мед"])
+    await second.record(2, ["мед"])
+
+    # Второй воркер видит счётчики первого после refresh().
+    await second.refresh()
+    assert second.complete("м", k=2) == ["мед", "морковь"]
+    assert second.complete("м", k=2, user_id=1) == ["морковь", "мед"]
+    first.close()
+    second.close()
+
+    restarted = IngredientPrefixIndex(path=path)
+    assert restarted.complete("м", k=3) == ["мед", "морковь"]
+    assert restarted.complete("м", k=1, user_id=1) == ["морковь"]
+    assert restarted._counts == {"мед": 3, "морковь": 1}
+    restarted.close()
+
+
+def test_foods_service_feeds_index_incrementally(tmp_path: Path):
+    file_store = FileStore(tmp_path)
+    index = IngredientPrefixIndex()
+    service = FoodsService(file_store, prefix_index=index)
+
+    asyncio.run(service.ensure_notes(["гречка", "говядина"]))
+
+    assert index.complete("г") == ["говядина", "гречка"]
+    rebuilt = IngredientPrefixIndex()
+    rebuilt.add_many(FoodsService(file_store).list_names())
+    assert rebuilt.complete("гр") == ["гречка"]
+
+
+def test_complete_is_fast_for_100k_ingredients():
+    rng = random.Random(7)
+    alphabet = "абвгдежзиклмнопрстуфхцчшэюя"
+    names = {"".join(rng.choice(alphabet) for _ in range(rng.randint(3, 12))) for _ in range(100_000)}
+    index = IngredientPrefixIndex()
+    index.add_many(names)
+    for name in rng.sample(sorted(names), 5_000):
+        index.record_usage(rng.randint(1, 50), [name])
+
+    prefixes = ["", "а", "м", "по", "сте", "кра"] * 50
+    for prefix in prefixes[:6]:
+        index.complete(prefix, user_id=3)
+    started = time.perf_counter()
+    for prefix in prefixes:
+        index.complete(prefix, user_id=3)
+    per_lookup = (time.perf_counter() - started) / len(prefixes)
+
+    assert per_lookup < 0.001
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.domain.label_parser import parse_label, split_label
+from bot.fsm.states import FoodLogStates
+from bot.handlers import add_food
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        (
+            "Состав: мука пшеничная, сахар, масло растительное (пальмовое), соль 0,5%",
+            ["мука пшеничная", "сахар", "масло растительное (пальмовое)", "соль 0,5%"],
+        ),
+        (
+            "Печенье «Юбилейное». Состав: мука, эмульгатор (Е 471, лецитин соевый); "
+            "разрыхлители: Е-500ii, Е503. Пищевая ценность: белки 7 г, жиры 16 г.",
+            ["мука", "эмульгатор (E471, лецитин соевый)", "разрыхлители: E500ii", "E503"],
+        ),
+        (
+            "СОСТАВ ПРОДУКТА: молоко нормализован-\nное, закваска [Lactobacillus (bulgaricus, "
+            "casei)], сахар 7,5 %. Может содержать следы орехов.",
+            [
+                "молоко нормализованное",
+                "закваска [Lactobacillus (bulgaricus, casei)]",
+                "сахар 7,5 %",
+            ],
+        ),
+        ("Ингредиенты: вода; соль", ["вода", "соль"]),
+        ("творог, сметана, сахар", ["творог", "сметана", "сахар"]),
+    ],
+)
+def test_parse_label_splits_top_level_items(text, expected):
+    assert parse_label(text) == expected
+
+
+@pytest.mark.parametrize("text", ["паста\nсыр", "паста, сыр", "борщ", "Состав:", "", "1,5 литра"])
+def test_plain_food_lists_are_not_labels(text):
+    assert parse_label(text) is None
+
+
+def test_unbalanced_brackets_do_not_swallow_the_rest():
+    assert split_label("сахар), соль, (вода") == ["сахар)", "соль", "(вода"]
+
+
+class StubMessage:
+    def __init__(self, text: str):
+        self.text = text
+        self.photo = []
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, reply_markup=None):
+        self.replies.append(text)
+
+
+class FailingExtractor:
+    async def guess_from_text(self, dish_name: str, prompt: str | None = None) -> str:
+        raise AssertionError("LLM must not be called for a pasted label")
+
+
+def test_pasted_label_skips_the_llm():
+    asyncio.run(_run_pasted_label())
+
+
+async def _run_pasted_label():
+    add_food.setup_dependencies(None, None, FailingExtractor())
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.set_state(FoodLogStates.guess_input)
+    message = StubMessage("Состав: гречка, курица (филе), соль 0,5%")
+
+    await add_food.handle_guess_input(message, state)
+
+    data = await state.get_data()
+    assert data["pending_lines"] == ["гречка", "курица (филе)", "соль 0,5%"]
+    assert data["pending_source"] == "label"
+    assert await state.get_state() == FoodLogStates.adding_foods.state
+    assert message.replies[0].startswith("Состав с этикетки")
+
+
+def test_require_prefix_rejects_bare_lists():
+    assert parse_label("борщ, котлета, пюре", require_prefix=True) is None
+    assert parse_label("Состав: вода, соль", require_prefix=True) == ["вода", "соль"]
+
+
+class BatchExtractor:
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    async def guess_batch(self, dishes, prompt: str | None = None):
+        self.batches.append(list(dishes))
+        return {dish: [f"{dish} основа"] for dish in dishes}
+
+
+def test_comma_separated_dishes_are_guessed_not_parsed_as_label():
+    asyncio.run(_run_comma_dishes())
+
+
+async def _run_comma_dishes():
+    extractor = BatchExtractor()
+    add_food.setup_dependencies(None, None, extractor)
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    await state.set_state(FoodLogStates.guess_input)
+
+    await add_food.handle_guess_input(StubMessage("борщ, котлета, пюре"), state)
+
+    data = await state.get_data()
+    assert extractor.batches == [["борщ", "котлета", "пюре"]]
+    assert data["pending_source"] == "guess"
+    assert data["pending_lines"] == ["борщ основа", "котлета основа", "пюре основа"]
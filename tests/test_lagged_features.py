@@ -0,0 +1,96 @@
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from bot.analytics.lagged_features import (
+    build_lagged_exposures,
+    parse_windows,
+)
+from bot.analytics.vault import load_condition_observations, load_meals
+
+
+def test_exposures_are_split_by_lag_window():
+    base = datetime(2025, 3, 12, 20, 0)
+    meal_times = [
+        base - timedelta(hours=1),
+        base - timedelta(hours=3),
+        base - timedelta(hours=20),
+        base - timedelta(hours=60),
+        base + timedelta(hours=1),
+    ]
+    meal_foods = [["молоко", "хлеб"], ["молоко"], ["сыр"], ["сыр"], ["хлеб"]]
+
+    exposures = build_lagged_exposures(meal_times, meal_foods, [base])
+    dense = exposures.to_dense()
+    names = exposures.feature_names()
+    values = {name: int(dense[0, col]) for col, name in enumerate(names) if dense[0, col]}
+
+    assert exposures.vocabulary == ["молоко", "сыр", "хлеб"]
+    assert values == {
+        "молоко@0-3h": 1,
+        "хлеб@0-3h": 1,
+        "молоко@3-12h": 1,
+        "сыр@12-48h": 1,
+    }
+
+
+def test_same_event_meal_counts_in_first_window():
+    moment = datetime(2025, 3, 12, 19, 30)
+    exposures = build_lagged_exposures([moment], [["паста"]], [moment, moment])
+    assert exposures.to_dense().tolist() == [[1, 0, 0], [1, 0, 0]]
+
+
+def test_parse_windows_validates_ranges():
+    assert parse_windows("0-3, 3-12,12-48") == ((0.0, 3.0), (3.0, 12.0), (12.0, 48.0))
+    with pytest.raises(ValueError):
+        parse_windows("3-1")
+    with pytest.raises(ValueError):
+        parse_windows("")
+
+
+def test_exposures_scale_to_100k_events():
+    rng = np.random.default_rng(42)
+    start = np.datetime64("2020-01-01T00:00:00")
+    meal_times = start + np.sort(rng.integers(0, 3600 * 24 * 365 * 20, 100_000)).astype(
+        "timedelta64[s]"
+    )
+    condition_times = start + np.sort(
+        rng.integers(0, 3600 * 24 * 365 * 20, 100_000)
+    ).astype("timedelta64[s]")
+    vocabulary = [f"ingredient {index}" for index in range(500)]
+    meal_foods = [
+        [vocabulary[code] for code in rng.integers(0, 500, 5)] for _ in range(100_000)
+    ]
+
+    started = time.perf_counter()
+    exposures = build_lagged_exposures(meal_times, meal_foods, condition_times)
+    elapsed = time.perf_counter() - started
+
+    assert exposures.shape == (100_000, 1500)
+    assert elapsed < 10.0
+
+
+def test_vault_loaders_use_filename_seconds(tmp_path):
+    food_dir = tmp_path / "FoodLog"
+    condition_dir = tmp_path / "ConditionLog"
+    food_dir.mkdir()
+    condition_dir.mkdir()
+    (food_dir / "2025-03-12_19-30-05_cafebabe.md").write_text(
+        "---\ndate: '2025-03-12'\ntime: '19:30'\nfoods:\n- '[[Паста]]'\n---\n",
+        encoding="utf-8",
+    )
+    (condition_dir / "2025-03-13_breath.md").write_text(
+        "---\ndate: '2025-03-13'\ntime: '07:00'\nbreath_smell: weak\n---\n",
+        encoding="utf-8",
+    )
+
+    meals = load_meals(food_dir)
+    observations = load_condition_observations(condition_dir)
+
+    assert meals[0].timestamp == datetime(2025, 3, 12, 19, 30, 5)
+    assert meals[0].foods == ["паста"]
+    assert observations[0].timestamp == datetime(2025, 3, 13, 7, 0)
+    assert observations[0].breath_smell == "weak"
+    assert observations[0].bloating is None
@@ -0,0 +1,111 @@
+import asyncio
+import gc
+import os
+import pathlib
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from bot.domain.models import Condition, FoodEventDraft
+from bot.services.breath_reminder_service import BreathReminderService
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.foods_service import FoodsService
+
+SLOW_IO_SECONDS = 0.008
+# Синхронная медленная операция в цикле дала бы паузу не меньше SLOW_IO_SECONDS.
+MAX_LOOP_LAG_SECONDS = SLOW_IO_SECONDS
+MAX_STALLS = 2
+# Выброс планировщика ОС короткий; длинная пауза — это блокирующий вызов, сколько их ни было.
+MAX_STALL_SECONDS = 3 * SLOW_IO_SECONDS
+
+
+class FixedTimeService:
+    def now(self):
+        return datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+    def short_id(self, length: int = 8) -> str:
+        return "cafebabe"
+
+
+def _slow(func):
+    def wrapper(*args, **kwargs):
+        time.sleep(SLOW_IO_SECONDS)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def _make_storage_slow(monkeypatch) -> None:
+    for name in ("exists", "read_text", "write_text", "mkdir"):
+        monkeypatch.setattr(pathlib.Path, name, _slow(getattr(pathlib.Path, name)))
+    monkeypatch.setattr(os, "replace", _slow(os.replace))
+    monkeypatch.setattr(os, "link", _slow(os.link))
+
+
+async def _loop_lags(work) -> list[float]:
+    lags = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    try:
+        await work
+    finally:
+        done.set()
+        await probe_task
+    return sorted(lags)
+
+
+def test_persisting_fifty_ingredients_on_slow_storage_keeps_loop_responsive(
+    tmp_path: Path, monkeypatch
+):
+    asyncio.run(_run_slow_persist(tmp_path, monkeypatch))
+
+
+async def _run_slow_persist(tmp_path: Path, monkeypatch) -> None:
+    store = FileStore(tmp_path)
+    foods_service = FoodsService(store)
+    foods = [f"ингредиент {index}" for index in range(50)]
+    # Половина заметок уже есть — подбор имён будет читать их с диска.
+    await foods_service.ensure_notes(foods[:25])
+    service = FoodEventService(
+        file_store=store,
+        foods_service=foods_service,
+        condition_service=ConditionService(store),
+        time_service=FixedTimeService(),
+    )
+    reminders = BreathReminderService(store)
+    draft = FoodEventDraft(started_at=FixedTimeService().now(), foods_raw=foods)
+    condition = Condition(bloating=False, diarrhea=False, well_being=4)
+
+    _make_storage_slow(monkeypatch)
+
+    async def work() -> None:
+        await service.persist_event(draft, condition, user_id=1)
+        await reminders.add_or_update(user_id=1, chat_id=1, time_str="08:00")
+
+    # Паузы сборщика мусора от предыдущих тестов к вводу-выводу отношения не имеют.
+    gc.collect()
+    gc.disable()
+    try:
+        lags = await _loop_lags(work())
+    finally:
+        gc.enable()
+        monkeypatch.undo()
+
+    assert len(list((tmp_path / "Foods").glob("*.md"))) == 50
+    assert len(list((tmp_path / "FoodLog").glob("*.md"))) == 1
+    # Пара выбросов — планировщик ОС и передача GIL на загруженной машине; синхронная
+    # медленная операция в цикле останавливала бы почти каждую пробу (было 27 из 36).
+    stalls = [lag for lag in lags if lag >= MAX_LOOP_LAG_SECONDS]
+    assert len(stalls) <= MAX_STALLS, f"event loop stalled {len(stalls)} times: {stalls}"
+    assert lags[-1] < MAX_STALL_SECONDS, f"longest event loop stall: {lags[-1]:.3f}s"
+    assert lags[len(lags) // 2] < 0.002
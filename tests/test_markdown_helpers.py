@@ -1,8 +1,9 @@
+import random
 from datetime import datetime
 
 import yaml
 
-from bot.services.markdown_helpers import build_log_filename, render_frontmatter
+from bot.services.markdown_helpers import _emit_flat_yaml, build_log_filename, render_frontmatter
 
 
 def test_build_log_filename_matches_expected_format():
@@ -18,3 +19,42 @@ def test_render_frontmatter_matches_yaml_output():
     }
     yaml_body = yaml.safe_dump(payload, allow_unicode=True, sort_keys=False).strip()
     assert render_frontmatter(payload) == f"---\n{yaml_body}\n---\n\n#foodtracker\n"
+
+
+def _yaml_reference(payload):
+    yaml_body = yaml.safe_dump(payload, allow_unicode=True, sort_keys=False).strip()
+    return f"---\n{yaml_body}\n---\n\n#foodtracker\n"
+
+
+def test_fast_emitter_covers_log_schemas():
+    payloads = [
+        {"date": "2025-03-12", "time": "19:30", "foods": ["[[паста]]", "[[сыр пармезан]]"]},
+        {"date": "2025-03-12", "time": "07:05", "bloating": True, "diarrhea": False, "well_being": 6},
+        {"date": "2025-03-12", "time": "23:59", "breath_smell": "сильный"},
+        {"date": "2025-03-12", "time": "12:00", "foods": []},
+    ]
+    for payload in payloads:
+        assert _emit_flat_yaml(payload) is not None
+        assert render_frontmatter(payload) == _yaml_reference(payload)
+
+
+def test_render_frontmatter_matches_yaml_on_random_strings():
+    rng = random.Random(20250312)
+    alphabet = list("abzабя09 -:#'\"[]{},?&*!|>%@`.~_=+<eEnNoOyYtT\t\n\\") + ["😀", "\x85", "﻿"]
+    fast = 0
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        if rng.random() < 0.1:
+            text = text * rng.randint(5, 15)
+        payload = {
+            "date": "2025-03-12",
+            "breath_smell": text,
+            "foods": [f"[[{text}]]", text],
+            "well_being": rng.randint(-3, 10),
+            "bloating": rng.random() < 0.5,
+        }
+        if _emit_flat_yaml(payload) is not None:
+            fast += 1
+        assert render_frontmatter(payload) == _yaml_reference(payload), repr(text)
+    # Проверка должна реально гонять быстрый путь, а не только откат на PyYAML.
+    assert fast > 1000
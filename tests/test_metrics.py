@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.metrics import (
+    EXTERNAL_CALL_ERRORS,
+    EXTERNAL_CALL_LATENCY,
+    FILE_WRITE_BYTES,
+    HANDLER_ERRORS,
+    HANDLER_LATENCY,
+    MetricsRegistry,
+    build_metrics_app,
+    track_external_call,
+)
+from bot.middlewares.metrics import MetricsMiddleware
+from bot.services.file_store import FileStore
+
+
+def _update(update_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1741800000,
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+                "text": text,
+            },
+        }
+    )
+
+
+def test_registry_renders_text_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Запросы.", ("code",))
+    latency = registry.histogram("demo_latency_seconds", "Латентность.", buckets=(0.1, 1.0))
+    size = registry.gauge("demo_size", "Размер.")
+    requests.labels("200").inc()
+    requests.labels("200").inc(2)
+    requests.labels('5"x').inc()
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    size.set_function(lambda: 7)
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{code="200"} 3' in text
+    assert 'demo_requests_total{code="5\\"x"} 1' in text
+    assert 'demo_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{le="1"} 2' in text
+    assert 'demo_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_latency_seconds_count 3" in text
+    assert "demo_size 7" in text
+    with pytest.raises(ValueError):
+        requests.labels()
+
+
+def test_track_external_call_counts_error_codes():
+    class HTTPFailure(Exception):
+        status = 503
+
+    before = EXTERNAL_CALL_ERRORS.labels("demo", "op", "503").value
+    with pytest.raises(HTTPFailure):
+        with track_external_call("demo", "op"):
+            raise HTTPFailure()
+    with track_external_call("demo", "op"):
+        pass
+    assert EXTERNAL_CALL_ERRORS.labels("demo", "op", "503").value == before + 1
+    assert EXTERNAL_CALL_LATENCY.labels("demo", "op").count >= 2
+
+
+def test_middleware_records_latency_per_router_and_errors():
+    asyncio.run(_run_middleware())
+
+
+async def _run_middleware() -> None:
+    router = Router()
+
+    @router.message()
+    async def _handle(message: Message) -> None:
+        if message.text == "boom":
+            raise RuntimeError("boom")
+
+    dispatcher = Dispatcher()
+    dispatcher.message.middleware(MetricsMiddleware("message"))
+    dispatcher.include_router(router)
+    bot = Bot(token="42:TEST")
+
+    module = _handle.__module__.rsplit(".", 1)[-1]
+    latency = HANDLER_LATENCY.labels("message", module, "none")
+    errors = HANDLER_ERRORS.labels("message", module, "RuntimeError")
+    count_before, errors_before = latency.count, errors.value
+
+    await dispatcher.feed_update(bot, _update(1, "ok"))
+    with pytest.raises(RuntimeError):
+        await dispatcher.feed_update(bot, _update(2, "boom"))
+    await bot.session.close()
+
+    assert latency.count == count_before + 2
+    assert errors.value == errors_before + 1
+
+
+def test_file_store_writes_and_endpoint_expose_metrics(tmp_path):
+    asyncio.run(_run_endpoint(tmp_path))
+
+
+async def _run_endpoint(tmp_path) -> None:
+    writes_before = FILE_WRITE_BYTES.labels().count
+    bytes_before = FILE_WRITE_BYTES.labels().sum
+    await FileStore(tmp_path).write_text("note.md", "щи" * 150)
+    assert FILE_WRITE_BYTES.labels().count == writes_before + 1
+    # Размер — в байтах UTF-8, а не в символах.
+    assert FILE_WRITE_BYTES.labels().sum == bytes_before + 600
+
+    async with TestClient(TestServer(build_metrics_app())) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        body = await response.text()
+    assert "bot_file_write_bytes_bucket" in body
+    assert "# TYPE bot_handler_duration_seconds histogram" in body
@@ -0,0 +1,155 @@
+import asyncio
+import random
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bot.metrics import REGISTRY
+from bot.services.composition_extractor import CompositionExtractor
+from bot.services.hedging import LatencyTracker
+from bot.services.model_router import ModelProfile, ModelRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _router(clock: FakeClock, **kwargs) -> ModelRouter:
+    models = [ModelProfile("cheap", 0.1), ModelProfile("mid", 1.0), ModelProfile("pricey", 5.0)]
+    kwargs.setdefault("explore", 0.0)
+    return ModelRouter(
+        models, clock=clock, min_samples=3, slos={"guess_text": 1.0}, rng=random.Random(1), **kwargs
+    )
+
+
+def _feed(router: ModelRouter, model: str, seconds: float, count: int = 3, outcome="ok"):
+    for _ in range(count):
+        router.observe(model, "guess_text", seconds, outcome)
+
+
+def test_router_picks_cheapest_model_within_slo():
+    clock = FakeClock()
+    router = _router(clock)
+    decision = router.choose("guess_text")
+    assert (decision.model, decision.reason) == ("cheap", "warmup")
+    _feed(router, "cheap", 3.0)
+    assert router.choose("guess_text").model == "mid"
+    _feed(router, "mid", 0.4)
+    decision = router.choose("guess_text")
+    assert (decision.model, decision.reason) == ("mid", "slo")
+
+    # Для фото SLO мягче: там «дешёвая» модель укладывается.
+    for _ in range(3):
+        router.observe("cheap", "guess_image", 3.0)
+    assert router.choose("guess_image").model == "cheap"
+
+
+def test_errors_and_token_usage_change_the_choice():
+    clock = FakeClock()
+    router = _router(clock)
+    _feed(router, "cheap", 0.2, count=2)
+    _feed(router, "cheap", 0.2, count=2, outcome="error")
+    _feed(router, "mid", 0.3)
+    assert router.choose("guess_text").model == "mid"
+
+    router = _router(clock)
+    for _ in range(3):
+        usage = {"prompt_tokens": 900, "completion_tokens": 100}
+        router.observe("cheap", "guess_text", 0.2, usage=usage)
+        router.observe("mid", "guess_text", 0.2, usage={"total_tokens": 50})
+    # 0.1 × 1000 токенов дороже, чем 1.0 × 50.
+    assert router.choose("guess_text").model == "mid"
+
+
+def test_stale_estimates_are_refreshed_once():
+    clock = FakeClock()
+    router = _router(clock, stale_after=60.0)
+    _feed(router, "cheap", 3.0)
+    _feed(router, "mid", 0.4)
+    assert router.choose("guess_text").model == "mid"
+
+    clock.now += 120
+    _feed(router, "mid", 0.4, count=1)
+    decision = router.choose("guess_text")
+    assert (decision.model, decision.reason) == ("cheap", "stale")
+    assert router.choose("guess_text").model == "mid"
+
+
+def test_exploration_and_fallback():
+    clock = FakeClock()
+    router = _router(clock, explore=1.0)
+    for model in ("cheap", "mid", "pricey"):
+        _feed(router, model, 0.5)
+    picks = {router.choose("guess_text").model for _ in range(30)}
+    assert picks == {"mid", "pricey"}
+
+    router = _router(clock)
+    _feed(router, "cheap", 5.0)
+    _feed(router, "mid", 3.0)
+    _feed(router, "pricey", 2.0, outcome="error")
+    _feed(router, "pricey", 2.0, count=1)
+    decision = router.choose("guess_text")
+    assert (decision.model, decision.reason) == ("mid", "fallback")
+
+
+def test_unknown_slo_task_is_rejected():
+    with pytest.raises(ValueError, match="guess_audio"):
+        ModelRouter([ModelProfile("cheap", 0.1)], slos={"guess_audio": 1.0})
+
+
+def test_extractor_routes_and_exports_outcomes(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    asyncio.run(_run_extractor_routing())
+
+
+async def _run_extractor_routing():
+    latencies = {"router/cheap": 0.3, "router/fast": 0.01}
+    seen: list[str] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        model = (await request.json())["model"]
+        seen.append(model)
+        await asyncio.sleep(latencies[model])
+        return web.json_response(
+            {
+                "choices": [{"message": {"content": "гречка\nкурица"}}],
+                "usage": {"prompt_tokens": 40, "completion_tokens": 10, "total_tokens": 50},
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/chat/completions", handle)
+    router = ModelRouter(
+        [ModelProfile("router/cheap", 0.1), ModelProfile("router/fast", 1.0)],
+        slos={"guess_text": 0.1},
+        min_samples=2,
+        explore=0.0,
+    )
+    async with TestServer(app) as server:
+        extractor = CompositionExtractor(
+            endpoint=str(server.make_url("/chat/completions")),
+            router=router,
+            latency=LatencyTracker(initial=10.0),
+        )
+        for _ in range(5):
+            assert await extractor.guess_from_text("каша") == "гречка\nкурица"
+        await extractor.close()
+
+    assert seen == ["router/cheap", "router/cheap", "router/fast", "router/fast", "router/fast"]
+    rendered = REGISTRY.render()
+    assert (
+        'bot_model_route_decisions_total{task="guess_text",model="router/fast",reason="slo"} 1'
+        in rendered
+    )
+    assert 'bot_model_tokens_total{task="guess_text",model="router/cheap",kind="prompt"} 80' in (
+        rendered
+    )
+    assert (
+        "bot_model_call_duration_seconds_count"
+        '{task="guess_text",model="router/fast",outcome="ok"} 3' in rendered
+    )
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.domain.models import Condition, ConditionDraft, FoodEventDraft
+from bot.fsm.states import FoodLogStates
+from bot.handlers import add_food
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.foods_service import FoodsService
+from bot.services.persist_queue import FAILED_TEXT, PENDING_TEXT, PersistQueue
+from bot.services.symptom_stats import SymptomStatsService
+from bot.tracing import TraceSink, start_trace
+from bot.ui.callbacks import ConditionWellBeingAction
+
+
+class FakeTimeService:
+    def now(self):
+        return datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+    def short_id(self, length: int = 8) -> str:
+        return "cafebabe"
+
+
+class SentMessage:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+class StubChat:
+    id = 42
+
+
+class StubUser:
+    id = 7
+
+
+class StubMessage:
+    def __init__(self):
+        self.chat = StubChat()
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, reply_markup=None):
+        self.replies.append(text)
+        return SentMessage(len(self.replies))
+
+
+class StubCallback:
+    def __init__(self, events: list[str]):
+        self.message = StubMessage()
+        self.from_user = StubUser()
+        self._events = events
+
+    async def answer(self, text: str | None = None, show_alert: bool = False):
+        self._events.append("answered")
+
+
+class StubBot:
+    def __init__(self):
+        self.edits: list[tuple[int, int, str]] = []
+
+    async def edit_message_text(self, text, *, chat_id, message_id, reply_markup=None):
+        self.edits.append((chat_id, message_id, text))
+
+    async def send_message(self, chat_id, text, reply_markup=None):  # pragma: no cover
+        self.edits.append((chat_id, 0, text))
+
+
+class FlakyFoodEventService(FoodEventService):
+    def __init__(self, *args, failures: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.calls = 0
+
+    async def persist_event(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OSError("disk is not ready")
+        return await super().persist_event(*args, **kwargs)
+
+
+def _service(tmp_path: Path, failures: int = 0) -> FlakyFoodEventService:
+    file_store = FileStore(tmp_path / "vault")
+    return FlakyFoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=FakeTimeService(),
+        failures=failures,
+    )
+
+
+def test_condition_callback_answers_before_persisting(tmp_path: Path):
+    asyncio.run(_run_reply_first(tmp_path))
+
+
+async def _run_reply_first(tmp_path: Path):
+    service = _service(tmp_path)
+    queue = PersistQueue(tmp_path / "state.sqlite3", service)
+    add_food.setup_dependencies(service, FakeTimeService(), persist_queue=queue)
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=42, user_id=7))
+    await state.set_state(FoodLogStates.ask_condition_well_being)
+    draft = FoodEventDraft(started_at=datetime(2025, 3, 12, 19, 0), foods_raw=["Паста", "Сыр"])
+    await state.update_data(
+        draft=draft.model_dump(),
+        condition=ConditionDraft(bloating=True, diarrhea=False).model_dump(),
+    )
+
+    events: list[str] = []
+    callback = StubCallback(events)
+    await add_food.cb_condition_well_being(callback, ConditionWellBeingAction(score=6), state)
+
+    assert events == ["answered"]
+    assert callback.message.replies == [PENDING_TEXT]
+    assert await state.get_state() is None
+    assert not (tmp_path / "vault" / "FoodLog").exists()
+    assert queue.counts() == {"pending": 1}
+
+    bot = StubBot()
+    queue._bot = bot
+    assert await queue.run_pending() == 1
+    food_logs = list((tmp_path / "vault" / "FoodLog").glob("*.md"))
+    assert [path.name for path in food_logs] == ["2025-03-12_19-30-00_cafebabe.md"]
+    assert bot.edits[0][:2] == (42, 1)
+    assert "Всего ингредиентов: 2" in bot.edits[0][2]
+    assert queue.counts() == {}
+    queue.close()
+
+
+def test_jobs_survive_failures_and_restarts(tmp_path: Path):
+    asyncio.run(_run_recovery(tmp_path))
+
+
+async def _run_recovery(tmp_path: Path):
+    service = _service(tmp_path, failures=1)
+    path = tmp_path / "state.sqlite3"
+    draft = FoodEventDraft(started_at=datetime(2025, 3, 12, 19, 0), foods_raw=["рис"])
+    condition = Condition(bloating=False, diarrhea=False, well_being=8)
+    stamp = FakeTimeService().now()
+
+    first = PersistQueue(path, service, retry_base=0.0, max_attempts=3, lease_seconds=0.0)
+    await first.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="aaaa0001")
+    await first.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="aaaa0002")
+    # Первая попытка падает: задача возвращается в очередь и дописывается в том же проходе.
+    assert await first.run_pending() == 3
+    assert service.calls == 3
+
+    # Процесс «упал» посреди задачи: она осталась running, пока не истечёт аренда.
+    await first.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="aaaa0003")
+    assert first._claim(time.time()) is not None
+    assert first.counts() == {"running": 1}
+    first.close()
+
+    restarted = PersistQueue(path, service)
+    assert await restarted.run_pending() == 1
+    assert restarted.counts() == {}
+
+    names = sorted(p.name for p in (tmp_path / "vault" / "FoodLog").glob("*.md"))
+    assert names == [
+        "2025-03-12_19-30-00_aaaa0001.md",
+        "2025-03-12_19-30-00_aaaa0002.md",
+        "2025-03-12_19-30-00_aaaa0003.md",
+    ]
+
+    doomed = _service(tmp_path / "doomed", failures=10)
+    queue = PersistQueue(tmp_path / "doomed.sqlite3", doomed, retry_base=0.0, max_attempts=2)
+    bot = StubBot()
+    queue._bot = bot
+    await queue.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="b", chat_id=42)
+    await queue.run_pending()
+    assert doomed.calls == 2
+    assert queue.counts() == {"failed": 1}
+    assert bot.edits == [(42, 0, FAILED_TEXT)]
+    restarted.close()
+    queue.close()
+
+
+class SlowFoodEventService(FoodEventService):
+    def __init__(self, *args, delay: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delay = delay
+
+    async def persist_event(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        return await super().persist_event(*args, **kwargs)
+
+
+def test_retries_do_not_double_count_statistics(tmp_path: Path):
+    asyncio.run(_run_idempotent_retry(tmp_path))
+
+
+async def _run_idempotent_retry(tmp_path: Path):
+    file_store = FileStore(tmp_path / "vault")
+    stats = SymptomStatsService(tmp_path / "state.sqlite3")
+    service = SlowFoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=FakeTimeService(),
+        symptom_stats=stats,
+        delay=0.3,
+    )
+    draft = FoodEventDraft(started_at=datetime(2025, 3, 12, 19, 0), foods_raw=["рис"])
+    condition = Condition(bloating=True, diarrhea=False, well_being=5)
+    stamp = FakeTimeService().now()
+
+    first = PersistQueue(tmp_path / "state.sqlite3", service, lease_seconds=0.15, owner="a")
+    second = PersistQueue(tmp_path / "state.sqlite3", service, lease_seconds=0.15, owner="b")
+    await first.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="aaaa0001")
+    # Аренда продлевается, пока идёт медленная запись: второй воркер задачу не получает.
+    running = asyncio.create_task(first.run_pending())
+    await asyncio.sleep(0.2)
+    assert second._claim(time.time()) is None
+    assert await running == 1
+
+    # Воркер «упал» после записи, но до удаления задачи: повтор не меняет статистику.
+    await first.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="aaaa0001")
+    stale = first._claim(time.time())
+    await service.persist_event(
+        stale.draft, stale.condition, timestamp=stale.timestamp, short_id=stale.short_id
+    )
+    await asyncio.sleep(0.2)
+    assert await second.run_pending() == 1
+    # Завершить задачу, перехваченную другим воркером, нельзя.
+    assert not first._complete(stale.id)
+
+    total, _ = await stats.rank()
+    assert total == 1
+    assert stats._fetch_all()["рис"][:2] == [1, 1]
+    first.close()
+    second.close()
+    stats.close()
+
+
+class LockedPersistQueue(PersistQueue):
+    """Продление аренды упирается в занятую базу."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extend_calls = 0
+
+    def _extend(self, job_id: int, now: float) -> None:
+        self.extend_calls += 1
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_unfixable_jobs_fail_at_once_and_jobs_are_traced(tmp_path: Path, caplog):
+    asyncio.run(_run_unfixable(tmp_path, caplog))
+
+
+async def _run_unfixable(tmp_path: Path, caplog):
+    file_store = FileStore(tmp_path / "vault")
+    service = SlowFoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=FakeTimeService(),
+        delay=0.1,
+    )
+    sink = TraceSink(tmp_path / "traces.jsonl", sample_rate=1.0)
+    queue = LockedPersistQueue(
+        tmp_path / "state.sqlite3", service, lease_seconds=0.03, trace_sink=sink
+    )
+    bot = StubBot()
+    queue._bot = bot
+    condition = Condition(bloating=False, diarrhea=False, well_being=8)
+    stamp = FakeTimeService().now()
+
+    # Пустой список продуктов не исправится повтором: отказ сразу, без восьми попыток.
+    empty = FoodEventDraft(started_at=datetime(2025, 3, 12, 19, 0), foods_raw=[" "])
+    await queue.enqueue(empty, condition, user_id=7, timestamp=stamp, short_id="a", chat_id=42)
+    # Битая задача (например, от старой версии) тоже не блокирует очередь.
+    await asyncio.to_thread(queue._insert, '{"draft": {}}', time.time())
+    draft = FoodEventDraft(started_at=datetime(2025, 3, 12, 19, 0), foods_raw=["рис"])
+    with start_trace("update.callback_query") as origin:
+        await queue.enqueue(draft, condition, user_id=7, timestamp=stamp, short_id="b")
+
+    with caplog.at_level(logging.WARNING, logger="bot.services.persist_queue"):
+        assert await queue.run_pending() == 2
+    assert queue.counts() == {"failed": 2}
+    assert bot.edits == [(42, 0, FAILED_TEXT)]
+    # Занятая база при продлении аренды только логируется, задача доходит до конца.
+    assert queue.extend_calls >= 2
+    assert "Could not extend lease" in caplog.text
+    assert len(list((tmp_path / "vault" / "FoodLog").glob("*.md"))) == 1
+
+    sink.flush()
+    traces = [
+        json.loads(line)
+        for line in (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+    ]
+    assert [trace["name"] for trace in traces] == ["persist_job", "persist_job"]
+    assert traces[0]["error"] == "ValueError"
+    assert traces[1]["attributes"]["origin_trace"] == origin.trace_id
+    assert "food_event.persist" in {span["name"] for span in traces[1]["spans"]}
+    sink.close()
+    queue.close()
@@ -0,0 +1,106 @@
+import asyncio
+import tracemalloc
+
+import pytest
+
+from bot.services.photo_fetcher import PhotoFetcher, PhotoTooLargeError
+
+CHUNK = 64 * 1024
+
+
+class StubPhoto:
+    def __init__(self, file_id: str, file_size: int | None = None):
+        self.file_id = file_id
+        self.file_size = file_size
+
+
+class StubFile:
+    def __init__(self, file_path: str, file_size: int | None):
+        self.file_path = file_path
+        self.file_size = file_size
+
+
+class ChunkedBot:
+    def __init__(self, payload: bytes, *, reported_size: int | None = None):
+        self._payload = payload
+        self._reported_size = reported_size
+        self.downloads = 0
+
+    async def get_file(self, file_id: str) -> StubFile:
+        return StubFile(f"photos/{file_id}.jpg", self._reported_size)
+
+    async def download_file(self, file_path: str, destination=None, seek: bool = True):
+        self.downloads += 1
+        view = memoryview(self._payload)
+        for offset in range(0, len(view), CHUNK):
+            destination.write(view[offset : offset + CHUNK])
+            destination.flush()
+        if seek:
+            destination.seek(0)
+        return destination
+
+
+async def _fetch_checksum(fetcher: PhotoFetcher, bot: ChunkedBot) -> int:
+    async with fetcher.fetch(bot, StubPhoto("photo")) as image:
+        return len(image) + image[0] + image[-1]
+
+
+def test_fetch_hands_out_view_of_downloaded_bytes():
+    payload = bytes(range(256)) * 1000
+    bot = ChunkedBot(payload)
+    fetcher = PhotoFetcher(initial_capacity=1024)
+
+    async def run() -> None:
+        async with fetcher.fetch(bot, StubPhoto("photo")) as image:
+            assert isinstance(image, memoryview)
+            assert image == payload
+
+    asyncio.run(run())
+
+
+def test_reused_buffer_allocates_far_less_than_photo_size():
+    payload = b"\xff" * (2 * 1024 * 1024)
+    bot = ChunkedBot(payload)
+    fetcher = PhotoFetcher(pool_size=1)
+
+    async def run() -> int:
+        await _fetch_checksum(fetcher, bot)
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            for _ in range(5):
+                await _fetch_checksum(fetcher, bot)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak - base
+
+    # Без пула каждое фото стоило бы минимум две полные копии (BytesIO + read()).
+    assert asyncio.run(run()) < len(payload) // 20
+
+
+def test_declared_size_over_limit_skips_download():
+    bot = ChunkedBot(b"x" * 100, reported_size=5000)
+    fetcher = PhotoFetcher(max_bytes=1000)
+
+    async def run() -> None:
+        with pytest.raises(PhotoTooLargeError):
+            async with fetcher.fetch(bot, StubPhoto("photo", file_size=5000)):
+                pass
+
+    asyncio.run(run())
+    assert bot.downloads == 0
+
+
+def test_stream_over_limit_aborts_and_buffer_stays_usable():
+    fetcher = PhotoFetcher(max_bytes=100_000, pool_size=1, initial_capacity=1024)
+
+    async def run() -> None:
+        with pytest.raises(PhotoTooLargeError):
+            async with fetcher.fetch(ChunkedBot(b"x" * 200_000), StubPhoto("big")):
+                pass
+        async with fetcher.fetch(ChunkedBot(b"ok"), StubPhoto("small")) as image:
+            assert image == b"ok"
+
+    asyncio.run(run())
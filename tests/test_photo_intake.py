@@ -8,6 +8,7 @@ from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.handlers import photo
 from bot.services.photo_intake import PhotoIntakeConfig, PhotoIntakeService
+from bot.services.recognition_cache import RecognitionCache
 
 
 class StubTimeService:
@@ -16,8 +17,9 @@ class StubTimeService:
 
 
 class StubPhoto:
-    def __init__(self, file_id: str):
+    def __init__(self, file_id: str, file_unique_id: str | None = None):
         self.file_id = file_id
+        self.file_unique_id = file_unique_id
 
 
 class StubFile:
@@ -36,14 +38,19 @@ class StubDownload:
 class StubBot:
     def __init__(self, *, raise_on_download: bool = False):
         self.raise_on_download = raise_on_download
+        self.get_file_calls = 0
 
     async def get_file(self, file_id: str) -> StubFile:
+        self.get_file_calls += 1
         return StubFile(file_path=f"/tmp/{file_id}.jpg")
 
-    async def download_file(self, file_path: str) -> StubDownload:
+    async def download_file(self, file_path: str, destination=None, seek: bool = True):
         if self.raise_on_download:
             raise RuntimeError("download failed")
-        return StubDownload(b"image-bytes")
+        if destination is None:
+            return StubDownload(b"image-bytes")
+        destination.write(b"image-bytes")
+        return destination
 
 
 class StubMessage:
@@ -61,8 +68,10 @@ class StubPhotoIntakeService(PhotoIntakeService):
         super().__init__(PhotoIntakeConfig(url="http://localhost", token=None))
         self._kind = kind
         self._ingredients = ingredients if ingredients is not None else []
+        self.calls = 0
 
     async def classify_image(self, image: bytes):
+        self.calls += 1
         return self._kind
 
     async def dish_to_ingredients(self, image: bytes):
@@ -124,3 +133,29 @@ async def _run_handle_photo_download_error():
         "Не смог загрузить фото. Попробуйте отправить ещё раз или используйте /add."
     ]
     assert await state.get_state() is None
+
+
+def test_handle_photo_resend_uses_recognition_cache(tmp_path):
+    asyncio.run(_run_handle_photo_resend_uses_recognition_cache(tmp_path))
+
+
+async def _run_handle_photo_resend_uses_recognition_cache(tmp_path):
+    intake = StubPhotoIntakeService(kind="dish", ingredients=["хлеб", "сыр"])
+    photo.setup_dependencies(
+        intake, StubTimeService(), recognition_cache=RecognitionCache(tmp_path / "cache")
+    )
+    storage = MemoryStorage()
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+    bot = StubBot()
+
+    # Пересланное фото приходит с новым file_id, но тем же file_unique_id.
+    first = StubMessage(bot, [StubPhoto("file-1", file_unique_id="uniq-1")])
+    await photo.handle_photo(first, state)
+    second = StubMessage(bot, [StubPhoto("file-2", file_unique_id="uniq-1")])
+    await photo.handle_photo(second, state)
+
+    assert intake.calls == 1
+    assert bot.get_file_calls == 1
+    assert second.answers == first.answers
+    data = await state.get_data()
+    assert data["draft"]["foods_raw"] == ["хлеб", "сыр"]
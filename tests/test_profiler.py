@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+from aiogram.filters import CommandObject
+
+from bot.handlers import admin
+from bot.profiler import (
+    LoopBlock,
+    LoopBlockWatchdog,
+    ProfilerController,
+    SamplingProfiler,
+    blocking_frame,
+    summarize_blocks,
+)
+
+
+class StubUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class StubMessage:
+    def __init__(self, user_id: int):
+        self.from_user = StubUser(user_id)
+        self.answers: list[str] = []
+
+    async def answer(self, text: str, **_):
+        self.answers.append(text)
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_records_collapsed_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        samples = SamplingProfiler(interval=0.002).run(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = [stack for stack in samples if stack.startswith("busy;")]
+    assert busy and all("test_profiler:_busy_loop" in stack for stack in busy)
+
+    path = tmp_path / "profile.collapsed"
+    SamplingProfiler.write_collapsed(path, samples)
+    first = path.read_text(encoding="utf-8").splitlines()[0]
+    stack, count = first.rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+
+
+def _blocking_call() -> None:
+    time.sleep(0.3)
+
+
+def test_watchdog_reports_blocking_callback_once():
+    async def run() -> list:
+        watchdog = LoopBlockWatchdog(threshold=0.1)
+        await watchdog.start()
+        await asyncio.sleep(0.1)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await watchdog.stop()
+        return list(watchdog.blocks)
+
+    blocks = asyncio.run(run())
+    assert len(blocks) == 1
+    assert "_blocking_call" in blocks[0].stack
+    assert blocks[0].stalled_for >= 0.1
+
+
+def test_blocking_frame_prefers_bot_frames():
+    stack = (
+        "event-loop;asyncio.base_events:BaseEventLoop.run_forever;"
+        "bot.services.foods_service:FoodsService._path_matches_original;"
+        "pathlib:Path.read_text;io:open"
+    )
+    assert blocking_frame(stack) == "bot.services.foods_service:FoodsService._path_matches_original"
+    summary = summarize_blocks([LoopBlock(0.0, 0.2, stack), LoopBlock(1.0, 0.5, stack)])
+    assert summary == {"bot.services.foods_service:FoodsService._path_matches_original": 0.5}
+
+
+def test_profile_command_is_admin_only(tmp_path):
+    asyncio.run(_run_profile_command(tmp_path))
+
+
+async def _run_profile_command(tmp_path) -> None:
+    admin.setup_dependencies(ProfilerController(tmp_path / "profiles"), admin_ids=[42])
+
+    stranger = StubMessage(7)
+    await admin.cmd_profile(stranger, CommandObject(command="profile", args="1"))
+    assert stranger.answers == ["Команда доступна только администраторам."]
+
+    invalid = StubMessage(42)
+    await admin.cmd_profile(invalid, CommandObject(command="profile", args="9000"))
+    assert invalid.answers[0].startswith("Использование")
+
+    owner = StubMessage(42)
+    await admin.cmd_profile(owner, CommandObject(command="profile", args="1"))
+    assert owner.answers[0] == "Снимаю профиль 1 с…"
+    assert owner.answers[1].startswith("Профиль готов: profile-")
+    assert len(list((tmp_path / "profiles").glob("*.collapsed"))) == 1
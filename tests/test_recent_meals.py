@@ -0,0 +1,27 @@
+from bot.services.recent_meals import RecentMealsCache
+
+
+def test_recent_meals_is_per_user_lru():
+    cache = RecentMealsCache(capacity=2)
+    cache.remember(1, ["каша"])
+    cache.remember(1, ["суп", "хлеб"])
+    cache.remember(1, ["каша"])
+    cache.remember(1, ["салат"])
+
+    assert [meal.foods for meal in cache.recent(1)] == [["салат"], ["каша"]]
+    assert cache.recent(2) == []
+
+
+def test_recent_meals_never_offers_other_users_meals():
+    cache = RecentMealsCache(capacity=2, max_users=2)
+    cache.remember(1, ["омлет"])
+    meal = cache.remember(2, ["паста", "сыр"])
+
+    assert cache.recent(42) == []
+    assert cache.get(42, meal.key) is None
+    assert cache.get(None, meal.key) is None
+
+    cache.remember(3, ["борщ"])
+    # Самый давний пользователь вытесняется первым.
+    assert cache.recent(1) == []
+    assert [meal.foods for meal in cache.recent(3)] == [["борщ"]]
@@ -0,0 +1,132 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from bot.fsm.states import FoodLogStates
+from bot.handlers import add_food
+from bot.metrics import REGISTRY
+from bot.services.recipe_store import RecipeStore, recipe_key
+
+
+def test_recipe_key_ignores_case_yo_and_word_order():
+    assert recipe_key("Котлета куриная.") == recipe_key("куриная котлета")
+    assert recipe_key("Свёкла тушёная") == "свекла тушеная"
+
+
+def test_lookup_matches_exact_and_near_identical_names(tmp_path: Path):
+    asyncio.run(_run_lookup(tmp_path / "state.sqlite3"))
+
+
+async def _run_lookup(path: Path):
+    store = RecipeStore(path)
+    await store.remember(1, "Куриный суп с лапшой", ["курица", "лапша", "морковь", "курица"])
+    await store.remember(1, "суп", ["вода"])
+
+    assert await store.lookup(1, "суп с лапшой куриный") == ["курица", "лапша", "морковь"]
+    # Опечатка в длинном названии прощается, в коротком — нет.
+    assert await store.lookup(1, "куриный суп с лапшёй") == ["курица", "лапша", "морковь"]
+    assert await store.lookup(1, "сук") is None
+    # Другое слово — другое блюдо, даже если между названиями пара правок.
+    await store.remember(1, "блины с мясом", ["мука", "говядина"])
+    await store.remember(1, "курица жареная", ["курица", "масло"])
+    assert await store.lookup(1, "блины с медом") is None
+    assert await store.lookup(1, "курица вареная") is None
+    assert await store.lookup(1, "блины с мясом и сыром") is None
+    # Рецепты личные.
+    assert await store.lookup(2, "куриный суп с лапшой") is None
+    assert (store.hits, store.misses) == (2, 5)
+
+    await store.remember(1, "куриный суп с лапшой", ["курица", "лапша"])
+    store.close()
+
+    reopened = RecipeStore(path)
+    assert await reopened.lookup(1, "Куриный суп с лапшой") == ["курица", "лапша"]
+    reopened.close()
+    rendered = REGISTRY.render()
+    assert 'bot_recipe_lookups_total{outcome="fuzzy"}' in rendered
+    assert 'bot_recipe_lookups_total{outcome="miss"}' in rendered
+
+
+class FakeTimeService:
+    def now(self):
+        return datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+
+class CountingExtractor:
+    def __init__(self):
+        self.dishes: list[str] = []
+
+    async def guess_from_text(self, dish_name: str, prompt: str | None = None) -> str:
+        self.dishes.append(dish_name)
+        return "свекла\nкапуста\nкартофель\nмясо"
+
+    async def guess_batch(self, dishes, prompt: str | None = None):
+        self.dishes.extend(dishes)
+        return {dish: [f"{dish} основа"] for dish in dishes}
+
+
+class StubMessage:
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.photo = []
+        self.replies: list[str] = []
+
+    async def answer(self, text: str, reply_markup=None):
+        self.replies.append(text)
+
+
+class StubCallback:
+    def __init__(self):
+        self.message = StubMessage()
+
+    async def answer(self, text: str | None = None, show_alert: bool = False):
+        return None
+
+
+def test_accepted_and_edited_guesses_are_answered_locally(tmp_path: Path):
+    asyncio.run(_run_learning(tmp_path / "state.sqlite3"))
+
+
+async def _run_learning(path: Path):
+    extractor = CountingExtractor()
+    store = RecipeStore(path)
+    add_food.setup_dependencies(None, FakeTimeService(), extractor, recipe_store=store)
+    storage = MemoryStorage()
+    state = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=1, user_id=7))
+
+    async def guess(text: str) -> list[str]:
+        await state.set_state(FoodLogStates.guess_input)
+        await add_food.handle_guess_input(StubMessage(text), state)
+        return (await state.get_data())["pending_lines"]
+
+    # Принятый как есть пакет блюд запоминается по каждому блюду.
+    await guess("плов\nкомпот")
+    await add_food.cb_composition_accept(StubCallback(), state)
+    assert await guess("Плов\nкомпот") == ["плов основа", "компот основа"]
+    assert extractor.dishes == ["плов", "компот"]
+
+    # Исправленный вручную состав заменяет предложение и становится рецептом.
+    await guess("борщ")
+    await add_food.handle_foods_input(StubMessage("свекла\nкапуста\nговядина\nсметана"), state)
+    data = await state.get_data()
+    assert data["pending_lines"] is None
+    assert data["draft"]["foods_raw"][-4:] == ["свекла", "капуста", "говядина", "сметана"]
+    assert await guess("Борщ") == ["свекла", "капуста", "говядина", "сметана"]
+    assert extractor.dishes == ["плов", "компот", "борщ"]
+
+    # Посторонние продукты при открытом предложении рецептом не считаются.
+    await guess("солянка")
+    await add_food.handle_foods_input(StubMessage("хлеб"), state)
+    assert (await state.get_data())["pending_lines"] is not None
+    assert await store.lookup(7, "солянка") is None
+
+    other = FSMContext(storage=storage, key=StorageKey(bot_id=1, chat_id=2, user_id=8))
+    await other.set_state(FoodLogStates.guess_input)
+    await add_food.handle_guess_input(StubMessage("борщ"), other)
+    assert extractor.dishes[-1] == "борщ"
+    store.close()
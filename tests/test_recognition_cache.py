@@ -0,0 +1,49 @@
+import asyncio
+
+from bot.services.recognition_cache import RecognitionCache
+
+
+def test_evicted_entries_spill_to_disk_and_come_back(tmp_path):
+    asyncio.run(_run_spill(tmp_path))
+
+
+async def _run_spill(tmp_path):
+    cache = RecognitionCache(tmp_path, capacity=2)
+    await cache.put("composition", "a", "мука\nсахар")
+    await cache.put("composition", "b", "молоко")
+    await cache.put("intake", "c", ["хлеб"])
+
+    assert len(cache) == 2
+    assert len(list(tmp_path.glob("*.json"))) == 1
+    assert await cache.get("composition", "a") == "мука\nсахар"
+    assert await cache.get("composition", "missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    reopened = RecognitionCache(tmp_path, capacity=2)
+    assert await reopened.get("composition", "a") == "мука\nсахар"
+    assert await reopened.get("intake", "c") is None
+
+
+def test_kinds_do_not_collide_and_missing_id_is_ignored():
+    async def run():
+        cache = RecognitionCache(capacity=4)
+        await cache.put("composition", "x", "состав")
+        await cache.put("guess", "x", "догадка")
+        await cache.put("guess", None, "без ключа")
+        assert await cache.get("composition", "x") == "состав"
+        assert await cache.get("guess", "x") == "догадка"
+        assert await cache.get("guess", None) is None
+        assert len(cache) == 2
+
+    asyncio.run(run())
+
+
+def test_disk_spillover_is_pruned(tmp_path):
+    async def run():
+        cache = RecognitionCache(tmp_path, capacity=1, max_disk_entries=10)
+        for index in range(30):
+            await cache.put("guess", str(index), f"value-{index}")
+        assert len(list(tmp_path.glob("*.json"))) <= 10
+        assert await cache.get("guess", "28") == "value-28"
+
+    asyncio.run(run())
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText
+
+from bot.handlers import add_food
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.foods_service import FoodsService
+from bot.ui.callbacks import ConditionBoolAction, ConditionWellBeingAction
+from bot.ui.keyboards import adding_foods_keyboard, confirm_finish_keyboard
+from bot.ui.session_card import CARD_KEY, SessionCardEditor
+
+
+class FakeTimeService:
+    def now(self):
+        return datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+    def short_id(self, length: int = 8) -> str:
+        return "cafebabe"
+
+
+class SentMessage:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+class ApiRecorder:
+    """Считает исходящие вызовы Bot API так, как их увидел бы Telegram."""
+
+    def __init__(self, broken: set[int] | None = None):
+        self.calls: Counter = Counter()
+        self.texts: dict[int, str] = {}
+        self._next_id = 100
+        self._broken = broken or set()
+
+    def send(self, text: str) -> SentMessage:
+        self.calls["sendMessage"] += 1
+        self._next_id += 1
+        self.texts[self._next_id] = text
+        return SentMessage(self._next_id)
+
+
+class StubBot:
+    def __init__(self, api: ApiRecorder):
+        self.api = api
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        return self.api.send(text)
+
+    async def edit_message_text(self, text, *, chat_id, message_id, reply_markup=None):
+        self.api.calls["editMessageText"] += 1
+        if message_id in self.api._broken:
+            raise TelegramBadRequest(
+                EditMessageText(text=text), "Bad Request: message to edit not found"
+            )
+        self.api.texts[message_id] = text
+
+    async def edit_message_reply_markup(self, *, chat_id, message_id, reply_markup=None):
+        self.api.calls["editMessageReplyMarkup"] += 1
+
+
+class StubChat:
+    id = 1
+
+
+class StubUser:
+    id = 1
+
+
+class StubMessage:
+    def __init__(self, api: ApiRecorder, text: str = ""):
+        self.text = text
+        self.chat = StubChat()
+        self.bot = StubBot(api)
+        self.photo = []
+        self._api = api
+
+    async def answer(self, text: str, reply_markup=None):
+        return self._api.send(text)
+
+
+class StubCallback:
+    def __init__(self, api: ApiRecorder):
+        self.message = StubMessage(api)
+        self.from_user = StubUser()
+        self._api = api
+
+    async def answer(self, text: str | None = None, show_alert: bool = False):
+        self._api.calls["answerCallbackQuery"] += 1
+
+
+def _state() -> FSMContext:
+    return FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=1, user_id=1))
+
+
+async def _log_meal(tmp_path: Path, editor: SessionCardEditor | None) -> ApiRecorder:
+    file_store = FileStore(tmp_path)
+    condition_service = ConditionService(file_store)
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=condition_service,
+        time_service=FakeTimeService(),
+    )
+    add_food.setup_dependencies(service, FakeTimeService(), card_editor=editor)
+    api = ApiRecorder()
+    state = _state()
+
+    async def step(handler, *args):
+        await handler(*args)
+        # Пауза пользователя между шагами длиннее debounce.
+        if editor is not None:
+            await editor.flush()
+
+    await step(add_food._start_flow, StubMessage(api, "/add"), state)
+    await step(add_food.handle_foods_input, StubMessage(api, "Паста\nСыр"), state)
+    await step(add_food.handle_foods_input, StubMessage(api, "Соус"), state)
+    await step(add_food.cb_finish, StubCallback(api), state)
+    await step(add_food.cb_confirm_finish, StubCallback(api), state)
+    await step(
+        add_food.cb_condition_bloating,
+        StubCallback(api),
+        ConditionBoolAction(symptom="bloating", value="yes"),
+        state,
+    )
+    await step(
+        add_food.cb_condition_diarrhea,
+        StubCallback(api),
+        ConditionBoolAction(symptom="diarrhea", value="no"),
+        state,
+    )
+    await step(
+        add_food.cb_condition_well_being,
+        StubCallback(api),
+        ConditionWellBeingAction(score=6),
+        state,
+    )
+    assert await state.get_state() is None
+    assert len(list((tmp_path / "FoodLog").glob("*.md"))) == 1
+    return api
+
+
+def test_card_mode_sends_one_message_per_meal(tmp_path: Path):
+    messages = asyncio.run(_log_meal(tmp_path / "messages", None))
+    card = asyncio.run(_log_meal(tmp_path / "card", SessionCardEditor(debounce=0.01)))
+
+    assert messages.calls == {"sendMessage": 8, "answerCallbackQuery": 5}
+    assert card.calls == {"sendMessage": 1, "editMessageText": 7, "answerCallbackQuery": 5}
+    assert "Всего ингредиентов: 3" in card.texts[101]
+
+
+def test_rapid_edits_are_coalesced_and_unchanged_ones_skipped():
+    asyncio.run(_run_coalescing())
+
+
+async def _run_coalescing():
+    api = ApiRecorder()
+    editor = SessionCardEditor(debounce=0.05)
+    state = _state()
+    message = StubMessage(api)
+    card_id = await editor.show(message, state, "Черновик", adding_foods_keyboard())
+    assert (await state.get_data())[CARD_KEY] == card_id
+
+    for count in range(1, 6):
+        await editor.show(message, state, f"Добавлено: {count}", adding_foods_keyboard())
+    await editor.flush()
+    assert api.calls == {"sendMessage": 1, "editMessageText": 1}
+    assert api.texts[card_id] == "Добавлено: 5"
+
+    await editor.show(message, state, "Добавлено: 5", adding_foods_keyboard())
+    await editor.flush()
+    assert api.calls["editMessageText"] == 1
+
+    await editor.show(message, state, "Добавлено: 5", confirm_finish_keyboard(), immediate=True)
+    assert api.calls == {"sendMessage": 1, "editMessageText": 1, "editMessageReplyMarkup": 1}
+
+
+def test_lost_card_is_replaced_by_new_message():
+    asyncio.run(_run_lost_card())
+
+
+async def _run_lost_card():
+    api = ApiRecorder(broken={101})
+    editor = SessionCardEditor(debounce=0)
+    state = _state()
+    message = StubMessage(api)
+    await editor.show(message, state, "Черновик")
+    assert await editor.show(message, state, "Шаг 2", immediate=True) == 102
+    assert (await state.get_data())[CARD_KEY] == 102
+
+    await editor.show(message, state, "Шаг 3", immediate=True)
+    assert api.calls == {"sendMessage": 2, "editMessageText": 2}
+    assert api.texts[102] == "Шаг 3"
+
+
+class FlakyBot(StubBot):
+    """Первый вызов упирается в флуд-контроль, второй падает с сетевой ошибкой."""
+
+    def __init__(self, api: ApiRecorder, failures: list[Exception]):
+        super().__init__(api)
+        self._failures = failures
+
+    async def edit_message_text(self, text, *, chat_id, message_id, reply_markup=None):
+        if self._failures:
+            self.api.calls["failed"] += 1
+            raise self._failures.pop(0)
+        await super().edit_message_text(
+            text, chat_id=chat_id, message_id=message_id, reply_markup=reply_markup
+        )
+
+
+def test_debounced_edit_retries_after_flood_control_and_logs_errors(caplog):
+    asyncio.run(_run_flaky_card(caplog))
+
+
+async def _run_flaky_card(caplog):
+    api = ApiRecorder()
+    editor = SessionCardEditor(debounce=0.01)
+    state = _state()
+    message = StubMessage(api)
+    flood = TelegramRetryAfter(EditMessageText(text="Шаг 2"), "Flood control", retry_after=0)
+    message.bot = FlakyBot(api, [flood])
+    card_id = await editor.show(message, state, "Черновик")
+
+    await editor.show(message, state, "Шаг 2")
+    await editor.flush()
+    assert api.calls["failed"] == 1
+    assert api.texts[card_id] == "Шаг 2"
+
+    message.bot = FlakyBot(api, [RuntimeError("connection reset")])
+    with caplog.at_level(logging.ERROR, logger="bot.ui.session_card"):
+        await editor.show(message, state, "Шаг 3")
+        await editor.flush()
+    assert "update failed" in caplog.text
+    assert api.texts[card_id] == "Шаг 2"
+
+    # Следующая правка после ошибки доходит как обычно.
+    await editor.show(message, state, "Шаг 4")
+    await editor.flush()
+    assert api.texts[card_id] == "Шаг 4"
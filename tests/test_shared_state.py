@@ -0,0 +1,147 @@
+import asyncio
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+
+from bot.domain.models import FoodEventDraft
+from bot.fsm.states import FoodLogStates
+from bot.fsm.storage import SQLiteStorage
+from bot.services.breath_reminder_service import BreathReminderService
+from bot.services.file_store import FileStore
+from bot.services.ingredient_canonicalizer import IngredientCanonicalizer
+from bot.services.lease import SQLiteLease
+from bot.services.recent_meals import RecentMealsCache
+
+KEY = StorageKey(bot_id=1, chat_id=1, user_id=1)
+
+
+def test_sqlite_storage_is_shared_between_instances(tmp_path: Path):
+    asyncio.run(_run_shared_storage(tmp_path))
+
+
+async def _run_shared_storage(tmp_path: Path) -> None:
+    path = tmp_path / "state.sqlite3"
+    first = FSMContext(storage=SQLiteStorage(path), key=KEY)
+    second = FSMContext(storage=SQLiteStorage(path), key=KEY)
+    started = datetime(2025, 3, 12, 19, 30, tzinfo=ZoneInfo("UTC"))
+
+    await first.set_state(FoodLogStates.adding_foods)
+    await first.update_data(draft=FoodEventDraft(started_at=started).model_dump())
+    await second.update_data(pending_lines=["паста"])
+
+    assert await second.get_state() == FoodLogStates.adding_foods.state
+    data = await first.get_data()
+    assert FoodEventDraft.model_validate(data["draft"]).started_at == started
+    assert data["pending_lines"] == ["паста"]
+
+    await second.clear()
+    assert await first.get_state() is None
+    assert await first.get_data() == {}
+
+
+def test_lease_has_single_owner_until_expiry(tmp_path: Path):
+    asyncio.run(_run_lease(tmp_path))
+
+
+async def _run_lease(tmp_path: Path) -> None:
+    path = tmp_path / "state.sqlite3"
+    leader = SQLiteLease(path, "scheduler", ttl_seconds=60, owner="a")
+    follower = SQLiteLease(path, "scheduler", ttl_seconds=60, owner="b")
+
+    assert await leader.acquire()
+    assert await leader.acquire()
+    assert not await follower.acquire()
+
+    assert not follower._acquire(now=0)
+    assert follower._acquire(now=10_000_000_000)
+    assert not leader._acquire(now=10_000_000_001)
+
+    await follower.release()
+    assert await leader.acquire()
+
+
+def test_breath_reminders_see_writes_from_other_instances(tmp_path: Path):
+    asyncio.run(_run_reminder_sharing(tmp_path))
+
+
+async def _run_reminder_sharing(tmp_path: Path) -> None:
+    first = BreathReminderService(FileStore(tmp_path))
+    second = BreathReminderService(FileStore(tmp_path))
+
+    await first.add_or_update(user_id=1, chat_id=1, time_str="07:00")
+    await second.add_or_update(user_id=2, chat_id=2, time_str="07:00")
+
+    due = await first.get_due("07:00", "2025-03-12")
+    assert sorted(reminder.user_id for reminder in due) == [1, 2]
+
+
+def _write_concurrently(base_dir: str, worker: int) -> None:
+    async def _write() -> None:
+        store = FileStore(Path(base_dir))
+        for index in range(30):
+            await store.write_text("FoodLog/shared.md", f"worker {worker} write {index}\n")
+            await store.ensure_file("Foods/сыр.md", f"worker {worker}\n")
+
+    asyncio.run(_write())
+
+
+def test_file_store_writes_are_safe_across_processes(tmp_path: Path):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_write_concurrently, args=(str(tmp_path), worker))
+        for worker in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert all(process.exitcode == 0 for process in processes)
+    assert (tmp_path / "FoodLog" / "shared.md").read_text(encoding="utf-8").startswith("worker ")
+    assert (tmp_path / "Foods" / "сыр.md").read_text(encoding="utf-8").startswith("worker ")
+    leftovers = [path.name for path in tmp_path.rglob("*.tmp")]
+    assert leftovers == []
+
+
+def test_alias_tables_of_two_workers_are_merged(tmp_path: Path):
+    asyncio.run(_run_alias_merge(tmp_path))
+
+
+async def _run_alias_merge(tmp_path: Path) -> None:
+    first = IngredientCanonicalizer(FileStore(tmp_path))
+    second = IngredientCanonicalizer(FileStore(tmp_path))
+    first.add_alias("молоко коровье", "молоко")
+    second.add_alias("сливки жирные", "сливки")
+    await first.save()
+    await second.save()
+
+    reloaded = IngredientCanonicalizer(FileStore(tmp_path))
+    assert reloaded.canonicalize("молоко коровье") == "молоко"
+    assert reloaded.canonicalize("сливки жирные") == "сливки"
+    # Сохраняя файл, воркер заодно подхватывает чужие синонимы.
+    assert second.canonicalize("молоко коровье") == "молоко"
+
+
+def test_repeat_meal_key_resolves_on_another_worker(tmp_path: Path):
+    asyncio.run(_run_shared_recent_meals(tmp_path / "state.sqlite3"))
+
+
+async def _run_shared_recent_meals(path: Path) -> None:
+    first = RecentMealsCache(capacity=2, path=path)
+    second = RecentMealsCache(capacity=2, path=path)
+    await first.record(7, ["каша"])
+    meal = await first.record(7, ["суп", "хлеб"])
+    await second.record(7, ["салат"])
+
+    assert second.get(7, meal.key) is None
+    await second.load(7)
+    assert second.get(7, meal.key) == ["суп", "хлеб"]
+    assert [item.foods for item in second.recent(7)] == [["салат"], ["суп", "хлеб"]]
+    await first.load(8)
+    assert first.recent(8) == []
+    first.close()
+    second.close()
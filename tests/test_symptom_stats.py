@@ -0,0 +1,100 @@
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from bot.domain.models import Condition, FoodEventDraft
+from bot.handlers.stats import format_ranking
+from bot.services.condition_service import ConditionService
+from bot.services.file_store import FileStore
+from bot.services.food_event_service import FoodEventService
+from bot.services.foods_service import FoodsService
+from bot.services.symptom_stats import SymptomStatsService, score_ingredient
+
+
+class SteppingTimeService:
+    def __init__(self):
+        self._now = datetime(2025, 3, 12, 8, 0, tzinfo=ZoneInfo("UTC"))
+        self._counter = 0
+
+    def now(self):
+        self._now += timedelta(hours=1)
+        return self._now
+
+    def short_id(self, length: int = 8) -> str:
+        self._counter += 1
+        return f"{self._counter:08x}"
+
+
+def test_score_ingredient_matches_two_by_two_table():
+    # Молоко: 8 из 10 со вздутием; всего 40 приёмов, 12 со вздутием.
+    stat = score_ingredient("молоко", [10, 8, 0, 40, 200], [40, 12, 1, 240, 1600], "bloating")
+
+    expected = math.log((8.5 * 26.5) / (2.5 * 4.5))
+    assert math.isclose(stat.log_odds, expected)
+    assert stat.ci_low < expected < stat.ci_high
+    assert math.isclose(stat.lift, (8 / 10) / (12 / 40))
+    assert math.isclose(stat.well_being_mean, 4.0)
+    assert math.isclose(stat.well_being_delta, 4.0 - 200 / 30)
+
+
+def test_incremental_statistics_match_rebuild_from_vault(tmp_path: Path):
+    asyncio.run(_run_incremental_vs_rebuild(tmp_path))
+
+
+async def _run_incremental_vs_rebuild(tmp_path: Path):
+    file_store = FileStore(tmp_path / "vault")
+    stats = SymptomStatsService(tmp_path / "state.sqlite3", min_exposures=2)
+    service = FoodEventService(
+        file_store=file_store,
+        foods_service=FoodsService(file_store),
+        condition_service=ConditionService(file_store),
+        time_service=SteppingTimeService(),
+        symptom_stats=stats,
+    )
+    rng = random.Random(7)
+    menu = ["молоко", "хлеб", "яблоко", "фасоль", "рис"]
+    for _ in range(30):
+        foods = rng.sample(menu, rng.randint(1, 3))
+        # Фасоль почти всегда со вздутием, остальное — случайно.
+        bloating = "фасоль" in foods or rng.random() < 0.1
+        draft = FoodEventDraft(started_at=datetime.now(), foods_raw=foods)
+        condition = Condition(bloating=bloating, diarrhea=False, well_being=rng.randint(3, 9))
+        await service.persist_event(draft, condition)
+
+    events, incremental = await stats.rank("bloating", limit=len(menu))
+    assert events == 30
+    assert incremental[0].ingredient == "фасоль"
+    assert incremental[0].ci_low > 0
+
+    rebuilt = SymptomStatsService(tmp_path / "rebuilt.sqlite3", min_exposures=2)
+    assert rebuilt.rebuild(file_store.resolve("FoodLog"), file_store.resolve("ConditionLog")) == 30
+    assert await rebuilt.rank("bloating", limit=len(menu)) == (events, incremental)
+
+    # Несколько воркеров на пустой базе пересчитывают одновременно: каждый приём
+    # учитывается один раз, а запись, пришедшая после пересчёта, не дублируется.
+    path = tmp_path / "shared.sqlite3"
+    workers = [SymptomStatsService(path, min_exposures=2) for _ in range(2)]
+    counted = await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                worker.rebuild, file_store.resolve("FoodLog"), file_store.resolve("ConditionLog")
+            )
+            for worker in workers
+        )
+    )
+    assert sorted(counted) == [0, 30]
+    first_log = sorted(file_store.resolve("FoodLog").glob("*.md"))[0].name
+    condition = Condition(bloating=True, diarrhea=False, well_being=5)
+    assert not await workers[0].record(["рис"], condition, event=first_log)
+    assert await workers[1].rank("bloating", limit=len(menu)) == (events, incremental)
+    for worker in workers:
+        worker.close()
+
+    text = format_ranking("bloating", events, incremental)
+    assert "<b>фасоль</b>" in text
+    stats.close()
+    rebuilt.close()
+    file_store.close()
@@ -0,0 +1,148 @@
+import asyncio
+import importlib.util
+import json
+import time
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from bot.middlewares.tracing import TracingMiddleware
+from bot.services.file_store import FileStore
+from bot.tracing import TraceSink, span, start_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _update(update_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1741800000,
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 7, "is_bot": False, "first_name": "Test"},
+                "text": text,
+            },
+        }
+    )
+
+
+def _load_trace_summary():
+    spec = importlib.util.spec_from_file_location(
+        "trace_summary", ROOT / "scripts" / "trace_summary.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_middleware_writes_nested_spans_to_jsonl(tmp_path):
+    asyncio.run(_run_middleware(tmp_path))
+
+
+async def _run_middleware(tmp_path) -> None:
+    store = FileStore(tmp_path / "vault")
+    router = Router()
+
+    @router.message()
+    async def _handle(message: Message) -> None:
+        with span("handler.work"):
+            await store.write_text("note.md", message.text)
+            await asyncio.to_thread(_threaded_step)
+
+    sink = TraceSink(tmp_path / "traces.jsonl", sample_rate=1.0)
+    dispatcher = Dispatcher()
+    dispatcher.update.outer_middleware(TracingMiddleware(sink))
+    dispatcher.include_router(router)
+    bot = Bot(token="42:TEST")
+    await dispatcher.feed_update(bot, _update(1, "паста"))
+    await bot.session.close()
+    sink.flush()
+
+    [line] = (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+    trace = json.loads(line)
+    assert trace["name"] == "update.message"
+    assert trace["attributes"] == {"update_id": 1, "user_id": 7}
+    spans = {item["name"]: item for item in trace["spans"]}
+    assert spans["file_store.write"]["parent"] == spans["handler.work"]["id"]
+    assert spans["file_store.write"]["attributes"]["bytes"] == len("паста".encode("utf-8"))
+    assert spans["thread.step"]["parent"] == spans["handler.work"]["id"]
+    assert spans["handler.work"]["parent"] == 1
+
+
+def _threaded_step() -> None:
+    with span("thread.step"):
+        pass
+
+
+def test_sink_keeps_slow_and_failed_traces_and_samples_the_rest(tmp_path):
+    sink = TraceSink(
+        tmp_path / "traces.jsonl", sample_rate=0.0, slow_threshold=0.05, random_source=lambda: 0.0
+    )
+    with start_trace("update.fast") as fast:
+        pass
+    try:
+        with start_trace("update.failed") as failed:
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    with start_trace("update.slow") as slow:
+        pass
+    slow.root.end = slow.root.start + 0.1
+
+    assert not sink.record(fast)
+    assert sink.record(failed)
+    assert sink.record(slow)
+    sink.sample_rate = 0.5
+    assert sink.record(fast)
+    sink.flush()
+    names = [
+        json.loads(line)["name"]
+        for line in (tmp_path / "traces.jsonl").read_text(encoding="utf-8").splitlines()
+    ]
+    assert names == ["update.failed", "update.slow", "update.fast"]
+
+
+class SlowDiskSink(TraceSink):
+    def _rotate_if_needed(self) -> None:
+        time.sleep(0.2)
+
+
+def test_sink_writes_in_background(tmp_path):
+    sink = SlowDiskSink(tmp_path / "traces.jsonl", sample_rate=1.0)
+    with start_trace("update.message") as trace:
+        pass
+
+    started = time.perf_counter()
+    assert sink.record(trace)
+    assert time.perf_counter() - started < 0.1
+    sink.close()
+    assert sink.written == 1
+    assert (tmp_path / "traces.jsonl").read_text(encoding="utf-8").count("\n") == 1
+
+
+def test_span_outside_trace_is_noop():
+    with span("orphan") as current:
+        assert current is None
+
+
+def test_trace_summary_percentiles():
+    summary_module = _load_trace_summary()
+    traces = [
+        {
+            "name": "update.message",
+            "duration_ms": float(index),
+            "spans": [
+                {"name": "file_store.write", "duration_ms": 1.0},
+                {"name": "file_store.write", "duration_ms": 2.0},
+            ],
+        }
+        for index in range(1, 101)
+    ]
+    summary = summary_module.summarize(traces)
+    durations = sorted(summary["traces"]["update.message"])
+    assert summary_module.percentile(durations, 0.5) == 50.0
+    assert summary_module.percentile(durations, 0.99) == 99.0
+    assert summary["spans"]["file_store.write"] == [3.0] * 100
@@ -0,0 +1,55 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from bot.webhook import SECRET_HEADER, build_webhook_app
+
+
+def _update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1741800000,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }
+
+
+def test_webhook_replays_updates_into_dispatcher():
+    asyncio.run(_run_webhook_replay())
+
+
+async def _run_webhook_replay() -> None:
+    received: list[str] = []
+    router = Router()
+
+    @router.message()
+    async def _record(message: Message) -> None:
+        received.append(message.text)
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    bot = Bot(token="42:TEST")
+    app = build_webhook_app(dispatcher, bot, path="/hook", secret_token="s3cret")
+
+    async with TestClient(TestServer(app)) as client:
+        for update_id, text in enumerate(["паста", "сыр"], start=1):
+            response = await client.post(
+                "/hook", json=_update(update_id, text), headers={SECRET_HEADER: "s3cret"}
+            )
+            assert response.status == 200
+
+        unauthorized = await client.post("/hook", json=_update(3, "x"))
+        assert unauthorized.status == 401
+        malformed = await client.post(
+            "/hook", data="not json", headers={SECRET_HEADER: "s3cret"}
+        )
+        assert malformed.status == 400
+
+    assert sorted(received) == ["паста", "сыр"]
+    await bot.session.close()